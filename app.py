@@ -1,13 +1,26 @@
+import json
 import logging
-from flask import Flask, render_template, request, redirect, url_for, send_file, flash
+from flask import Flask, render_template, request, redirect, url_for, send_from_directory, flash, jsonify
 import os
-from etl.pipeline import run_pipeline
+import uuid
+from etl.jobs.runner import JobQueue, JobQueueFull, job_summary
+from etl.jobs.store import JOB_DB_PATH, JobNotFound, JobStore
 from werkzeug.utils import secure_filename
-from etl.extract.reader import read_csv_safe
+from etl.extract.cache import frame_cache
+from etl.extract.reader import read_csv_preview
+from etl.extract.uploads import UploadNotFound, UploadStore
+from etl.executor.optimizer import optimize_plan
+from etl.executor.preview import PREVIEW_SAMPLE_ROWS, preview_on_sample
+from etl.executor.tool_executor import execute_plan
+from etl.llm.planner import generate_plan
+from etl.load.writer import CONTENT_TYPES, OUTPUT_FORMATS, output_format_of, output_path_for, write_frame
+from etl.profile.profiler import profile_dataframe
+from etl.profile.sampling import stratified_sample
+from etl.profile.serializer import ensure_json_serializable
 from etl.transform import cleaners
+from etl.validate.expectations import feed_name, load_expectations
 import pandas as pd
 
-UPLOAD_DIR = "data/uploads"
 OUTPUT_DIR = "data/outputs"
 ALLOWED_EXTENSIONS = {"csv"}
 
@@ -15,11 +28,20 @@ app = Flask(__name__)
 app.secret_key = os.getenv("FLASK_SECRET", "dev-secret")
 
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.DEBUG, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+# DEBUG logs every function entry; use tracing (ETL_TRACE=1) for timings
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+)
 
-os.makedirs(UPLOAD_DIR, exist_ok=True)
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
+# Pipeline runs happen in background jobs; requests only submit and poll
+jobs = JobQueue(JobStore(JOB_DB_PATH))
+
+# Uploads are stored by content hash; the hash is the upload id in forms
+uploads = UploadStore()
+
 
 def allowed_file(filename: str) -> bool:
     logger.debug("Entering allowed_file: %s", filename)
@@ -30,26 +52,37 @@ def allowed_file(filename: str) -> bool:
 def index():
     logger.debug("Entering index: method=%s", request.method)
     if request.method == "POST":
-        # Case A: second-form submission (cleaning request) - uses uploaded_filename
-        uploaded_filename = request.form.get("uploaded_filename")
-        if uploaded_filename:
-            filename = secure_filename(uploaded_filename)
-            input_path = os.path.join(UPLOAD_DIR, filename)
-            output_path = os.path.join(OUTPUT_DIR, f"cleaned_{filename}")
-
-            if not os.path.exists(input_path):
+        # Case A: second-form submission (cleaning request) - uses upload_id
+        upload_id = request.form.get("upload_id")
+        if upload_id:
+            try:
+                input_path = uploads.path_for(upload_id)
+                filename = secure_filename(uploads.filename_of(upload_id))
+            except UploadNotFound:
                 flash("Uploaded file not found on server; please re-upload")
                 return redirect(request.url)
+            # Distinct per run, so concurrent cleanings of the same upload
+            # (other users, other options) never share an output or .partial file
+            output_path = os.path.join(OUTPUT_DIR, f"cleaned_{uuid.uuid4().hex[:12]}_{filename}")
+
+            output_format = request.form.get("output_format") or None
+            if output_format is not None and output_format not in OUTPUT_FORMATS:
+                flash(f"Unknown output format: {output_format}")
+                return redirect(request.url)
 
             mode = request.form.get("mode", "full")
             if mode == "full":
                 try:
-                    result = run_pipeline(input_path, output_path)
-                    history = result.get("history", []) if isinstance(result, dict) else []
-                    return render_template("result.html", history=history, output_filename=os.path.basename(output_path))
-                except Exception as e:
-                    flash(str(e))
+                    job_id = jobs.submit_pipeline(
+                        input_path, output_path,
+                        output_format=output_format,
+                        # Specs are stored per feed name, not per content hash
+                        expectations=load_expectations(feed_name(filename)),
+                    )
+                except JobQueueFull as e:
+                    flash(f"Too many cleaning jobs running, please retry shortly ({e})")
                     return redirect(request.url)
+                return redirect(url_for("job_result", job_id=job_id))
 
             # selective mode
             selected_tools = request.form.getlist("tools")
@@ -58,11 +91,12 @@ def index():
             parse_col = request.form.get("parse_datetime_column", "")
 
             try:
+                output_path = output_path_for(output_path, output_format)
                 history = apply_selective_cleaners(input_path, output_path, selected_tools, {
                     "trim_whitespace_columns": trim_cols,
                     "convert_numeric_column": convert_col,
                     "parse_datetime_column": parse_col,
-                })
+                }, output_format=output_format)
                 return render_template("result.html", history=history, output_filename=os.path.basename(output_path))
             except Exception as e:
                 flash(str(e))
@@ -80,12 +114,14 @@ def index():
 
         if file and allowed_file(file.filename):
             filename = secure_filename(file.filename)
-            input_path = os.path.join(UPLOAD_DIR, filename)
-            file.save(input_path)
+            saved = uploads.save(file.stream, filename)
+            input_path = saved["path"]
+            for evicted in saved["evicted"]:
+                frame_cache.invalidate(uploads.object_path(evicted))
 
-            # Build EDA: columns, dtypes, first 5 rows
+            # Build EDA from the first rows only: columns, dtypes, first 5 rows
             try:
-                df, _ = read_csv_safe(input_path)
+                df, meta = read_csv_preview(input_path)
             except Exception as e:
                 flash(f"Failed to read uploaded file for preview: {e}")
                 return redirect(request.url)
@@ -94,35 +130,122 @@ def index():
                 "columns": list(df.columns),
                 "dtypes": {col: str(dtype) for col, dtype in df.dtypes.items()},
                 "head": df.head(5).to_dict(orient="records"),
-                "rows": len(df),
+                "preview_rows": len(df),
+                "rows": meta["rows_estimate"],
+                "rows_exact": meta["rows_exact"],
+                "row_count_job": None,
+                "duplicate": saved["duplicate"],
             }
+            # Parse the whole upload into the frame cache off the request
+            # path, so previews and cleaning runs start from memory
+            try:
+                jobs.submit_cache_warmup(input_path)
+            except JobQueueFull:
+                logger.warning("Job queue full, not warming the frame cache for %s", filename)
+
+            if not meta["rows_exact"]:
+                # Refine the estimate in the background; the page polls for it
+                try:
+                    eda["row_count_job"] = jobs.submit_row_count(input_path)
+                except JobQueueFull:
+                    logger.warning("Job queue full, keeping estimated row count for %s", filename)
 
-            return render_template("index.html", eda=eda, uploaded_filename=filename)
+            return render_template("index.html", eda=eda, upload_id=saved["id"], uploaded_filename=filename)
 
     return render_template("index.html")
 
 
+@app.route("/jobs/<job_id>")
+def job_status(job_id: str):
+    logger.debug("Entering job_status: job_id=%s", job_id)
+    try:
+        job = jobs.get(job_id)
+    except JobNotFound:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job_summary(job))
+
+
+@app.route("/jobs/<job_id>/cancel", methods=["POST"])
+def job_cancel(job_id: str):
+    logger.debug("Entering job_cancel: job_id=%s", job_id)
+    try:
+        job = jobs.cancel(job_id)
+    except JobNotFound:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job_summary(job))
+
+
+@app.route("/jobs/<job_id>/result")
+def job_result(job_id: str):
+    """
+    Result page of a job; while it runs, the page polls job_status and
+    reloads once the job has finished.
+    """
+    logger.debug("Entering job_result: job_id=%s", job_id)
+    try:
+        job = jobs.get(job_id)
+    except JobNotFound:
+        flash("Job not found")
+        return redirect(url_for("index"))
+
+    result = job["result"] or {}
+    return render_template(
+        "result.html",
+        job=job_summary(job),
+        history=result.get("history", []),
+        timings=result.get("timings"),
+        traced=bool(result.get("trace_path")),
+        output_filename=os.path.basename(result.get("output_path") or job["params"]["output_csv_path"]),
+    )
+
+
+@app.route("/jobs/<job_id>/trace")
+def job_trace(job_id: str):
+    """
+    Chrome trace JSON of a traced pipeline job (open in Perfetto or
+    chrome://tracing).
+    """
+    logger.debug("Entering job_trace: job_id=%s", job_id)
+    try:
+        job = jobs.get(job_id)
+    except JobNotFound:
+        return jsonify({"error": "Job not found"}), 404
+    path = (job["result"] or {}).get("trace_path")
+    if not path or not os.path.exists(path):
+        return jsonify({"error": "Job was not traced"}), 404
+    return send_from_directory(
+        os.path.dirname(os.path.abspath(path)), os.path.basename(path),
+        as_attachment=True, mimetype="application/json",
+    )
+
+
 @app.route("/download/<filename>")
 def download(filename: str):
+    """
+    Streams an output file from disk with Content-Length, conditional
+    requests and byte ranges (resumable downloads).
+    """
     logger.debug("Entering download: filename=%s", filename)
-    path = os.path.join(OUTPUT_DIR, filename)
+    path = os.path.join(OUTPUT_DIR, secure_filename(filename))
     if os.path.exists(path):
-        return send_file(path, as_attachment=True)
+        fmt = output_format_of(path)
+        return send_from_directory(
+            OUTPUT_DIR,
+            os.path.basename(path),
+            as_attachment=True,
+            conditional=True,
+            mimetype=CONTENT_TYPES.get(fmt, "application/octet-stream"),
+        )
     flash("File not found")
     return redirect(url_for("index"))
 
 
-if __name__ == "__main__":
-    app.run(debug=True, port=int(os.getenv("PORT", 8501)))
-
-
-def apply_selective_cleaners(input_path: str, output_path: str, tools_list: list, args: dict) -> list:
-    """Apply a list of cleaner names (strings) in order to the input CSV and save output.
+def apply_selective_tools(df: pd.DataFrame, tools_list: list, args: dict) -> tuple:
+    """Apply a list of cleaner names (strings) in order to a DataFrame.
 
-    Returns a history list of steps applied.
+    Returns the cleaned DataFrame and a history list of steps applied.
     """
-    logger.debug("Entering apply_selective_cleaners: input=%s output=%s tools=%s", input_path, output_path, tools_list)
-    df, _ = read_csv_safe(input_path)
+    logger.debug("Entering apply_selective_tools: tools=%s", tools_list)
     history = []
 
     for tool in tools_list:
@@ -164,6 +287,95 @@ def apply_selective_cleaners(input_path: str, output_path: str, tools_list: list
 
         history.append(step)
 
+    return df, history
+
+
+def apply_selective_cleaners(input_path: str, output_path: str, tools_list: list, args: dict, output_format: str = None) -> list:
+    """Apply a list of cleaner names (strings) in order to the input CSV and save output
+    (as output_format, default ETL_OUTPUT_FORMAT).
+
+    Returns a history list of steps applied.
+    """
+    logger.debug("Entering apply_selective_cleaners: input=%s output=%s tools=%s", input_path, output_path, tools_list)
+    # Cached across attempts on the same upload; cleaners never mutate it
+    df, _ = frame_cache.read_csv(input_path)
+    df, history = apply_selective_tools(df, tools_list, args)
+
     # write out
-    df.to_csv(output_path, index=False)
+    write_frame(df, output_path, output_format)
     return history
+
+
+@app.route("/preview", methods=["POST"])
+def preview():
+    """
+    Runs the selected cleaners (mode=selective, form fields as for a
+    selective run) or a plan (mode=plan with a JSON "plan", or mode=llm
+    to ask the planner) on a stratified sample of the cached upload and
+    returns the projected effect as JSON. Nothing is written.
+    """
+    payload = request.get_json(silent=True) or request.form
+    logger.debug("Entering preview: mode=%s", payload.get("mode"))
+    try:
+        upload_id = payload.get("upload_id", "")
+        input_path = uploads.path_for(upload_id)
+        filename = uploads.filename_of(upload_id)
+    except UploadNotFound:
+        return jsonify({"error": "Uploaded file not found on server; please re-upload"}), 404
+
+    mode = payload.get("mode", "selective")
+    plan = payload.get("plan") or {}
+    if mode == "plan" and isinstance(plan, str):
+        # Form-encoded requests carry the plan as a JSON string
+        try:
+            plan = json.loads(plan)
+        except ValueError as e:
+            return jsonify({"error": f"Invalid plan JSON: {e}"}), 400
+    if mode == "plan" and not isinstance(plan, dict):
+        return jsonify({"error": 'Plan must be a JSON object with a "steps" list'}), 400
+
+    try:
+        sample = frame_cache.sample(input_path, PREVIEW_SAMPLE_ROWS, stratified_sample)
+        expectations = load_expectations(feed_name(filename))
+
+        if mode == "selective":
+            tools = payload.getlist("tools") if hasattr(payload, "getlist") else payload.get("tools", [])
+            args = {key: payload.get(key, "") for key in (
+                "trim_whitespace_columns", "convert_numeric_column", "parse_datetime_column",
+            )}
+
+            def run(frame):
+                frame, history = apply_selective_tools(frame, tools, args)
+                return {"df": frame, "log": [
+                    {"step": {"type": "tool", "name": h["tool"], "args": h["args"]}, "status": h["status"]}
+                    for h in history
+                ]}
+
+            # Selected cleaners never drop columns; names suffice for validation
+            steps = [{"type": "tool", "name": tool} for tool in tools]
+            plan = None
+        else:
+            # Safety checks and the planner need the full profile (cached too)
+            profile = frame_cache.profile(
+                input_path, lambda df: ensure_json_serializable(profile_dataframe(df))
+            )
+            if mode == "llm":
+                # Same first plan a full run of this upload starts from
+                plan = frame_cache.plan(input_path, profile, lambda: generate_plan(profile, None))
+            plan = optimize_plan(plan, profile)
+            steps = plan.get("steps", [])
+
+            def run(frame):
+                return execute_plan(frame, plan, profile)
+
+        result = preview_on_sample(sample, run, steps, expectations=expectations)
+    except Exception as e:
+        logger.exception("Preview failed")
+        return jsonify({"error": str(e)}), 400
+
+    result["plan"] = plan or {"steps": [entry["step"] for entry in result["log"]]}
+    return jsonify(result)
+
+
+if __name__ == "__main__":
+    app.run(debug=True, port=int(os.getenv("PORT", 8501)))
@@ -0,0 +1,99 @@
+import logging
+import os
+import tempfile
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Checkpoints of frames larger than this are spilled to Parquet while the
+# pipeline waits on the planner, instead of being held in memory
+CHECKPOINT_MAX_MEMORY_MB = float(os.getenv("ETL_CHECKPOINT_MAX_MEMORY_MB", "512"))
+
+# Rough per-cell cost of a Python object (pointer + str object)
+AVG_OBJECT_CELL_BYTES = 64
+
+
+def approx_frame_mb(df: pd.DataFrame) -> float:
+    """
+    Cheap size estimate: exact for fixed-width columns, a per-cell average
+    for object columns (deep memory_usage would scan every string).
+    """
+    total = 0
+    for col in df.columns:
+        series = df[col]
+        if isinstance(series.dtype, np.dtype) and series.dtype == object:
+            total += len(series) * AVG_OBJECT_CELL_BYTES
+        else:
+            total += series.memory_usage(index=False, deep=False)
+    return total / (1024 ** 2)
+
+
+class CheckpointStore:
+    """
+    Keeps the last good frame of a plan execution together with the number
+    of steps it reflects.
+
+    save() only keeps a reference: tools never mutate their input, so a
+    checkpoint shares its columns with the running frame and costs nothing
+    while execution continues. persist() is called once the checkpoint
+    becomes a resume point; frames above max_memory_mb are then written to
+    Parquet and released from memory until load().
+    """
+
+    def __init__(
+        self,
+        spill_dir: Optional[str] = None,
+        max_memory_mb: float = CHECKPOINT_MAX_MEMORY_MB,
+    ):
+        self.spill_dir = spill_dir
+        self.max_memory_mb = max_memory_mb
+        self.completed_steps = 0
+        self._df: Optional[pd.DataFrame] = None
+        self._path: Optional[str] = None
+
+    def save(self, completed_steps: int, df: pd.DataFrame) -> None:
+        self._remove_spill()
+        self.completed_steps = completed_steps
+        self._df = df
+
+    def persist(self) -> None:
+        if self._df is None or approx_frame_mb(self._df) <= self.max_memory_mb:
+            return
+
+        fd, path = tempfile.mkstemp(prefix="checkpoint_", suffix=".parquet", dir=self.spill_dir)
+        os.close(fd)
+        try:
+            self._df.to_parquet(path, index=False)
+        except Exception as e:
+            # Mixed-type object columns or missing pyarrow: keep it in memory
+            logger.warning("Checkpoint spill failed, keeping in memory: %s", e)
+            os.remove(path)
+            return
+
+        logger.debug("Spilled checkpoint after %d steps to %s", self.completed_steps, path)
+        self._path = path
+        self._df = None
+
+    def load(self) -> Optional[Tuple[int, pd.DataFrame]]:
+        if self._df is not None:
+            return self.completed_steps, self._df
+        if self._path is not None:
+            return self.completed_steps, pd.read_parquet(self._path)
+        return None
+
+    def _remove_spill(self) -> None:
+        if self._path is not None:
+            os.remove(self._path)
+            self._path = None
+
+    def clear(self) -> None:
+        self._remove_spill()
+        self._df = None
+        self.completed_steps = 0
+
+    def __del__(self):
+        if self._path is not None and os.path.exists(self._path):
+            os.remove(self._path)
@@ -0,0 +1,349 @@
+import atexit
+import builtins
+import logging
+import multiprocessing
+import os
+import queue
+import resource
+import signal
+import tempfile
+import threading
+from contextlib import contextmanager
+from multiprocessing import resource_tracker
+from multiprocessing.connection import Connection
+from multiprocessing.shared_memory import SharedMemory
+from types import SimpleNamespace
+from typing import Dict, Any, Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from etl.executor.safety import CODE_STEP_BUILTINS, CODE_STEP_FUNCTIONS
+
+logger = logging.getLogger(__name__)
+
+# ======================================================
+# CONFIG
+# ======================================================
+
+# Code steps are LLM-generated Python; they stay off unless explicitly enabled
+CODE_STEPS_ENABLED = os.getenv("ETL_ALLOW_CODE_STEPS", "0") == "1"
+
+CODE_WORKERS = int(os.getenv("ETL_CODE_WORKERS", "2"))
+CODE_CPU_SECONDS = int(os.getenv("ETL_CODE_CPU_SECONDS", "30"))
+CODE_MEMORY_MB = int(os.getenv("ETL_CODE_MEMORY_MB", "4096"))
+CODE_TIMEOUT_SECONDS = float(os.getenv("ETL_CODE_TIMEOUT_SECONDS", "60"))
+
+# Builtins visible to code steps: no open/print/input, imports or
+# reflection. This is not an I/O barrier by itself; that is the allowlist
+# in safety.is_code_safe, the module-free namespace below and the worker's
+# file size limit (see _worker_main)
+SAFE_BUILTINS = {name: getattr(builtins, name) for name in CODE_STEP_BUILTINS}
+
+# `pd` and `np` inside a code step hold only the allowlisted functions,
+# so pd.io, np.savetxt and the like do not exist at run time either
+CODE_STEP_MODULES = {
+    alias: SimpleNamespace(**{name: getattr(module, name) for name in sorted(CODE_STEP_FUNCTIONS[alias])})
+    for alias, module in (("pd", pd), ("np", np))
+}
+
+
+class CodeExecutionError(Exception):
+    pass
+
+
+# ======================================================
+# ARROW IPC OVER SHARED MEMORY
+# ======================================================
+
+# Arrow buffers export the mapping; these helpers keep every reference
+# local so the block can be closed once they return
+
+def _write_table(buf: memoryview, table: pa.Table) -> None:
+    sink = pa.FixedSizeBufferWriter(pa.py_buffer(buf))
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    sink.close()
+
+
+def _read_table(buf: memoryview) -> pd.DataFrame:
+    """
+    The IPC reader maps the Arrow buffers in place; to_pandas (with its
+    default block consolidation) is the only materialization of NumPy
+    columns. A stored index can come back zero-copy, so it is copied out
+    to let the block be closed.
+
+    Arrow-backed columns (ETL_DTYPE_BACKEND=pyarrow) would keep wrapping
+    the mapped arrays, and pandas' metadata turns ArrowDtype strings into
+    StringDtype; they are rebuilt from copies with their original dtype.
+    """
+    with pa.ipc.open_stream(pa.py_buffer(buf)) as reader:
+        table = reader.read_all()
+
+    metadata = table.schema.pandas_metadata or {}
+    index_fields = {c for c in metadata.get("index_columns", []) if isinstance(c, str)}
+    arrow_backed = []
+    for column in metadata.get("columns", []):
+        numpy_type = column["numpy_type"]
+        i = table.schema.get_field_index(column["field_name"])
+        if i < 0 or column["field_name"] in index_fields or not (numpy_type.endswith("[pyarrow]") or numpy_type == "string"):
+            continue
+        chunks = table.column(i).chunks
+        copied = pa.concat_arrays(chunks) if chunks else pa.array([], type=table.schema.field(i).type)
+        if numpy_type.endswith("[pyarrow]"):
+            arrow_backed.append((i, column["name"], pd.arrays.ArrowExtensionArray(copied)))
+        else:
+            table = table.set_column(i, table.schema.field(i), copied)
+
+    df = table.drop_columns([table.schema.names[i] for i, _, _ in arrow_backed]).to_pandas()
+    df.index = df.index.copy(deep=True)
+    for i, name, values in arrow_backed:
+        df.insert(i, name, values)
+    return df
+
+
+def write_frame(df: pd.DataFrame) -> Tuple[str, int]:
+    """
+    Writes a frame as an Arrow IPC stream into a new shared memory block,
+    returning its name and size. The receiver maps the block and reads
+    the Arrow buffers in place; nothing is pickled or copied through a pipe.
+    """
+    try:
+        table = pa.Table.from_pandas(df)
+    except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+        raise CodeExecutionError(f"Frame cannot be transferred to the code worker: {e}") from e
+
+    sink = pa.MockOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    size = max(sink.size(), 1)
+
+    shm = SharedMemory(create=True, size=size)
+    try:
+        _write_table(shm.buf, table)
+    except Exception:
+        shm.close()
+        shm.unlink()
+        raise
+    shm.close()
+    return shm.name, size
+
+
+def read_frame(name: str, unlink: bool = True) -> pd.DataFrame:
+    shm = SharedMemory(name=name)
+    try:
+        df = _read_table(shm.buf)
+    finally:
+        shm.close()
+        if unlink:
+            shm.unlink()
+    return df
+
+
+# ======================================================
+# WORKER PROCESS
+# ======================================================
+
+def _set_cpu_budget(seconds: int) -> None:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    used = int(usage.ru_utime + usage.ru_stime)
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    soft = used + seconds
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _clear_cpu_budget() -> None:
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    resource.setrlimit(resource.RLIMIT_CPU, (hard, hard))
+
+
+@contextmanager
+def _no_file_writes() -> Iterator[None]:
+    """
+    Lowers the file size limit to 0 for the duration of the block: writes
+    to regular files fail with EFBIG (SIGXFSZ is ignored by the worker).
+    Shared memory blocks are created outside the block.
+    """
+    soft, hard = resource.getrlimit(resource.RLIMIT_FSIZE)
+    resource.setrlimit(resource.RLIMIT_FSIZE, (0, hard))
+    try:
+        yield
+    finally:
+        resource.setrlimit(resource.RLIMIT_FSIZE, (soft, hard))
+
+
+def _run_code(df: pd.DataFrame, code: str) -> pd.DataFrame:
+    namespace = {"__builtins__": SAFE_BUILTINS, **CODE_STEP_MODULES, "df": df}
+    exec(compile(code, "<code step>", "exec"), namespace)
+    result = namespace.get("df")
+    if not isinstance(result, pd.DataFrame):
+        raise CodeExecutionError("Code step must leave a DataFrame in 'df'")
+    return result
+
+
+def _worker_main(conn: Connection, memory_mb: int) -> None:
+    """
+    Worker loop: receives (input block, code, cpu seconds), runs the code
+    under a per-job CPU rlimit and replies with the output block.
+    Exceeding the CPU limit kills the worker (SIGXCPU); exceeding the
+    address-space limit surfaces as MemoryError. Code runs with a file
+    size limit of 0 from an empty scratch directory, so it cannot write
+    files.
+    """
+    if memory_mb:
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    signal.signal(signal.SIGXFSZ, signal.SIG_IGN)
+    os.chdir(tempfile.mkdtemp(prefix="etl_code_step_"))
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        if message is None:
+            return
+
+        in_name, code, cpu_seconds = message
+        try:
+            # The parent owns and unlinks the input block
+            df = read_frame(in_name, unlink=False)
+            _set_cpu_budget(cpu_seconds)
+            try:
+                with _no_file_writes():
+                    result = _run_code(df, code)
+            finally:
+                _clear_cpu_budget()
+            out_name, _ = write_frame(result)
+            # Ownership of the output block passes to the parent
+            resource_tracker.unregister(f"/{out_name}", "shared_memory")
+            conn.send(("ok", out_name))
+        except BaseException as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+
+
+class _CodeWorker:
+    def __init__(self, ctx, memory_mb: int):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main, args=(child_conn, memory_mb), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+# ======================================================
+# POOL
+# ======================================================
+
+class CodeWorkerPool:
+    """
+    Fixed pool of warm worker processes for code steps. Workers are started
+    once (pandas and pyarrow preloaded via forkserver) and reused; a worker
+    that is killed by a limit or the wall-clock timeout is replaced.
+    """
+
+    def __init__(
+        self,
+        size: int = CODE_WORKERS,
+        cpu_seconds: int = CODE_CPU_SECONDS,
+        memory_mb: int = CODE_MEMORY_MB,
+        timeout: float = CODE_TIMEOUT_SECONDS,
+    ):
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self.timeout = timeout
+        self._ctx = multiprocessing.get_context("forkserver")
+        self._ctx.set_forkserver_preload(["pandas", "pyarrow", "numpy"])
+        self._idle: "queue.Queue[_CodeWorker]" = queue.Queue()
+        self._workers = []
+        self._lock = threading.Lock()
+        for _ in range(size):
+            self._add_worker()
+
+    def _add_worker(self) -> _CodeWorker:
+        worker = _CodeWorker(self._ctx, self.memory_mb)
+        with self._lock:
+            self._workers.append(worker)
+        self._idle.put(worker)
+        return worker
+
+    def _replace(self, worker: _CodeWorker) -> None:
+        with self._lock:
+            self._workers.remove(worker)
+        worker.stop()
+        self._add_worker()
+
+    def run(self, df: pd.DataFrame, code: str) -> pd.DataFrame:
+        logger.debug("Entering CodeWorkerPool.run: rows=%d", len(df))
+        worker = self._idle.get()
+        healthy = True
+        in_name, _ = write_frame(df)
+        try:
+            worker.conn.send((in_name, code, self.cpu_seconds))
+            if not worker.conn.poll(self.timeout):
+                healthy = False
+                raise CodeExecutionError(f"Code step timed out after {self.timeout}s")
+            try:
+                status, payload = worker.conn.recv()
+            except EOFError:
+                healthy = False
+                raise CodeExecutionError(
+                    f"Code worker died (exit code {worker.process.exitcode}); "
+                    f"CPU limit is {self.cpu_seconds}s"
+                )
+        finally:
+            unlinked = SharedMemory(name=in_name)
+            unlinked.close()
+            unlinked.unlink()
+            if healthy and worker.process.is_alive():
+                self._idle.put(worker)
+            else:
+                self._replace(worker)
+
+        if status != "ok":
+            raise CodeExecutionError(payload)
+        return read_frame(payload)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.stop()
+
+
+_default_pool: Optional[CodeWorkerPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_code_pool() -> CodeWorkerPool:
+    global _default_pool
+    with _pool_lock:
+        if _default_pool is None:
+            _default_pool = CodeWorkerPool()
+            atexit.register(_default_pool.shutdown)
+    return _default_pool
+
+
+def run_code_step(df: pd.DataFrame, step: Dict[str, Any]) -> pd.DataFrame:
+    """
+    Runs a code step's `code` (which reads and reassigns `df`) in the
+    sandboxed worker pool and returns the resulting frame.
+    """
+    if not CODE_STEPS_ENABLED:
+        raise CodeExecutionError("Code steps are disabled (set ETL_ALLOW_CODE_STEPS=1)")
+    return get_code_pool().run(df, step.get("code", ""))
@@ -0,0 +1,377 @@
+import fcntl
+import json
+import logging
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, List, Optional
+
+from etl.transform.dtypes import is_text_dtype_name
+from etl.transform.cleaners import (
+    DICT_ENCODE_MAX_UNIQUE_RATIO,
+    DICT_ENCODE_MIN_ROWS,
+    STRIP_DICT_ENCODE_MAX_AVG_LENGTH,
+)
+
+logger = logging.getLogger(__name__)
+
+# ======================================================
+# CONFIG
+# ======================================================
+
+COST_MODEL_PATH = os.getenv("ETL_COST_MODEL_PATH", "data/cost_model.json")
+# 0 disables a budget
+MAX_PLAN_SECONDS = float(os.getenv("ETL_MAX_PLAN_SECONDS", "0"))
+MAX_PLAN_MEMORY_MB = float(os.getenv("ETL_MAX_PLAN_MEMORY_MB", "0"))
+
+STEP_OVERHEAD_SECONDS = 0.001
+# Python str object header; a text cell costs this plus its characters
+STR_OBJECT_BYTES = 49
+# Arrow strings store an offset per cell next to the character data
+ARROW_STR_OFFSET_BYTES = 4
+NUMERIC_CELL_BYTES = 8
+# Categorical codes are int8 up to 127 categories, int16 beyond
+CATEGORY_CODE_BYTES = 2
+
+# Dictionary-encoded tools factorize the column (hashing every value) and
+# then transform only the distinct values
+FACTORIZE_NS_PER_CELL = 120
+FACTORIZE_NS_PER_CHAR = 1
+DICT_ENCODED_TOOLS = {
+    "standardize_missing": None,
+    "trim_whitespace": STRIP_DICT_ENCODE_MAX_AVG_LENGTH,
+    "normalize_currency": None,
+    "normalize_percentage": None,
+}
+# Tools that factorize regardless of cardinality
+ALWAYS_DICT_ENCODED_TOOLS = {"parse_currency_range", "parse_datetime"}
+
+# Exponential moving average weight for recalibration
+CALIBRATION_ALPHA = 0.3
+# Steps faster than this are dominated by noise and not used to calibrate
+MIN_CALIBRATION_SECONDS = 0.01
+
+# Per-tool cost models, measured on Uncleaned_DS_jobs.csv scaled to ~68k rows.
+#   scope:          which cells a tool processes
+#   ns_per_cell:    fixed cost per processed cell
+#   ns_per_char:    extra cost per character for text-scanning tools
+#   memory_factor:  transient memory as a multiple of the processed bytes
+#   output_bytes:   bytes per cell of the output column (None = unchanged)
+#   added_columns:  suffixes of numeric columns the tool adds
+TOOL_COST_MODELS: Dict[str, Dict[str, Any]] = {
+    "clean_column_names": {"scope": "none", "ns_per_cell": 0, "ns_per_char": 0, "memory_factor": 0.0, "output_bytes": None},
+    "standardize_missing": {"scope": "text_columns", "ns_per_cell": 300, "ns_per_char": 6, "memory_factor": 1.5, "output_bytes": None},
+    "trim_whitespace": {"scope": "text_columns", "ns_per_cell": 250, "ns_per_char": 0, "memory_factor": 0.1, "output_bytes": None},
+    "remove_duplicates": {"scope": "frame", "ns_per_cell": 330, "ns_per_char": 0, "memory_factor": 0.3, "output_bytes": None},
+    "convert_numeric": {"scope": "column", "ns_per_cell": 1400, "ns_per_char": 0, "memory_factor": 0.5, "output_bytes": NUMERIC_CELL_BYTES},
+    "parse_datetime": {"scope": "column", "ns_per_cell": 1000, "ns_per_char": 0, "memory_factor": 0.5, "output_bytes": NUMERIC_CELL_BYTES},
+    "drop_column": {"scope": "none", "ns_per_cell": 0, "ns_per_char": 0, "memory_factor": 0.0, "output_bytes": None},
+    "normalize_currency": {"scope": "column", "ns_per_cell": 1000, "ns_per_char": 140, "memory_factor": 2.0, "output_bytes": NUMERIC_CELL_BYTES},
+    "normalize_percentage": {"scope": "column", "ns_per_cell": 1300, "ns_per_char": 40, "memory_factor": 2.0, "output_bytes": NUMERIC_CELL_BYTES},
+    "parse_currency_range": {"scope": "column", "ns_per_cell": 3000, "ns_per_char": 60, "memory_factor": 1.0, "output_bytes": None, "added_columns": ["_min", "_max", "_mid"]},
+    "to_categorical": {"scope": "column", "ns_per_cell": 150, "ns_per_char": 2, "memory_factor": 0.5, "output_bytes": CATEGORY_CODE_BYTES},
+    "downcast_numeric": {"scope": "column", "ns_per_cell": 40, "ns_per_char": 0, "memory_factor": 0.5, "output_bytes": NUMERIC_CELL_BYTES // 2},
+    "remove_near_duplicates": {"scope": "text_columns", "ns_per_cell": 300, "ns_per_char": 65, "memory_factor": 3.0, "output_bytes": None},
+}
+
+DEFAULT_COST_MODEL = {"scope": "frame", "ns_per_cell": 500, "ns_per_char": 0, "memory_factor": 1.0, "output_bytes": None}
+
+
+class PlanBudgetError(Exception):
+    pass
+
+
+# ======================================================
+# CALIBRATION STORE
+# ======================================================
+
+def load_calibration(path: str = COST_MODEL_PATH) -> Dict[str, Dict[str, float]]:
+    """
+    Per-tool correction factors learned from actual executions.
+    """
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_calibration(calibration: Dict[str, Dict[str, float]], path: str = COST_MODEL_PATH) -> None:
+    """
+    Replaces the calibration file atomically (temp file + os.replace), so
+    readers never see a partial file.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(calibration, f, indent=2)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+@contextmanager
+def _calibration_lock(path: str) -> Iterator[None]:
+    """
+    Exclusive flock on a sidecar file for a read-modify-write of the
+    calibration. Serializes job worker threads as well as processes:
+    each holder opens its own file description.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    with open(f"{path}.lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+# ======================================================
+# ESTIMATION
+# ======================================================
+
+def _initial_state(profile: Dict[str, Any]) -> Dict[str, Any]:
+    columns = {}
+    for col, meta in profile.get("columns", {}).items():
+        dtype = meta.get("dtype")
+        is_text = is_text_dtype_name(dtype)
+        avg_len = meta.get("avg_string_length", 0.0) if is_text else 0.0
+        if not is_text:
+            bytes_per_cell = NUMERIC_CELL_BYTES
+        elif dtype == "object":
+            bytes_per_cell = STR_OBJECT_BYTES + avg_len
+        else:
+            bytes_per_cell = ARROW_STR_OFFSET_BYTES + avg_len
+        columns[col] = {
+            "is_text": is_text,
+            # Only NumPy object columns are dictionary-encoded
+            "is_object": dtype == "object",
+            "avg_len": avg_len,
+            "bytes_per_cell": bytes_per_cell,
+            "unique_count": meta.get("unique_count"),
+        }
+
+    dataset = profile.get("dataset", {})
+    return {
+        "rows": dataset.get("rows", 0),
+        "duplicate_rows": dataset.get("duplicate_rows", 0),
+        "columns": columns,
+    }
+
+
+def _step_scope(step: Dict[str, Any], model: Dict[str, Any], state: Dict[str, Any]) -> List[str]:
+    args = step.get("args", {})
+    if args.get("column"):
+        return [args["column"]] if args["column"] in state["columns"] else []
+    if args.get("columns"):
+        return [c for c in args["columns"] if c in state["columns"]]
+    if model["scope"] == "text_columns":
+        return [c for c, meta in state["columns"].items() if meta["is_text"]]
+    if model["scope"] == "frame":
+        return list(state["columns"])
+    return []
+
+
+def _column_ns(name: str, model: Dict[str, Any], meta: Dict[str, Any], rows: int) -> float:
+    per_value = model["ns_per_cell"] + meta["avg_len"] * model["ns_per_char"]
+    unique = meta.get("unique_count")
+
+    dict_encoded = name in ALWAYS_DICT_ENCODED_TOOLS and unique is not None
+    dict_encoded = dict_encoded or (
+        name in DICT_ENCODED_TOOLS
+        and meta.get("is_object", False)
+        and unique is not None
+        and rows >= DICT_ENCODE_MIN_ROWS
+        and unique <= DICT_ENCODE_MAX_UNIQUE_RATIO * rows
+        and (DICT_ENCODED_TOOLS[name] is None or meta["avg_len"] <= DICT_ENCODED_TOOLS[name])
+    )
+    if not dict_encoded:
+        return rows * per_value
+
+    factorize = rows * (FACTORIZE_NS_PER_CELL + meta["avg_len"] * FACTORIZE_NS_PER_CHAR)
+    return factorize + unique * per_value
+
+
+def estimate_plan_cost(
+    plan: Dict[str, Any],
+    profile: Dict[str, Any],
+    calibration: Optional[Dict[str, Dict[str, float]]] = None,
+) -> Dict[str, Any]:
+    """
+    Predicts runtime and peak memory of each step from profile fields
+    (rows, memory_mb, avg_string_length, unique_count, dtypes) and the
+    per-tool models. Dictionary-encoded tools are costed per distinct value.
+
+    Peak memory follows copy-on-write execution: the input frame plus every
+    column replaced so far plus the running step's transient buffers.
+    """
+
+    logger.debug("Entering estimate_plan_cost")
+    if calibration is None:
+        calibration = load_calibration()
+
+    state = _initial_state(profile)
+    base_mb = profile.get("dataset", {}).get("memory_mb", 0.0)
+    replaced_mb = 0.0
+    peak_mb = base_mb
+    total_seconds = 0.0
+    steps_estimate = []
+
+    for step in plan.get("steps", []):
+        name = step.get("name")
+        model = TOOL_COST_MODELS.get(name, DEFAULT_COST_MODEL)
+        scale = calibration.get(name, {})
+        rows = state["rows"]
+        scope = _step_scope(step, model, state)
+
+        ns = sum(_column_ns(name, model, state["columns"][c], rows) for c in scope)
+        seconds = (STEP_OVERHEAD_SECONDS + ns / 1e9) * scale.get("time_scale", 1.0)
+
+        in_bytes = rows * sum(state["columns"][c]["bytes_per_cell"] for c in scope)
+        transient_mb = in_bytes * model["memory_factor"] * scale.get("memory_scale", 1.0) / (1024 ** 2)
+
+        # -------- Apply the step's effect to the simulated frame --------
+        if name == "drop_column":
+            state["columns"].pop(step.get("args", {}).get("column"), None)
+        elif name == "remove_duplicates":
+            state["rows"] = max(rows - state["duplicate_rows"], 0)
+            state["duplicate_rows"] = 0
+            replaced_mb += in_bytes / (1024 ** 2)
+        elif model["output_bytes"] is not None:
+            for c in scope:
+                state["columns"][c] = {
+                    "is_text": False,
+                    "avg_len": 0.0,
+                    "bytes_per_cell": model["output_bytes"],
+                    "unique_count": state["columns"][c]["unique_count"],
+                }
+            replaced_mb += rows * len(scope) * model["output_bytes"] / (1024 ** 2)
+        elif model.get("added_columns"):
+            for c in scope:
+                for suffix in model["added_columns"]:
+                    state["columns"][f"{c}{suffix}"] = {
+                        "is_text": False,
+                        "avg_len": 0.0,
+                        "bytes_per_cell": NUMERIC_CELL_BYTES,
+                        "unique_count": state["columns"][c]["unique_count"],
+                    }
+            replaced_mb += rows * len(scope) * len(model["added_columns"]) * NUMERIC_CELL_BYTES / (1024 ** 2)
+        elif scope:
+            replaced_mb += in_bytes / (1024 ** 2)
+
+        step_peak = base_mb + replaced_mb + transient_mb
+        peak_mb = max(peak_mb, step_peak)
+        total_seconds += seconds
+
+        steps_estimate.append({
+            "step": step,
+            "est_seconds": round(seconds, 6),
+            "est_peak_memory_mb": round(step_peak, 3),
+            "est_step_memory_mb": round(transient_mb, 3),
+            "cells": rows * len(scope),
+        })
+
+    return {
+        "steps": steps_estimate,
+        "total_seconds": round(total_seconds, 6),
+        "peak_memory_mb": round(peak_mb, 3),
+        "base_memory_mb": round(base_mb, 3),
+    }
+
+
+def check_budget(
+    estimate: Dict[str, Any],
+    max_seconds: float = MAX_PLAN_SECONDS,
+    max_memory_mb: float = MAX_PLAN_MEMORY_MB,
+) -> Optional[str]:
+    """
+    Returns "time" or "memory" for the first exceeded budget, else None.
+    The memory budget applies to the plan's working memory on top of the
+    input frame, which is already resident when a plan is costed.
+    """
+    if max_seconds and estimate["total_seconds"] > max_seconds:
+        return "time"
+    if max_memory_mb and working_memory_mb(estimate) > max_memory_mb:
+        return "memory"
+    return None
+
+
+def working_memory_mb(estimate: Dict[str, Any]) -> float:
+    """
+    Peak memory of a plan estimate beyond its input frame.
+    """
+    return max(estimate["peak_memory_mb"] - estimate.get("base_memory_mb", 0.0), 0.0)
+
+
+# ======================================================
+# RECALIBRATION
+# ======================================================
+
+def compare_with_actuals(
+    estimate: Dict[str, Any],
+    execution_log: List[Dict[str, Any]],
+) -> List[Dict[str, Any]]:
+    """
+    Pairs each step estimate with the instrumented actuals of the same step.
+    """
+    comparison = []
+    for est, entry in zip(estimate["steps"], execution_log):
+        if entry.get("step", {}).get("name") != est["step"].get("name"):
+            continue
+        comparison.append({
+            "tool": est["step"].get("name"),
+            "status": entry.get("status"),
+            "est_seconds": est["est_seconds"],
+            "actual_seconds": entry.get("wall_time_s"),
+            "est_step_memory_mb": est["est_step_memory_mb"],
+            "actual_step_memory_mb": entry.get("peak_memory_mb"),
+            "memory_source": entry.get("memory_source"),
+        })
+    return comparison
+
+
+def _ema_scale(scale: float, actual: float, estimate: float) -> float:
+    ratio = actual / max(estimate, 1e-9)
+    return min(max(scale * (1 + CALIBRATION_ALPHA * (ratio - 1)), 0.01), 100.0)
+
+
+def recalibrate(
+    comparison: List[Dict[str, Any]],
+    path: str = COST_MODEL_PATH,
+) -> Dict[str, Dict[str, float]]:
+    """
+    Moves each tool's time and memory scales towards the observed
+    actual/estimate ratios (exponential moving average) and persists them.
+    Memory is only calibrated from tracemalloc measurements; RSS deltas
+    say nothing about steps below an earlier high-water mark, and steps
+    of a parallel batch (memory_source "shared") were not measured alone.
+    """
+    logger.debug("Entering recalibrate")
+    with _calibration_lock(path):
+        calibration = load_calibration(path)
+        _apply_comparison(calibration, comparison)
+        save_calibration(calibration, path)
+    return calibration
+
+
+def _apply_comparison(
+    calibration: Dict[str, Dict[str, float]],
+    comparison: List[Dict[str, Any]],
+) -> None:
+    for row in comparison:
+        actual = row.get("actual_seconds")
+        if row["status"] != "success" or not actual or actual < MIN_CALIBRATION_SECONDS:
+            continue
+
+        tool = calibration.setdefault(row["tool"], {"time_scale": 1.0, "memory_scale": 1.0, "samples": 0})
+        tool["time_scale"] = _ema_scale(tool.get("time_scale", 1.0), actual, row["est_seconds"])
+
+        if row.get("memory_source") == "tracemalloc" and row.get("est_step_memory_mb"):
+            tool["memory_scale"] = _ema_scale(
+                tool.get("memory_scale", 1.0), row["actual_step_memory_mb"], row["est_step_memory_mb"]
+            )
+        tool["samples"] = tool.get("samples", 0) + 1
@@ -0,0 +1,211 @@
+import logging
+import resource
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Callable, Dict, Any, Iterator, Optional, Set
+
+import numpy as np
+import pandas as pd
+
+from etl.executor.tracing import span
+from etl.transform.dtypes import is_text_dtype
+
+logger = logging.getLogger(__name__)
+
+
+# =====================================================
+# Cell-level diff
+# =====================================================
+
+def _shares_data(a: pd.Series, b: pd.Series) -> bool:
+    """
+    True if both series are backed by the same data, which is how
+    copy-on-write execution leaves columns a step did not touch.
+    """
+    if a.array is b.array:
+        return True
+    if isinstance(a.dtype, np.dtype) and isinstance(b.dtype, np.dtype) and a.dtype == b.dtype:
+        return np.shares_memory(a.to_numpy(), b.to_numpy())
+    return False
+
+
+def _is_string_to_typed(before: pd.Series, after: pd.Series) -> bool:
+    """
+    True for conversions such as str -> float or str -> datetime, where a
+    value can never compare equal to its converted form.
+    """
+    return (
+        is_text_dtype(before.dtype)
+        and (
+            pd.api.types.is_numeric_dtype(after)
+            or pd.api.types.is_datetime64_any_dtype(after)
+        )
+        and pd.api.types.infer_dtype(before, skipna=True) == "string"
+    )
+
+
+def count_changed_cells(df_before: pd.DataFrame, df_after: pd.DataFrame) -> Optional[int]:
+    """
+    Number of cells whose value changed (including type changes such as
+    "5" -> 5.0) across columns present in both frames. Columns sharing data
+    are skipped without a scan. Returns None when the row count changed,
+    since rows can no longer be aligned.
+    """
+    if len(df_before) != len(df_after):
+        return None
+
+    changed = 0
+    common = [c for c in df_after.columns if c in df_before.columns]
+    for col in common:
+        before = df_before[col]
+        after = df_after[col]
+        if not isinstance(before, pd.Series) or not isinstance(after, pd.Series):
+            continue
+        if _shares_data(before, after):
+            continue
+
+        before_na = before.isna().to_numpy()
+        after_na = after.isna().to_numpy()
+        both = ~(before_na | after_na)
+
+        changed += int((before_na ^ after_na).sum())
+        if _is_string_to_typed(before, after):
+            # Every parsed value is a type change; skip boxing the values
+            changed += int(both.sum())
+            continue
+        if isinstance(before.dtype, pd.ArrowDtype) and before.dtype == after.dtype:
+            # Compared by an Arrow kernel; null where either side is null
+            not_equal = before.array != after.array
+            changed += int(not_equal.to_numpy(dtype=bool, na_value=False).sum())
+            continue
+        changed += int(
+            (before.to_numpy(dtype=object)[both] != after.to_numpy(dtype=object)[both]).sum()
+        )
+
+    return changed
+
+
+def changed_columns(df_before: pd.DataFrame, df_after: pd.DataFrame) -> Optional[Set[str]]:
+    """
+    Columns of `df_after` that are new or no longer share data with the
+    same column of `df_before`. Returns None when the row count changed,
+    since every column may then differ.
+    """
+    if len(df_before) != len(df_after):
+        return None
+
+    changed = set()
+    for col in df_after.columns:
+        if col not in df_before.columns:
+            changed.add(col)
+            continue
+        before = df_before[col]
+        after = df_after[col]
+        if not isinstance(before, pd.Series) or not isinstance(after, pd.Series):
+            changed.add(col)
+        elif not _shares_data(before, after):
+            changed.add(col)
+    return changed
+
+
+# =====================================================
+# Step metering
+# =====================================================
+
+def _max_rss_mb() -> float:
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class StepMeter:
+    """
+    Measures one step: wall time, CPU time of the running thread, peak
+    memory and row / cell deltas.
+
+    Peak memory comes from tracemalloc when it is tracing (exact peak of
+    allocations during the step), otherwise from growth of the process
+    peak RSS (0 when the step stayed below an earlier high-water mark).
+    """
+
+    def __init__(self, df_in: pd.DataFrame):
+        self.df_in = df_in
+        self.tracing = tracemalloc.is_tracing()
+        if self.tracing:
+            tracemalloc.reset_peak()
+            self._mem_start = tracemalloc.get_traced_memory()[0]
+        else:
+            self._mem_start = _max_rss_mb()
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.thread_time()
+
+    def finish(self, df_out: pd.DataFrame, count_cells: bool = True) -> Dict[str, Any]:
+        wall = time.perf_counter() - self._wall_start
+        cpu = time.thread_time() - self._cpu_start
+
+        if self.tracing:
+            peak = (tracemalloc.get_traced_memory()[1] - self._mem_start) / (1024 ** 2)
+            source = "tracemalloc"
+        else:
+            peak = _max_rss_mb() - self._mem_start
+            source = "rss_delta"
+
+        return {
+            "wall_time_s": round(wall, 6),
+            "cpu_time_s": round(cpu, 6),
+            "peak_memory_mb": round(max(peak, 0.0), 3),
+            "memory_source": source,
+            "rows_in": len(self.df_in),
+            "rows_out": len(df_out),
+            "cells_changed": count_changed_cells(self.df_in, df_out) if count_cells else None,
+        }
+
+
+def merge_step_metrics(total: Dict[str, Any], entry: Dict[str, Any]) -> None:
+    """
+    Folds the metrics of another execution of the same step (e.g. on the
+    next chunk in streaming mode) into `total`.
+    """
+    for key in ("wall_time_s", "cpu_time_s", "rows_in", "rows_out", "parse_failures", "bytes_saved"):
+        if key in entry:
+            total[key] = total.get(key, 0) + entry[key]
+    if "peak_memory_mb" in entry:
+        total["peak_memory_mb"] = max(total.get("peak_memory_mb", 0.0), entry["peak_memory_mb"])
+    if total.get("cells_changed") is not None and entry.get("cells_changed") is not None:
+        total["cells_changed"] += entry["cells_changed"]
+    else:
+        total["cells_changed"] = None
+
+
+# =====================================================
+# Pipeline stage timing
+# =====================================================
+
+class StageTimer:
+    """
+    Accumulates wall time per pipeline stage (read, profile, plan,
+    execute, validate, write) across iterations. `on_stage` is called with
+    the stage name as each stage starts; an exception it raises aborts
+    the stage. Each stage is also a span of the run's trace.
+    """
+
+    def __init__(self, on_stage: Optional[Callable[[str], None]] = None):
+        self.timings: Dict[str, float] = {}
+        self.on_stage = on_stage
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        if self.on_stage is not None:
+            self.on_stage(name)
+        start = time.perf_counter()
+        try:
+            with span(name):
+                yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+
+    def summary(self) -> Dict[str, float]:
+        summary = {name: round(seconds, 4) for name, seconds in self.timings.items()}
+        summary["total"] = round(time.perf_counter() - self._start, 4)
+        return summary
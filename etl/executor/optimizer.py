@@ -0,0 +1,314 @@
+import logging
+from typing import Dict, Any, List, Optional, Set
+
+from etl.executor.tool_executor import (
+    COLUMN_TOOLS,
+    IDEMPOTENT_TOOLS,
+    ROW_LOCAL_TOOLS,
+)
+
+logger = logging.getLogger(__name__)
+
+# Whole-frame tools that transform every text column independently
+# (no cross-column or cross-row effects)
+PER_COLUMN_FRAME_TOOLS = {"standardize_missing", "trim_whitespace"}
+
+
+# =====================================================
+# Step helpers
+# =====================================================
+
+def _step_column(step: Dict[str, Any]) -> Optional[str]:
+    if step.get("name") not in COLUMN_TOOLS:
+        return None
+    return step.get("args", {}).get("column")
+
+
+def _touched_columns(step: Dict[str, Any]) -> Optional[Set[str]]:
+    """
+    Columns a step reads or writes, or None if it may touch any column.
+    """
+    name = step.get("name")
+    args = step.get("args", {})
+
+    col = _step_column(step)
+    if col:
+        return {col}
+    if name == "drop_column" and args.get("column"):
+        return {args["column"]}
+    if name == "trim_whitespace" and args.get("columns"):
+        return set(args["columns"])
+    return None
+
+
+def _is_per_column_frame_step(step: Dict[str, Any]) -> bool:
+    return (
+        step.get("name") in PER_COLUMN_FRAME_TOOLS
+        and _touched_columns(step) is None
+    )
+
+
+def _step_key(step: Dict[str, Any]) -> str:
+    args = step.get("args", {})
+    return f"{step.get('name')}:{sorted(args.items(), key=lambda kv: kv[0])}"
+
+
+# =====================================================
+# Rewrite passes
+# =====================================================
+
+def _prune_dropped_column_steps(
+    steps: List[Dict[str, Any]], notes: List[str]
+) -> List[Dict[str, Any]]:
+    """
+    Removes column steps whose column is dropped later, as long as no
+    row- or name-dependent step (remove_duplicates, clean_column_names)
+    observes the column in between.
+    """
+    kept = []
+    for i, step in enumerate(steps):
+        col = _step_column(step)
+        pruned = False
+
+        if col:
+            for later in steps[i + 1:]:
+                if later.get("name") == "drop_column" and later.get("args", {}).get("column") == col:
+                    pruned = True
+                    break
+                if _touched_columns(later) is not None or _is_per_column_frame_step(later):
+                    continue
+                break
+
+        if pruned:
+            notes.append(f"pruned {step['name']} on '{col}' (column is dropped later)")
+        else:
+            kept.append(step)
+
+    return kept
+
+
+def _hoist_drops(
+    steps: List[Dict[str, Any]], notes: List[str]
+) -> List[Dict[str, Any]]:
+    """
+    Moves drop_column steps as early as possible so later steps process
+    a narrower frame.
+    """
+    result: List[Dict[str, Any]] = []
+    for step in steps:
+        if step.get("name") != "drop_column":
+            result.append(step)
+            continue
+
+        col = step.get("args", {}).get("column")
+        pos = len(result)
+        while pos > 0:
+            prev = result[pos - 1]
+            touched = _touched_columns(prev)
+            if prev.get("name") == "drop_column":
+                break
+            if touched is not None and col not in touched:
+                pos -= 1
+                continue
+            if _is_per_column_frame_step(prev):
+                pos -= 1
+                continue
+            break
+
+        if pos < len(result):
+            notes.append(f"moved drop_column '{col}' from step {len(result) + 1} to step {pos + 1}")
+        result.insert(pos, step)
+
+    return result
+
+
+def _dedupe_repeated_steps(
+    steps: List[Dict[str, Any]], notes: List[str]
+) -> List[Dict[str, Any]]:
+    """
+    Removes repeats of idempotent steps when nothing in between changed
+    the data they act on.
+    """
+    kept: List[Dict[str, Any]] = []
+    # column -> keys of idempotent column steps applied since it last changed
+    applied: Dict[str, Set[str]] = {}
+
+    for step in steps:
+        name = step.get("name")
+        key = _step_key(step)
+        col = _step_column(step)
+
+        if col:
+            if name in IDEMPOTENT_TOOLS and key in applied.get(col, set()):
+                notes.append(f"removed repeated {name} on '{col}'")
+                continue
+            applied[col] = {key} if name in IDEMPOTENT_TOOLS else set()
+            kept.append(step)
+            continue
+
+        if kept and name in IDEMPOTENT_TOOLS and _step_key(kept[-1]) == key:
+            notes.append(f"removed repeated {name}")
+            continue
+
+        touched = _touched_columns(step)
+        if touched is None:
+            applied.clear()
+        else:
+            for c in touched:
+                applied.pop(c, None)
+        kept.append(step)
+
+    return kept
+
+
+def _prune_redundant_trims(
+    steps: List[Dict[str, Any]], notes: List[str]
+) -> List[Dict[str, Any]]:
+    """
+    Drops trim_whitespace steps whose effect is already guaranteed:
+    after standardize_missing (which strips every text column and, having
+    no column argument, is never skipped by the safety checks).
+
+    A trim right before normalize_currency is kept: safety checks can skip
+    the currency step at run time, and the column must still be trimmed.
+    """
+    kept: List[Dict[str, Any]] = []
+    # whether standardize_missing ran, and which columns changed since
+    stripped_all = False
+    touched_since: Set[str] = set()
+
+    for step in steps:
+        name = step.get("name")
+        col = _step_column(step)
+
+        if name == "trim_whitespace" and col:
+            if stripped_all and col not in touched_since:
+                notes.append(f"removed trim_whitespace on '{col}' (already stripped by standardize_missing)")
+                continue
+
+        if name == "standardize_missing":
+            stripped_all = True
+            touched_since = set()
+        else:
+            touched = _touched_columns(step)
+            if touched is None and not _is_per_column_frame_step(step):
+                stripped_all = False
+            elif touched:
+                touched_since |= touched
+
+        kept.append(step)
+
+    return kept
+
+
+def _hoist_remove_duplicates(
+    steps: List[Dict[str, Any]],
+    profile: Dict[str, Any],
+    notes: List[str],
+) -> List[Dict[str, Any]]:
+    """
+    When the raw data has duplicate rows, runs an extra remove_duplicates
+    before any costly row-local work. The original step stays in place to
+    catch duplicates the transformations create, so results are unchanged.
+    """
+    if profile.get("dataset", {}).get("duplicate_rows", 0) <= 0:
+        return steps
+
+    for idx, step in enumerate(steps):
+        if step.get("name") == "remove_duplicates":
+            break
+        if step.get("name") not in ROW_LOCAL_TOOLS:
+            return steps
+    else:
+        return steps
+
+    # Insert after leading renames/drops: dropping a column (e.g. an index)
+    # can expose duplicates that the full-width rows would hide
+    insert_at = 0
+    while insert_at < idx and steps[insert_at].get("name") in ("clean_column_names", "drop_column"):
+        insert_at += 1
+
+    if insert_at == idx:
+        return steps
+
+    notes.append(
+        f"added early remove_duplicates at step {insert_at + 1} "
+        f"(original at step {idx + 1} kept)"
+    )
+    early = {"type": "tool", "name": "remove_duplicates", "args": {}}
+    return steps[:insert_at] + [early] + steps[insert_at:]
+
+
+def _fuse_trims(
+    steps: List[Dict[str, Any]], notes: List[str]
+) -> List[Dict[str, Any]]:
+    """
+    Fuses consecutive per-column trim_whitespace steps into one step
+    that strips all their columns in a single pass.
+    """
+    fused: List[Dict[str, Any]] = []
+    for step in steps:
+        col = _step_column(step) if step.get("name") == "trim_whitespace" else None
+        prev = fused[-1] if fused else None
+
+        if col and prev is not None and prev.get("fused"):
+            if col not in prev["args"]["columns"]:
+                prev["args"]["columns"].append(col)
+            continue
+
+        prev_col = _step_column(prev) if prev is not None and prev.get("name") == "trim_whitespace" else None
+        if col and prev_col:
+            fused[-1] = {
+                "type": "tool",
+                "name": "trim_whitespace",
+                "args": {"columns": [prev_col] if col == prev_col else [prev_col, col]},
+                "fused": True,
+            }
+            continue
+
+        fused.append(step)
+
+    for step in fused:
+        if step.pop("fused", False):
+            notes.append(f"fused trim_whitespace on {step['args']['columns']} into one pass")
+
+    return fused
+
+
+# =====================================================
+# Public API
+# =====================================================
+
+def optimize_plan(
+    plan: Dict[str, Any],
+    profile: Dict[str, Any],
+) -> Dict[str, Any]:
+    """
+    Rewrites a validated plan into a cheaper, semantically identical one.
+
+    Returns a new plan; the rewrites applied are listed under
+    "optimizations". The input plan is not modified.
+    """
+
+    logger.debug("Entering optimize_plan")
+    steps = [
+        {**step, "args": dict(step.get("args", {}))}
+        for step in plan.get("steps", [])
+    ]
+    notes: List[str] = []
+
+    steps = _prune_dropped_column_steps(steps, notes)
+    steps = _hoist_drops(steps, notes)
+    steps = _dedupe_repeated_steps(steps, notes)
+    steps = _prune_redundant_trims(steps, notes)
+    steps = _hoist_remove_duplicates(steps, profile, notes)
+    steps = _fuse_trims(steps, notes)
+
+    for note in notes:
+        logger.debug("Plan optimization: %s", note)
+
+    return {
+        **plan,
+        "steps": steps,
+        "optimizations": notes,
+    }
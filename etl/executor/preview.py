@@ -0,0 +1,143 @@
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+
+from etl.executor.tool_executor import find_failing_step
+from etl.validate.expectations import compile_expectations
+from etl.validate.validator import ValidationError, collect_frame_stats, validate_stats
+
+logger = logging.getLogger(__name__)
+
+# Rows of the stratified sample a preview runs on
+PREVIEW_SAMPLE_ROWS = int(os.getenv("ETL_PREVIEW_SAMPLE_ROWS", "500"))
+
+# Changed cells listed in a preview
+PREVIEW_MAX_CHANGES = 50
+
+
+def _cell(value: Any) -> Optional[str]:
+    return None if pd.isna(value) else str(value)
+
+
+def cell_changes(
+    before: pd.DataFrame,
+    after: pd.DataFrame,
+    limit: int = PREVIEW_MAX_CHANGES,
+) -> List[Dict[str, Any]]:
+    """
+    Up to `limit` cells whose value changed, as before/after pairs.
+    Rows are matched by position, so frames must have the same rows;
+    columns are matched by position when the column count is unchanged
+    (renames) and by name otherwise.
+    """
+    if len(before.columns) == len(after.columns):
+        pairs = list(zip(before.columns, after.columns))
+    else:
+        pairs = [(c, c) for c in before.columns if c in after.columns]
+
+    changes: List[Dict[str, Any]] = []
+    for col_before, col_after in pairs:
+        old = before[col_before]
+        new = after[col_after]
+        if old.array is new.array:
+            continue
+        old_text = old.astype(object).where(old.notna(), None).to_numpy()
+        new_text = new.astype(object).where(new.notna(), None).to_numpy()
+        for pos in range(len(old_text)):
+            if len(changes) >= limit:
+                return changes
+            if _cell(old_text[pos]) != _cell(new_text[pos]):
+                changes.append({
+                    "row": int(before.index[pos]),
+                    "column": col_after,
+                    "before": _cell(old_text[pos]),
+                    "after": _cell(new_text[pos]),
+                })
+    return changes
+
+
+def null_deltas(stats_before: Dict[str, Any], stats_after: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
+    """
+    Null percentage per column before and after, for columns present in
+    both; only columns whose percentage changed are listed.
+    """
+    deltas = {}
+    for col, after_nulls in stats_after["null_counts"].items():
+        if col not in stats_before["null_counts"]:
+            continue
+        before_pct = stats_before["null_counts"][col] / max(stats_before["rows"], 1) * 100
+        after_pct = after_nulls / max(stats_after["rows"], 1) * 100
+        if round(after_pct - before_pct, 4) != 0:
+            deltas[col] = {
+                "before_pct": round(before_pct, 2),
+                "after_pct": round(after_pct, 2),
+                "delta_pct": round(after_pct - before_pct, 2),
+            }
+    return deltas
+
+
+def preview_on_sample(
+    sample: pd.DataFrame,
+    run: Callable[[pd.DataFrame], Dict[str, Any]],
+    steps: List[Dict[str, Any]],
+    expectations: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Runs a transformation on a (stratified) sample and projects what the
+    full run would do: changed cells, per-column null deltas, row loss,
+    the validator's verdict and, with an expectations spec, its report.
+
+    `run(frame)` returns {"df": ..., "log": ...} like execute_plan; when
+    it also returns "step_stats", a failing verdict names the step that
+    caused it. `steps` are the plan steps, for planned column drops.
+    """
+    logger.debug("Entering preview_on_sample: rows=%d steps=%d", len(sample), len(steps))
+    start = time.perf_counter()
+
+    result = run(sample)
+    after = result["df"]
+    stats_before = collect_frame_stats(sample)
+    stats_after = collect_frame_stats(after)
+
+    validation: Dict[str, Any] = {"passed": True, "error": None, "failing_step": None}
+    try:
+        validate_stats(stats_before, stats_after, {"steps": steps})
+    except ValidationError as e:
+        validation.update(passed=False, error=str(e))
+        if result.get("step_stats"):
+            def validate(stats: Dict[str, Any], modified: Any, applied: List[Dict[str, Any]]) -> None:
+                validate_stats(stats_before, stats, {"steps": applied}, modified_columns=modified)
+
+            found = find_failing_step(result["step_stats"], steps, validate)
+            if found is not None:
+                validation["failing_step"] = steps[found[0]]
+
+    # Same column count: names changed in place (clean_column_names)
+    if len(after.columns) == len(sample.columns):
+        removed = []
+    else:
+        removed = [c for c in sample.columns if c not in after.columns]
+
+    preview: Dict[str, Any] = {
+        "sample_rows": len(sample),
+        "rows_after": len(after),
+        "row_loss_pct": round((len(sample) - len(after)) / max(len(sample), 1) * 100, 2),
+        "columns_removed": removed,
+        "changes": cell_changes(sample, after) if len(after) == len(sample) else [],
+        "null_deltas": null_deltas(stats_before, stats_after),
+        "validation": validation,
+        "log": [
+            {k: entry.get(k) for k in ("step", "status", "reason", "error") if k in entry}
+            for entry in result.get("log", [])
+        ],
+    }
+    if expectations is not None:
+        suite = compile_expectations(expectations)
+        suite.evaluate(after)
+        preview["expectations"] = suite.report()
+
+    preview["elapsed_s"] = round(time.perf_counter() - start, 4)
+    return preview
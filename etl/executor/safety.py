@@ -1,9 +1,16 @@
+import ast
 import logging
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, List, Tuple
 import pandas as pd
 
+from etl.transform.near_duplicates import NEAR_DUP_THRESHOLD
+
 logger = logging.getLogger(__name__)
 
+# Above this share of distinct values a categorical saves little or
+# costs more than the plain column
+CATEGORICAL_MAX_CARDINALITY_RATIO = 0.5
+
 
 def is_tool_safe(
     df: pd.DataFrame,
@@ -23,6 +30,17 @@ def is_tool_safe(
     if col and col not in df.columns:
         return False, f"Column '{col}' does not exist"
 
+    # ❌ Near-duplicate detection on missing or unusable columns
+    if tool == "remove_near_duplicates":
+        listed = list(args.get("columns") or []) + list(args.get("blocking_keys") or [])
+        missing = [c for c in listed if c not in df.columns]
+        if missing:
+            return False, f"Columns {missing} do not exist"
+
+        threshold = args.get("threshold", NEAR_DUP_THRESHOLD)
+        if not isinstance(threshold, (int, float)) or not 0.5 <= threshold <= 1:
+            return False, "remove_near_duplicates threshold must be between 0.5 and 1"
+
     if not col:
         return True, ""
 
@@ -41,14 +59,201 @@ def is_tool_safe(
         if meta.get("avg_string_length", 0) > 20:
             return False, "normalize_currency blocked: long text"
 
+    # ❌ Range parsing without currency evidence
+    if tool == "parse_currency_range":
+        if not meta.get("contains_currency_symbols"):
+            return False, "parse_currency_range without contains_currency_symbols"
+
+        if meta.get("avg_string_length", 0) > 40:
+            return False, "parse_currency_range blocked: long text"
+
     # ❌ Datetime parsing without semantic evidence
     if tool == "parse_datetime":
         if meta.get("semantic_type") != "datetime":
             return False, "Datetime parsing without semantic_type=datetime"
 
+    # ❌ Categorical encoding of high-cardinality or identifier columns
+    if tool == "to_categorical":
+        if meta.get("is_index_like") or meta.get("semantic_type") == "index":
+            return False, "to_categorical blocked: index-like column"
+
+        if meta.get("cardinality_ratio", 1.0) > CATEGORICAL_MAX_CARDINALITY_RATIO:
+            return False, f"to_categorical without cardinality_ratio <= {CATEGORICAL_MAX_CARDINALITY_RATIO}"
+
+    # ❌ Downcasting a column that is not numeric (yet)
+    if tool == "downcast_numeric":
+        if not pd.api.types.is_numeric_dtype(df[col]) or pd.api.types.is_bool_dtype(df[col]):
+            return False, "downcast_numeric on a non-numeric column"
+
     # ❌ Numeric conversion without numeric evidence
     if tool == "convert_numeric":
         if meta.get("numeric_string_ratio", 0) < 0.5:
             return False, "Numeric conversion without numeric_string_ratio >= 0.5"
 
     return True, ""
+
+
+# Builtins visible to code steps (code_executor.SAFE_BUILTINS)
+CODE_STEP_BUILTINS = (
+    "abs", "all", "any", "bool", "dict", "enumerate", "filter", "float",
+    "int", "isinstance", "len", "list", "map", "max", "min", "range",
+    "round", "set", "sorted", "str", "sum", "tuple", "zip",
+    "Exception", "ValueError", "TypeError", "KeyError",
+)
+
+# Code steps only see `df`, CODE_STEP_BUILTINS and these pandas/NumPy
+# functions, bound to the names `pd` and `np` (the modules themselves are
+# never exposed)
+CODE_STEP_FUNCTIONS = {
+    "pd": {
+        "to_numeric", "to_datetime", "to_timedelta", "isna", "notna",
+        "NA", "NaT", "concat", "cut",
+    },
+    "np": {
+        "where", "select", "nan", "inf", "isnan", "abs", "round", "floor",
+        "ceil", "clip", "sqrt", "log", "log1p", "exp", "maximum", "minimum",
+    },
+}
+
+# Attributes code steps may use on any other object: DataFrame, Series and
+# Index methods and the .str/.dt/.cat accessors. Everything else (dunders,
+# I/O such as to_csv or savetxt, eval/query, reflection) is rejected
+CODE_STEP_ATTRIBUTES = {
+    # Selection and shape
+    "loc", "iloc", "at", "iat", "columns", "index", "dtypes", "dtype",
+    "shape", "size", "empty", "name", "values", "head", "tail", "get",
+    "keys", "items",
+    # Cleaning
+    "copy", "astype", "fillna", "ffill", "bfill", "dropna", "drop",
+    "drop_duplicates", "duplicated", "rename", "replace", "where", "mask",
+    "isna", "isnull", "notna", "notnull", "isin", "between", "clip",
+    "round", "abs", "apply", "map", "assign", "insert", "pop",
+    "combine_first", "infer_objects", "convert_dtypes", "explode",
+    # Reshaping and aggregation
+    "groupby", "agg", "transform", "sort_values", "sort_index",
+    "reset_index", "set_index", "merge", "join", "melt", "unique",
+    "nunique", "value_counts", "sum", "mean", "median", "min", "max",
+    "std", "count", "cumsum", "any", "all", "idxmin", "idxmax", "mode",
+    "first", "last", "shift", "diff", "rank", "nlargest", "nsmallest",
+    # Conversion to in-memory values
+    "to_list", "tolist", "to_numpy", "to_dict", "to_frame", "to_period",
+    "to_timestamp", "item", "append", "update", "split",
+    # String accessor
+    "str", "strip", "lstrip", "rstrip", "lower", "upper", "title",
+    "capitalize", "casefold", "len", "contains", "startswith", "endswith",
+    "match", "fullmatch", "extract", "findall", "slice", "pad", "zfill",
+    "isdigit", "isnumeric", "isalpha",
+    # Datetime and categorical accessors
+    "dt", "year", "month", "day", "hour", "minute", "second", "date",
+    "dayofweek", "normalize", "strftime", "tz_localize", "tz_convert",
+    "floor", "ceil", "cat", "categories", "codes",
+}
+
+
+# Methods that take a function to call. pandas resolves a function given
+# by name with getattr on the frame or on NumPy, so df.agg("to_csv", ...)
+# would reach attributes the allowlist rejects
+CODE_STEP_HIGHER_ORDER = {"apply", "agg", "aggregate", "transform", "map"}
+
+# Function names those methods may be given as strings
+CODE_STEP_STRING_FUNCTIONS = {
+    "sum", "mean", "median", "min", "max", "std", "var", "count", "size",
+    "nunique", "first", "last", "any", "all", "prod", "cumsum", "idxmin",
+    "idxmax",
+}
+
+# Names a code step may not rebind: a rebound builtin passed as a function
+# (str = "to_csv"; df.apply(str)) would smuggle a name past the check
+CODE_STEP_RESERVED_NAMES = set(CODE_STEP_BUILTINS) | set(CODE_STEP_FUNCTIONS)
+
+
+def _is_allowed_function(node: ast.AST, method: str) -> bool:
+    """
+    Whether `node`, passed as the function of a higher-order method, can
+    only resolve to an allowed callable.
+    """
+    if isinstance(node, ast.Lambda):
+        return True
+    if isinstance(node, ast.Constant):
+        return isinstance(node.value, str) and node.value in CODE_STEP_STRING_FUNCTIONS
+    if isinstance(node, ast.Name):
+        return node.id in CODE_STEP_BUILTINS
+    if isinstance(node, ast.Attribute):
+        return node.attr not in CODE_STEP_HIGHER_ORDER
+    if isinstance(node, ast.Dict):
+        # Series.map takes a mapping of values, which is data
+        return method == "map" or all(_is_allowed_function(v, method) for v in node.values)
+    if isinstance(node, (ast.List, ast.Tuple)):
+        return all(_is_allowed_function(e, method) for e in node.elts)
+    return False
+
+
+def _function_arguments(call: ast.Call) -> List[ast.AST]:
+    functions = list(call.args[:1])
+    for keyword in call.keywords:
+        if keyword.arg in ("func", "arg"):
+            functions.append(keyword.value)
+        elif isinstance(keyword.value, ast.Tuple) and keyword.value.elts:
+            # Named aggregation: name=(column, function)
+            functions.extend(keyword.value.elts[1:])
+    return functions
+
+
+def _bound_names(node: ast.AST) -> List[str]:
+    if isinstance(node, ast.Name) and not isinstance(node.ctx, ast.Load):
+        return [node.id]
+    if isinstance(node, ast.arg):
+        return [node.arg]
+    if isinstance(node, (ast.FunctionDef, ast.ExceptHandler)) and node.name:
+        return [node.name]
+    return []
+
+
+def is_code_safe(code: str) -> Tuple[bool, str]:
+    """
+    Static allowlist check of a code step before it is sent to the sandbox.
+    Returns (is_safe, reason_if_not_safe)
+    """
+
+    logger.debug("Entering is_code_safe")
+    if not isinstance(code, str) or not code.strip():
+        return False, "Code step has no code"
+
+    try:
+        tree = ast.parse(code)
+    except SyntaxError as e:
+        return False, f"Code step does not parse: {e}"
+
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            return False, "Imports are not allowed in code steps"
+        if isinstance(node, (ast.Global, ast.Nonlocal)):
+            return False, "global/nonlocal are not allowed in code steps"
+        if isinstance(node, (ast.ClassDef, ast.AsyncFunctionDef, ast.Await, ast.Yield, ast.YieldFrom)):
+            return False, f"{type(node).__name__} is not allowed in code steps"
+        if isinstance(node, ast.Name) and node.id.startswith("_"):
+            return False, f"Use of '{node.id}' is not allowed in code steps"
+        if isinstance(node, ast.Attribute):
+            owner = node.value.id if isinstance(node.value, ast.Name) else None
+            if owner in CODE_STEP_FUNCTIONS:
+                if node.attr not in CODE_STEP_FUNCTIONS[owner]:
+                    return False, f"'{owner}.{node.attr}' is not available in code steps"
+            elif node.attr not in CODE_STEP_ATTRIBUTES:
+                return False, f"Attribute '{node.attr}' is not allowed in code steps"
+        for name in _bound_names(node):
+            if name in CODE_STEP_RESERVED_NAMES:
+                return False, f"'{name}' cannot be rebound in code steps"
+        if (
+            isinstance(node, ast.Call)
+            and isinstance(node.func, ast.Attribute)
+            and node.func.attr in CODE_STEP_HIGHER_ORDER
+        ):
+            method = node.func.attr
+            for function in _function_arguments(node):
+                if not _is_allowed_function(function, method):
+                    return False, (
+                        f"'{method}' takes a lambda, a builtin or one of "
+                        f"{sorted(CODE_STEP_STRING_FUNCTIONS)} in code steps"
+                    )
+
+    return True, ""
@@ -0,0 +1,250 @@
+import logging
+import os
+import sqlite3
+import tempfile
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from etl.extract.reader import read_csv_chunks
+from etl.load.writer import ChunkedWriter
+from etl.executor.tool_executor import (
+    ROW_LOCAL_TOOLS,
+    ToolExecutionError,
+    execute_tool_step,
+)
+from etl.executor.instrumentation import StepMeter, changed_columns, merge_step_metrics
+from etl.executor.tracing import span
+from etl.validate.expectations import ExpectationSuite
+from etl.validate.validator import collect_frame_stats, merge_frame_stats, update_frame_stats
+from etl.transform.dtypes import is_text_dtype_name, resolve_dtype_backend, text_dtype
+
+logger = logging.getLogger(__name__)
+
+# Tools the streaming executor can apply without the whole dataset in memory
+STREAMING_TOOLS = ROW_LOCAL_TOOLS | {"remove_duplicates"}
+
+DEFAULT_CHUNKSIZE = 100_000
+# ~8 bytes per hash: 4M hashes keep ~32 MB in memory before spilling to disk
+MAX_MEMORY_HASHES = 4_000_000
+
+
+class RowHashSet:
+    """
+    Set of 64-bit row hashes that spills to an on-disk SQLite table once
+    it outgrows `max_memory_hashes`, so dedup state has bounded memory.
+    """
+
+    def __init__(
+        self,
+        spill_dir: Optional[str] = None,
+        max_memory_hashes: int = MAX_MEMORY_HASHES,
+    ):
+        self.spill_dir = spill_dir
+        self.max_memory_hashes = max_memory_hashes
+        self._memory = np.empty(0, dtype=np.int64)
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_path: Optional[str] = None
+
+    def _spill(self) -> None:
+        if self._db is None:
+            fd, self._db_path = tempfile.mkstemp(
+                prefix="rowhashes_", suffix=".sqlite", dir=self.spill_dir
+            )
+            os.close(fd)
+            self._db = sqlite3.connect(self._db_path)
+            self._db.execute("PRAGMA journal_mode=OFF")
+            self._db.execute("PRAGMA synchronous=OFF")
+            self._db.execute("CREATE TABLE hashes (h INTEGER PRIMARY KEY)")
+
+        logger.debug("Spilling %d row hashes to %s", len(self._memory), self._db_path)
+        self._db.executemany(
+            "INSERT OR IGNORE INTO hashes VALUES (?)",
+            ((int(h),) for h in self._memory),
+        )
+        self._db.commit()
+        self._memory = np.empty(0, dtype=np.int64)
+
+    def _spilled_mask(self, hashes: np.ndarray) -> np.ndarray:
+        if self._db is None or len(hashes) == 0:
+            return np.zeros(len(hashes), dtype=bool)
+
+        self._db.execute("CREATE TEMP TABLE IF NOT EXISTS probe (h INTEGER)")
+        self._db.execute("DELETE FROM probe")
+        self._db.executemany(
+            "INSERT INTO probe VALUES (?)", ((int(h),) for h in hashes)
+        )
+        found = np.fromiter(
+            (row[0] for row in self._db.execute(
+                "SELECT DISTINCT probe.h FROM probe JOIN hashes ON probe.h = hashes.h"
+            )),
+            dtype=np.int64,
+        )
+        return np.isin(hashes, found)
+
+    def add_new(self, hashes: np.ndarray) -> np.ndarray:
+        """
+        Adds hashes and returns a mask of those not seen before
+        (first occurrence wins within the batch as well).
+        """
+        hashes = hashes.view(np.int64)
+        first_in_batch = ~pd.Series(hashes).duplicated().to_numpy()
+
+        pos = np.searchsorted(self._memory, hashes)
+        pos[pos >= len(self._memory)] = 0
+        seen = (
+            self._memory[pos] == hashes
+            if len(self._memory)
+            else np.zeros(len(hashes), dtype=bool)
+        )
+        seen |= self._spilled_mask(hashes)
+
+        new_mask = first_in_batch & ~seen
+        self._memory = np.union1d(self._memory, hashes[new_mask])
+
+        if len(self._memory) > self.max_memory_hashes:
+            self._spill()
+
+        return new_mask
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            os.remove(self._db_path)
+            self._db = None
+
+
+def hash_rows(df: pd.DataFrame) -> np.ndarray:
+    """
+    64-bit hash per row. Numeric columns are hashed as float64 so a chunk
+    that parsed a column as int hashes equal to one that parsed it as float.
+    """
+    canonical = df.copy(deep=False)
+    for col in canonical.columns:
+        series = canonical[col]
+        if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            canonical[col] = series.astype("float64")
+    return pd.util.hash_pandas_object(canonical, index=False).to_numpy()
+
+
+def execute_plan_streaming(
+    input_path: str,
+    output_path: str,
+    plan: Dict[str, Any],
+    profile: Dict[str, Any],
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    spill_dir: Optional[str] = None,
+    max_memory_hashes: int = MAX_MEMORY_HASHES,
+    dtype_backend: Optional[str] = None,
+    expectations: Optional[ExpectationSuite] = None,
+    output_format: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Applies a validated plan chunk by chunk from the input CSV to the output
+    file (CSV by default, see ChunkedWriter for output_format), holding one
+    chunk in memory at a time.
+
+    Row-local tools run per chunk; remove_duplicates keeps a disk-spillable
+    set of row hashes across chunks. Validator stats for the input and the
+    output are accumulated incrementally and returned with the log, along
+    with the output stats after every step ("step_stats"). An
+    ExpectationSuite passed as `expectations` is evaluated on every output
+    chunk before it is written.
+    """
+
+    logger.debug("Entering execute_plan_streaming: input=%s chunksize=%s", input_path, chunksize)
+    if "steps" not in plan:
+        raise ToolExecutionError("Plan has no steps")
+
+    steps = plan["steps"]
+    for idx, step in enumerate(steps, start=1):
+        if "type" not in step and "name" in step:
+            step["type"] = "tool"
+        if step.get("type") != "tool" or step.get("name") not in STREAMING_TOOLS:
+            raise ToolExecutionError(
+                f"Step {idx}: '{step.get('name')}' cannot be applied in streaming mode"
+            )
+
+    # Keep text columns as text in every chunk, as in the full-frame read
+    backend = resolve_dtype_backend(dtype_backend)
+    dtype = {
+        col: text_dtype(backend)
+        for col, meta in profile.get("columns", {}).items()
+        if is_text_dtype_name(meta.get("dtype"))
+    }
+    chunks, read_meta = read_csv_chunks(
+        input_path, chunksize=chunksize, dtype=dtype, dtype_backend=backend
+    )
+
+    hash_sets = {
+        idx: RowHashSet(spill_dir, max_memory_hashes)
+        for idx, step in enumerate(steps)
+        if step["name"] == "remove_duplicates"
+    }
+    execution_log: List[Dict[str, Any]] = []
+    stats_before: Optional[Dict[str, Any]] = None
+    stats_after: Optional[Dict[str, Any]] = None
+    # Output stats after each step, summed over chunks (for find_failing_step)
+    step_totals: List[Optional[Dict[str, Any]]] = [None] * len(steps)
+    chunks_written = 0
+
+    try:
+        with ChunkedWriter(output_path, output_format) as out:
+            for chunk in chunks:
+                chunk_stats = collect_frame_stats(chunk)
+                stats_before = merge_frame_stats(stats_before, chunk_stats)
+
+                # Safety decisions depend only on columns and profile, so they
+                # are identical for every chunk; log them once and sum metrics.
+                chunk_log: List[Dict[str, Any]] = []
+                current = chunk
+                for idx, step in enumerate(steps):
+                    if idx in hash_sets:
+                        meter = StepMeter(current)
+                        mask = hash_sets[idx].add_new(hash_rows(current))
+                        next_chunk = current[mask]
+                        chunk_log.append({"step": step, "status": "success", **meter.finish(next_chunk)})
+                    else:
+                        try:
+                            next_chunk = execute_tool_step(current, step, profile, chunk_log)
+                        except ToolExecutionError as e:
+                            raise ToolExecutionError(
+                                f"Step {idx + 1} (chunk {chunks_written + 1}): {e}",
+                                completed_steps=idx,
+                                failed_step=idx,
+                            ) from e
+                    chunk_stats = update_frame_stats(
+                        chunk_stats, next_chunk, changed_columns(current, next_chunk)
+                    )
+                    step_totals[idx] = merge_frame_stats(step_totals[idx], chunk_stats)
+                    current = next_chunk
+
+                if chunks_written == 0:
+                    execution_log = chunk_log
+                else:
+                    for total, entry in zip(execution_log, chunk_log):
+                        merge_step_metrics(total, entry)
+
+                stats_after = merge_frame_stats(stats_after, chunk_stats)
+                if expectations is not None:
+                    expectations.evaluate(current)
+                with span("write_chunk", chunk=chunks_written, rows=len(current)):
+                    out.write(current)
+                chunks_written += 1
+    finally:
+        for hash_set in hash_sets.values():
+            hash_set.close()
+
+    return {
+        "log": execution_log,
+        "read_metadata": read_meta,
+        "stats_before": stats_before,
+        "stats_after": stats_after,
+        "step_stats": [
+            {"steps": [idx], "stats": total, "modified_columns": None}
+            for idx, total in enumerate(step_totals)
+            if total is not None
+        ],
+        "chunks": chunks_written,
+    }
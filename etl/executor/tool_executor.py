@@ -1,9 +1,17 @@
 import logging
+import os
 import pandas as pd
-from typing import Dict, Any, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, List, Optional, Set, Tuple
 
-from etl.transform import cleaners
-from etl.executor.safety import is_tool_safe
+from etl.transform import cleaners, near_duplicates
+from etl.executor.safety import is_tool_safe, is_code_safe
+from etl.executor.code_executor import CODE_STEPS_ENABLED, run_code_step
+from etl.executor.instrumentation import StepMeter, changed_columns
+from etl.executor.tracing import propagate, span
+from etl.executor.checkpoint import CheckpointStore
+from etl.executor.cost_model import estimate_plan_cost
+from etl.validate.validator import ValidationError, collect_frame_stats, update_frame_stats
 
 logger = logging.getLogger(__name__)
 
@@ -19,11 +27,85 @@ TOOL_REGISTRY = {
     "drop_column": cleaners.drop_column,
     "normalize_currency": cleaners.normalize_currency,
     "normalize_percentage": cleaners.normalize_percentage,
+    "parse_currency_range": cleaners.parse_currency_range,
+    "to_categorical": cleaners.to_categorical,
+    "downcast_numeric": cleaners.downcast_numeric,
+    "remove_near_duplicates": near_duplicates.remove_near_duplicates,
 }
 
+# Tools that read and rewrite only their `column` argument, in place
+COLUMN_TOOLS = {
+    "trim_whitespace",
+    "convert_numeric",
+    "parse_datetime",
+    "normalize_currency",
+    "normalize_percentage",
+    "to_categorical",
+    "downcast_numeric",
+}
+
+# Tools where applying the same step twice equals applying it once
+IDEMPOTENT_TOOLS = {
+    "clean_column_names",
+    "standardize_missing",
+    "trim_whitespace",
+    "remove_duplicates",
+    "convert_numeric",
+    "parse_datetime",
+    "drop_column",
+    "parse_currency_range",
+    "to_categorical",
+    "downcast_numeric",
+}
+
+# Tools whose output row i depends only on input row i
+ROW_LOCAL_TOOLS = {
+    "clean_column_names",
+    "standardize_missing",
+    "trim_whitespace",
+    "convert_numeric",
+    "parse_datetime",
+    "drop_column",
+    "normalize_currency",
+    "normalize_percentage",
+    "parse_currency_range",
+    "to_categorical",
+    "downcast_numeric",
+}
+
+# Tools whose log entry reports the memory they freed
+COMPACTION_TOOLS = {"to_categorical", "downcast_numeric"}
+
+
+# Column-scoped steps on disjoint columns run concurrently on frames with
+# at least this many rows; smaller frames are not worth the thread overhead
+MAX_WORKERS = int(os.getenv("ETL_EXECUTOR_WORKERS", str(min(4, os.cpu_count() or 1))))
+PARALLEL_MIN_ROWS = 50_000
+
 
 class ToolExecutionError(Exception):
-    pass
+    """
+    Raised when a step fails. `df` holds the last good frame (the state
+    before the failing step), `completed_steps` how many steps of the plan
+    precede it and `failed_step` the index of the step that failed, when
+    known. `applied_steps` lists the indices of the steps whose effect
+    `df` holds: steps rolled back by validate_step are not among them
+    (default: all `completed_steps`).
+    """
+
+    def __init__(
+        self,
+        message: str,
+        df: Optional[pd.DataFrame] = None,
+        completed_steps: int = 0,
+        failed_step: Optional[int] = None,
+        applied_steps: Optional[List[int]] = None,
+    ):
+        super().__init__(message)
+        self.df = df
+        self.completed_steps = completed_steps
+        self.failed_step = failed_step
+        self.applied_steps = list(range(completed_steps)) if applied_steps is None else applied_steps
 
 
 def execute_tool_step(
@@ -34,11 +116,31 @@ def execute_tool_step(
 ) -> pd.DataFrame:
     """
     Executes a single tool step with safety checks.
+
+    Every log entry carries the step's wall/CPU time, peak memory, input and
+    output row counts and the number of cells changed (see StepMeter).
+    parse_datetime entries also record the format used and the number of
+    non-null values that failed to parse (parse_failures); compaction
+    tools record the new dtype and the column bytes freed (bytes_saved).
     """
 
     logger.debug("Entering execute_tool_step")
+    with span(f"step:{step.get('name') or step.get('type')}", args=step.get("args"), rows_in=len(df)):
+        if step.get("type") == "code":
+            return _execute_code_step(df, step, execution_log)
+        return _execute_tool(df, step, profile, execution_log)
+
+
+def _execute_tool(
+    df: pd.DataFrame,
+    step: Dict[str, Any],
+    profile: Dict[str, Any],
+    execution_log: List[Dict[str, Any]],
+) -> pd.DataFrame:
+
     tool_name = step.get("name")
     args = step.get("args", {})
+    meter = StepMeter(df)
 
     # Safety check
     safe, reason = is_tool_safe(df, step, profile)
@@ -47,6 +149,7 @@ def execute_tool_step(
             "step": step,
             "status": "skipped",
             "reason": reason,
+            **meter.finish(df),
         })
         return df
 
@@ -54,12 +157,41 @@ def execute_tool_step(
         raise ToolExecutionError(f"Tool not registered: {tool_name}")
 
     tool_fn = TOOL_REGISTRY[tool_name]
+    details: Dict[str, Any] = {}
+
+    if tool_name == "parse_datetime":
+        # Parse with the format the profiler inferred unless one was given
+        col_meta = profile.get("columns", {}).get(args.get("column"), {})
+        if not args.get("format") and col_meta.get("datetime_format"):
+            args = {**args, "format": col_meta["datetime_format"]}
+        details["datetime_format"] = args.get("format")
+
+    if tool_name == "downcast_numeric":
+        # Size integers for the profiled range, not just this frame's values
+        col_meta = profile.get("columns", {}).get(args.get("column"), {})
+        args = {
+            "min_value": col_meta.get("min"),
+            "max_value": col_meta.get("max"),
+            **args,
+        }
 
     try:
         new_df = tool_fn(df, **args)
+        if tool_name == "parse_datetime":
+            col = args["column"]
+            details["parse_failures"] = int((new_df[col].isna() & df[col].notna()).sum())
+        if tool_name in COMPACTION_TOOLS:
+            col = args["column"]
+            details["dtype_after"] = str(new_df[col].dtype)
+            details["bytes_saved"] = int(
+                df[col].memory_usage(index=False, deep=True)
+                - new_df[col].memory_usage(index=False, deep=True)
+            )
         execution_log.append({
             "step": step,
             "status": "success",
+            **details,
+            **meter.finish(new_df),
         })
         return new_df
 
@@ -68,41 +200,408 @@ def execute_tool_step(
             "step": step,
             "status": "failed",
             "error": str(e),
+            **meter.finish(df, count_cells=False),
         })
         raise ToolExecutionError(
             f"Error executing tool '{tool_name}': {e}"
         ) from e
 
 
+def _execute_code_step(
+    df: pd.DataFrame,
+    step: Dict[str, Any],
+    execution_log: List[Dict[str, Any]],
+) -> pd.DataFrame:
+    """
+    Runs a code step in the sandboxed worker pool after a static safety
+    check. Unsafe code is a failure, not a skip: the planner asked for it.
+    """
+
+    meter = StepMeter(df)
+    safe, reason = is_code_safe(step.get("code"))
+
+    try:
+        if not safe:
+            raise ValueError(reason)
+        new_df = run_code_step(df, step)
+        execution_log.append({
+            "step": step,
+            "status": "success",
+            **meter.finish(new_df),
+        })
+        return new_df
+
+    except Exception as e:
+        execution_log.append({
+            "step": step,
+            "status": "failed",
+            "error": str(e),
+            **meter.finish(df, count_cells=False),
+        })
+        raise ToolExecutionError(f"Error executing code step: {e}") from e
+
+
+# ======================================================
+# Scheduling
+# ======================================================
+
+def step_columns(step: Dict[str, Any]) -> Optional[Set[str]]:
+    """
+    Column read/write set of a column-scoped step.
+    Returns None for whole-frame steps, which act as barriers.
+    """
+    name = step.get("name")
+    args = step.get("args", {})
+
+    if name in COLUMN_TOOLS and args.get("column"):
+        return {args["column"]}
+    if name == "trim_whitespace" and args.get("columns"):
+        return set(args["columns"])
+    return None
+
+
+def build_step_batches(steps: List[Dict[str, Any]]) -> List[List[List[int]]]:
+    """
+    Splits a plan into batches of independent step groups.
+
+    Each batch is a list of groups; each group is a list of step indices
+    (in plan order) that share columns and must run sequentially. Groups
+    within one batch touch disjoint columns and can run concurrently.
+    Whole-frame steps always form a batch of their own.
+    """
+    logger.debug("Entering build_step_batches")
+    batches: List[List[List[int]]] = []
+    run: List[int] = []
+
+    def flush() -> None:
+        if not run:
+            return
+
+        # Union steps that share a column into one dependency group
+        parent = list(range(len(run)))
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        owner: Dict[str, int] = {}
+        for pos, idx in enumerate(run):
+            for col in step_columns(steps[idx]):
+                if col in owner:
+                    parent[find(pos)] = find(owner[col])
+                else:
+                    owner[col] = pos
+
+        groups: Dict[int, List[int]] = {}
+        for pos, idx in enumerate(run):
+            groups.setdefault(find(pos), []).append(idx)
+
+        batches.append(sorted(groups.values(), key=lambda g: g[0]))
+        run.clear()
+
+    for idx, step in enumerate(steps):
+        if step_columns(step) is None:
+            flush()
+            batches.append([[idx]])
+        else:
+            run.append(idx)
+    flush()
+
+    return batches
+
+
+def _run_step_group(
+    df: pd.DataFrame,
+    steps: List[Dict[str, Any]],
+    group: List[int],
+    profile: Dict[str, Any],
+) -> Tuple[pd.DataFrame, List[Tuple[int, Dict[str, Any]]], Optional[Tuple[int, Exception]]]:
+    entries: List[Tuple[int, Dict[str, Any]]] = []
+    for idx in group:
+        step_log: List[Dict[str, Any]] = []
+        try:
+            df = execute_tool_step(df, steps[idx], profile, step_log)
+        except ToolExecutionError as e:
+            entries.extend((idx, entry) for entry in step_log)
+            return df, entries, (idx, e)
+        entries.extend((idx, entry) for entry in step_log)
+    return df, entries, None
+
+
+def _execute_parallel_batch(
+    df: pd.DataFrame,
+    steps: List[Dict[str, Any]],
+    batch: List[List[int]],
+    profile: Dict[str, Any],
+    execution_log: List[Dict[str, Any]],
+    max_workers: int,
+) -> pd.DataFrame:
+    """
+    Runs independent step groups concurrently against the same input frame
+    and reassembles their output columns into one frame.
+    """
+    logger.debug("Entering _execute_parallel_batch: groups=%s", batch)
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(batch))) as pool:
+        results = list(pool.map(
+            propagate(lambda group: _run_step_group(df, steps, group, profile)), batch
+        ))
+
+    entries = sorted(
+        (entry for _, group_entries, _ in results for entry in group_entries),
+        key=lambda item: item[0],
+    )
+    # Concurrent steps share the process-wide memory counters (each one
+    # resets tracemalloc's peak), so no step's peak can be attributed
+    for _, entry in entries:
+        entry["peak_memory_mb"] = None
+        entry["memory_source"] = "shared"
+    execution_log.extend(entry for _, entry in entries)
+
+    errors = [error for _, _, error in results if error is not None]
+    if errors:
+        idx, error = min(errors, key=lambda item: item[0])
+        # Roll back the whole batch
+        raise ToolExecutionError(
+            f"Step {idx + 1}: {error}", df=df, completed_steps=batch[0][0], failed_step=idx
+        ) from error
+
+    merged = df.copy(deep=False)
+    for group, (group_df, _, _) in zip(batch, results):
+        for idx in group:
+            for col in step_columns(steps[idx]):
+                if col in group_df.columns:
+                    merged[col] = group_df[col]
+    return merged
+
+
+class _StatsTracker:
+    """
+    Validator stats of the current frame and the columns changed so far,
+    with a snapshot after every step (or parallel batch).
+    """
+
+    def __init__(self, stats: Dict[str, Any]):
+        self.stats = stats
+        self.modified: Optional[Set[str]] = set()
+        self.history: List[Dict[str, Any]] = []
+        self._previous: Tuple[Dict[str, Any], Optional[Set[str]]] = (stats, self.modified)
+
+    def update(self, df_before: pd.DataFrame, df_after: pd.DataFrame, step_indices: List[int]) -> None:
+        self._previous = (self.stats, self.modified)
+        changed = changed_columns(df_before, df_after)
+        self.stats = update_frame_stats(self.stats, df_after, changed)
+        if changed is None or self.modified is None:
+            self.modified = None
+        else:
+            self.modified = self.modified | changed
+        self.history.append({
+            "steps": step_indices,
+            "stats": self.stats,
+            "modified_columns": self.modified,
+        })
+
+    def rollback(self) -> None:
+        """
+        Undoes the last update.
+        """
+        self.stats, self.modified = self._previous
+        self.history.pop()
+
+
+# validate(stats_after, modified_columns, applied_steps); raises ValidationError
+StepValidator = Callable[[Dict[str, Any], Optional[Set[str]], List[Dict[str, Any]]], None]
+
+
+def _validation_failure(
+    validate_step: Optional[StepValidator],
+    tracker: _StatsTracker,
+    steps: List[Dict[str, Any]],
+    applied: List[int],
+) -> Optional[str]:
+    if validate_step is None:
+        return None
+    try:
+        validate_step(tracker.stats, tracker.modified, [steps[i] for i in applied])
+    except ValidationError as e:
+        return str(e)
+    return None
+
+
+def find_failing_step(
+    step_stats: List[Dict[str, Any]],
+    steps: List[Dict[str, Any]],
+    validate: StepValidator,
+) -> Optional[Tuple[int, ValidationError]]:
+    """
+    Locates the step that first made `validate` fail, from the stats
+    recorded after every step of a run ("step_stats"), so nothing is
+    re-executed. Within a parallel batch the step that wrote the offending
+    column is blamed. Returns (step index, error), or None when every
+    prefix passes or the failure cannot be pinned on one step.
+    """
+    logger.debug("Entering find_failing_step")
+    applied: List[int] = []
+    for entry in step_stats:
+        applied = applied + entry["steps"]
+        try:
+            validate(entry["stats"], entry["modified_columns"], [steps[i] for i in applied])
+        except ValidationError as e:
+            if len(entry["steps"]) == 1:
+                return entry["steps"][0], e
+            writers = [i for i in entry["steps"] if e.column in (step_columns(steps[i]) or set())]
+            return (writers[0], e) if len(writers) == 1 else None
+    return None
+
+
 def execute_plan(
     df: pd.DataFrame,
     plan: Dict[str, Any],
     profile: Dict[str, Any],
+    copy_on_write: bool = True,
+    max_workers: Optional[int] = None,
+    checkpoints: Optional[CheckpointStore] = None,
+    dry_run: bool = False,
+    stats: Optional[Dict[str, Any]] = None,
+    validate_step: Optional[StepValidator] = None,
 ) -> Dict[str, Any]:
     """
-    Executes all tool steps in sequence with safety checks.
+    Executes all tool steps with safety checks.
+
+    With copy_on_write (default) the input frame is shared column-wise and
+    each tool replaces only the columns it touches, so peak memory is about
+    the input plus the modified columns. The input is never mutated; on
+    failure the last good frame is attached to the raised ToolExecutionError.
+    Set copy_on_write=False to deep-copy the input up front.
+
+    Code steps ({"type": "code", "code": ...}, enabled by ETL_ALLOW_CODE_STEPS)
+    run in sandboxed worker processes and act as barriers.
+
+    Consecutive column-scoped steps on disjoint columns run on a thread pool
+    of max_workers (default ETL_EXECUTOR_WORKERS) for large frames;
+    whole-frame steps are barriers. Results match sequential execution.
+
+    With a CheckpointStore, the frame is checkpointed after every successful
+    step (or parallel batch) so a retry can resume from the last good state.
+
+    With dry_run, nothing is executed: the result carries the profile-based
+    cost "estimate" (per-step runtime and peak memory) and an empty log.
+
+    The result carries validator stats of the input and the output
+    ("stats_before", "stats_after") and the columns the plan modified
+    ("modified_columns", None if rows were removed). Output stats are kept
+    up to date step by step, recounting nulls only in the columns a step
+    replaced; pass `stats` when those of `df` are already known. A snapshot
+    after every step (or parallel batch) is kept in "step_stats" for
+    find_failing_step.
+
+    With `validate_step`, the running stats are validated after every step:
+    a step that fails is rolled back, logged as "rolled_back" with the
+    reason, and execution continues with the next step. A parallel batch
+    that fails is re-run step by step.
     """
 
-    logger.debug("Entering execute_plan")
+    logger.debug("Entering execute_plan: copy_on_write=%s dry_run=%s", copy_on_write, dry_run)
     if "steps" not in plan:
         raise ToolExecutionError("Plan has no steps")
 
-    current_df = df.copy()
+    if dry_run:
+        return {
+            "df": df,
+            "log": [],
+            "estimate": estimate_plan_cost(plan, profile),
+        }
+
+    current_df = df.copy(deep=not copy_on_write)
     execution_log: List[Dict[str, Any]] = []
+    steps = plan["steps"]
+
+    # Saved before anything can fail, so the checkpoint never describes
+    # an earlier plan
+    if checkpoints is not None:
+        checkpoints.save(0, current_df)
 
-    for idx, step in enumerate(plan["steps"], start=1):
+    for idx, step in enumerate(steps):
         if "type" not in step and "name" in step:
             step["type"] = "tool"
+        if step.get("type") == "code" and CODE_STEPS_ENABLED:
+            continue
         if step.get("type") != "tool":
             raise ToolExecutionError(
-                f"Step {idx}: only tool steps are supported"
+                f"Step {idx + 1}: only tool steps are supported",
+                df=current_df,
+                completed_steps=0,
+                failed_step=idx,
             )
 
-        current_df = execute_tool_step(
-            current_df, step, profile, execution_log
-        )
+    stats_before = stats if stats is not None else collect_frame_stats(current_df)
+    tracker = _StatsTracker(stats_before)
+
+    workers = MAX_WORKERS if max_workers is None else max_workers
+    if workers > 1 and len(current_df) >= PARALLEL_MIN_ROWS:
+        batches = build_step_batches(steps)
+    else:
+        batches = [[[idx]] for idx in range(len(steps))]
+
+    applied: List[int] = []
+    for batch in batches:
+        sequential = batch[0]
+        if len(batch) > 1:
+            previous_df = current_df
+            log_start = len(execution_log)
+            try:
+                current_df = _execute_parallel_batch(
+                    current_df, steps, batch, profile, execution_log, workers
+                )
+            except ToolExecutionError as e:
+                e.applied_steps = list(applied)
+                raise
+            batch_steps = sorted(idx for group in batch for idx in group)
+            tracker.update(previous_df, current_df, batch_steps)
+            if _validation_failure(validate_step, tracker, steps, applied + batch_steps) is None:
+                applied.extend(batch_steps)
+                if checkpoints is not None:
+                    checkpoints.save(max(g[-1] for g in batch) + 1, current_df)
+                continue
+            # Find the offending step by re-running the batch sequentially
+            tracker.rollback()
+            del execution_log[log_start:]
+            current_df = previous_df
+            sequential = batch_steps
+
+        for idx in sequential:
+            try:
+                next_df = execute_tool_step(
+                    current_df, steps[idx], profile, execution_log
+                )
+            except ToolExecutionError as e:
+                # Roll back to the state before the failing step
+                raise ToolExecutionError(
+                    f"Step {idx + 1}: {e}",
+                    df=current_df,
+                    completed_steps=idx,
+                    failed_step=idx,
+                    applied_steps=list(applied),
+                ) from e
+            tracker.update(current_df, next_df, [idx])
+            failure = _validation_failure(validate_step, tracker, steps, applied + [idx])
+            if failure is None:
+                applied.append(idx)
+                current_df = next_df
+            else:
+                logger.info("Step %d failed validation, rolled back: %s", idx + 1, failure)
+                tracker.rollback()
+                execution_log[-1]["status"] = "rolled_back"
+                execution_log[-1]["reason"] = failure
+            if checkpoints is not None:
+                checkpoints.save(idx + 1, current_df)
 
     return {
         "df": current_df,
         "log": execution_log,
+        "stats_before": stats_before,
+        "stats_after": tracker.stats,
+        "modified_columns": tracker.modified,
+        "step_stats": tracker.history,
     }
@@ -0,0 +1,261 @@
+import functools
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+# ======================================================
+# CONFIG
+# ======================================================
+
+# Tracing is off unless ETL_TRACE=1; spans then cost one ContextVar lookup
+TRACE_ENABLED = os.getenv("ETL_TRACE", "0") == "1"
+
+# Fraction of runs traced while enabled
+TRACE_SAMPLE_RATE = float(os.getenv("ETL_TRACE_SAMPLE_RATE", "1.0"))
+
+# Chrome trace JSON files, one per traced run
+TRACE_DIR = os.getenv("ETL_TRACE_DIR", "data/traces")
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+_current: ContextVar[Optional["Trace"]] = ContextVar("etl_trace", default=None)
+
+
+# ======================================================
+# SPANS
+# ======================================================
+
+class _NoSpan:
+    """
+    Stand-in returned by span() outside a traced run.
+    """
+
+    def __enter__(self) -> "_NoSpan":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        return None
+
+    def set(self, **args: Any) -> None:
+        return None
+
+
+_NO_SPAN = _NoSpan()
+
+
+class _Span:
+    __slots__ = ("trace", "name", "args", "start_ns")
+
+    def __init__(self, trace: "Trace", name: str, args: Dict[str, Any]):
+        self.trace = trace
+        self.name = name
+        self.args = args
+        self.start_ns = 0
+
+    def __enter__(self) -> "_Span":
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        if exc_type is not None:
+            self.args["error"] = f"{exc_type.__name__}: {exc}"
+        self.trace.add(self.name, self.start_ns, time.perf_counter_ns(), self.args)
+
+    def set(self, **args: Any) -> None:
+        """
+        Attaches arguments known only once the span is under way (row
+        counts, sizes).
+        """
+        self.args.update(args)
+
+
+class Trace:
+    """
+    Completed spans of one run, as Chrome trace events ("X" phase, times in
+    microseconds from the start of the run). Spans nest by time on each
+    thread, which is how chrome://tracing and Perfetto draw them.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.id = uuid.uuid4().hex[:12]
+        self.events: List[Dict[str, Any]] = []
+        self._origin_ns = time.perf_counter_ns()
+        self._pid = os.getpid()
+        self._threads: Dict[int, str] = {}
+
+    def add(self, name: str, start_ns: int, end_ns: int, args: Dict[str, Any]) -> None:
+        tid = threading.get_ident()
+        if tid not in self._threads:
+            self._threads[tid] = threading.current_thread().name
+        # list.append is atomic, so worker threads need no lock
+        self.events.append({
+            "name": name,
+            "cat": "etl",
+            "ph": "X",
+            "ts": (start_ns - self._origin_ns) / 1000,
+            "dur": (end_ns - start_ns) / 1000,
+            "pid": self._pid,
+            "tid": tid,
+            "args": args,
+        })
+
+    def to_chrome(self) -> Dict[str, Any]:
+        metadata = [
+            {"name": "thread_name", "ph": "M", "pid": self._pid, "tid": tid, "args": {"name": name}}
+            for tid, name in self._threads.items()
+        ]
+        return {
+            "traceEvents": metadata + sorted(self.events, key=lambda e: e["ts"]),
+            "displayTimeUnit": "ms",
+            "otherData": {"run": self.name, "trace_id": self.id},
+        }
+
+    def export(self, path: str) -> str:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_chrome(), f, default=str)
+        return path
+
+
+def current_trace() -> Optional[Trace]:
+    return _current.get()
+
+
+def span(name: str, **args: Any) -> Any:
+    """
+    Context manager timing a block as a span of the current run's trace;
+    a shared no-op when the run is not traced.
+    """
+    trace = _current.get()
+    if trace is None:
+        return _NO_SPAN
+    return _Span(trace, name, args)
+
+
+def traced(name: Optional[str] = None) -> Callable[[F], F]:
+    """
+    Decorator recording each call as a span (default name: the function's).
+    """
+    def decorator(fn: F) -> F:
+        span_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            trace = _current.get()
+            if trace is None:
+                return fn(*args, **kwargs)
+            with _Span(trace, span_name, {}):
+                return fn(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+def propagate(fn: F) -> F:
+    """
+    Wraps fn so spans it records on a worker thread (thread pools do not
+    inherit context variables) join the caller's trace.
+    """
+    trace = _current.get()
+    if trace is None:
+        return fn
+
+    @functools.wraps(fn)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        token = _current.set(trace)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current.reset(token)
+
+    return wrapper  # type: ignore[return-value]
+
+
+# ======================================================
+# RUNS
+# ======================================================
+
+@contextmanager
+def start_trace(
+    name: str,
+    enabled: Optional[bool] = None,
+    sample_rate: Optional[float] = None,
+) -> Iterator[Optional[Trace]]:
+    """
+    Traces the enclosed run, sampled at sample_rate (default:
+    ETL_TRACE_SAMPLE_RATE) when enabled (default: ETL_TRACE). Yields the
+    trace, or None when the run is not traced. Inside a traced run the
+    outer trace is reused.
+    """
+    outer = _current.get()
+    if outer is not None:
+        with _Span(outer, name, {}):
+            yield outer
+        return
+
+    enabled = TRACE_ENABLED if enabled is None else enabled
+    sample_rate = TRACE_SAMPLE_RATE if sample_rate is None else sample_rate
+    if not enabled or random.random() >= sample_rate:
+        yield None
+        return
+
+    trace = Trace(name)
+    token = _current.set(trace)
+    try:
+        with _Span(trace, name, {}):
+            yield trace
+    finally:
+        _current.reset(token)
+
+
+def _export(trace: Trace, name: str) -> Optional[str]:
+    path = os.path.join(TRACE_DIR, f"{name}-{trace.id}.json")
+    try:
+        return trace.export(path)
+    except OSError as e:
+        logger.warning("Could not write trace %s: %s", path, e)
+        return None
+
+
+def trace_run(name: str) -> Callable[[F], F]:
+    """
+    Decorator tracing each call of a run function (see start_trace) and
+    exporting the trace to TRACE_DIR, whether the run succeeds or fails.
+    A dict result gains "trace_path". Called inside a traced run, the call
+    is a span of that run.
+    """
+    def decorator(fn: F) -> F:
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if _current.get() is not None:
+                with span(name):
+                    return fn(*args, **kwargs)
+
+            trace = None
+            path = None
+            try:
+                with start_trace(name) as trace:
+                    result = fn(*args, **kwargs)
+            finally:
+                if trace is not None:
+                    path = _export(trace, name)
+            if path is not None and isinstance(result, dict):
+                result["trace_path"] = path
+            return result
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
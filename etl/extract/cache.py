@@ -0,0 +1,213 @@
+import copy
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import pandas as pd
+
+from etl.executor.checkpoint import approx_frame_mb
+from etl.extract.reader import read_csv_safe
+from etl.extract.uploads import upload_digest
+from etl.transform.dtypes import resolve_dtype_backend
+
+logger = logging.getLogger(__name__)
+
+# Frames held at once may not exceed this (approx_frame_mb estimate)
+FRAME_CACHE_MB = float(os.getenv("ETL_FRAME_CACHE_MB", "512"))
+# Entries unused for this long are dropped
+FRAME_CACHE_TTL_S = float(os.getenv("ETL_FRAME_CACHE_TTL_S", "1800"))
+
+
+class _Entry:
+    def __init__(self, signature: Tuple[int, int], df: pd.DataFrame, metadata: Dict[str, Any]):
+        self.signature = signature
+        self.df = df
+        self.metadata = metadata
+        self.profile: Optional[Dict[str, Any]] = None
+        # First plans by digest of the profile they were planned from
+        self.plans: Dict[str, Dict[str, Any]] = {}
+        self.samples: Dict[int, pd.DataFrame] = {}
+        self.size_mb = approx_frame_mb(df)
+        self.last_used = time.monotonic()
+
+
+class FrameCache:
+    """
+    Process-level LRU cache of parsed uploads: the DataFrame, its read
+    metadata, its profile, preview samples and initial plan, keyed by
+    content hash for files in the upload store (see UploadStore), by file
+    path otherwise, and by dtype backend.
+
+    Entries are dropped when the file changes on disk (size or mtime),
+    after ttl_s without use, or least recently used first once the frames
+    exceed max_mb. Frames are shared, not copied: pipeline steps never
+    mutate their input.
+    """
+
+    def __init__(self, max_mb: float = FRAME_CACHE_MB, ttl_s: float = FRAME_CACHE_TTL_S):
+        self.max_mb = max_mb
+        self.ttl_s = ttl_s
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[str, Optional[str]], _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(file_path: str, dtype_backend: Optional[str]) -> Tuple[str, Optional[str]]:
+        return upload_digest(file_path) or os.path.abspath(file_path), resolve_dtype_backend(dtype_backend)
+
+    @staticmethod
+    def _signature(file_path: str) -> Tuple[int, int]:
+        stat = os.stat(file_path)
+        return stat.st_size, stat.st_mtime_ns
+
+    def _evict_expired(self, now: float) -> None:
+        for key in [k for k, e in self._entries.items() if now - e.last_used > self.ttl_s]:
+            logger.debug("Frame cache: %s expired", key[0])
+            del self._entries[key]
+
+    def _lookup(self, file_path: str, dtype_backend: Optional[str]) -> Optional[_Entry]:
+        key = self._key(file_path, dtype_backend)
+        now = time.monotonic()
+        with self._lock:
+            self._evict_expired(now)
+            entry = self._entries.get(key)
+            if entry is not None and entry.signature != self._signature(file_path):
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            entry.last_used = now
+            self._entries.move_to_end(key)
+            return entry
+
+    def _store(self, file_path: str, dtype_backend: Optional[str], entry: _Entry) -> None:
+        if entry.size_mb > self.max_mb:
+            logger.debug("Frame cache: %s (%.1f MB) exceeds the budget, not cached", file_path, entry.size_mb)
+            return
+        key = self._key(file_path, dtype_backend)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while self.total_mb() > self.max_mb:
+                evicted, _ = self._entries.popitem(last=False)
+                logger.debug("Frame cache: evicted %s", evicted[0])
+
+    def total_mb(self) -> float:
+        return sum(e.size_mb for e in self._entries.values())
+
+    def _entry(self, file_path: str, dtype_backend: Optional[str]) -> _Entry:
+        entry = self._lookup(file_path, dtype_backend)
+        if entry is None:
+            signature = self._signature(file_path)
+            df, metadata = read_csv_safe(file_path, dtype_backend=dtype_backend)
+            entry = _Entry(signature, df, metadata)
+            self._store(file_path, dtype_backend, entry)
+        return entry
+
+    def read_csv(
+        self,
+        file_path: str,
+        dtype_backend: Optional[str] = None,
+    ) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+        """
+        read_csv_safe(file_path), parsed once while cached.
+        """
+        logger.debug("Entering FrameCache.read_csv: file_path=%s", file_path)
+        entry = self._entry(file_path, dtype_backend)
+        return entry.df, dict(entry.metadata)
+
+    def profile(
+        self,
+        file_path: str,
+        compute_profile: Callable[[pd.DataFrame], Dict[str, Any]],
+        dtype_backend: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        compute_profile(frame) for the frame read_csv returns, computed
+        once while cached. Returns a shallow copy, so top-level keys
+        (e.g. "last_failure") can be set without touching the cache.
+        """
+        logger.debug("Entering FrameCache.profile: file_path=%s", file_path)
+        entry = self._entry(file_path, dtype_backend)
+        if entry.profile is None:
+            entry.profile = compute_profile(entry.df)
+        return dict(entry.profile)
+
+    def sample(
+        self,
+        file_path: str,
+        rows: int,
+        compute_sample: Callable[[pd.DataFrame, int], pd.DataFrame],
+        dtype_backend: Optional[str] = None,
+    ) -> pd.DataFrame:
+        """
+        compute_sample(frame, rows) for the frame read_csv returns,
+        computed once per size while cached.
+        """
+        entry = self._entry(file_path, dtype_backend)
+        if rows not in entry.samples:
+            entry.samples[rows] = compute_sample(entry.df, rows)
+        return entry.samples[rows]
+
+    @staticmethod
+    def _profile_digest(profile: Dict[str, Any]) -> str:
+        encoded = json.dumps(profile, sort_keys=True, default=str).encode("utf-8")
+        return hashlib.sha256(encoded).hexdigest()
+
+    def plan(
+        self,
+        file_path: str,
+        profile: Dict[str, Any],
+        compute_plan: Callable[[], Dict[str, Any]],
+        dtype_backend: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        compute_plan() (the planner's first plan for `profile`), computed
+        once per profile while cached. Returns a deep copy, since execution
+        annotates plan steps. A plan that turns out to fail should be
+        dropped with discard_plan so the next run asks the planner again.
+        """
+        logger.debug("Entering FrameCache.plan: file_path=%s", file_path)
+        entry = self._entry(file_path, dtype_backend)
+        digest = self._profile_digest(profile)
+        if digest not in entry.plans:
+            entry.plans[digest] = copy.deepcopy(compute_plan())
+        return copy.deepcopy(entry.plans[digest])
+
+    def discard_plan(
+        self,
+        file_path: str,
+        profile: Dict[str, Any],
+        dtype_backend: Optional[str] = None,
+    ) -> None:
+        logger.debug("Entering FrameCache.discard_plan: file_path=%s", file_path)
+        entry = self._lookup(file_path, dtype_backend)
+        if entry is not None:
+            entry.plans.pop(self._profile_digest(profile), None)
+
+    def invalidate(self, file_path: str) -> None:
+        content = self._key(file_path, None)[0]
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == content]:
+                del self._entries[key]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "size_mb": round(self.total_mb(), 3),
+                "max_mb": self.max_mb,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+frame_cache = FrameCache()
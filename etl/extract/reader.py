@@ -1,10 +1,24 @@
 import logging
+import os
+import numpy as np
 import pandas as pd
 import chardet
-from typing import Tuple, Dict
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+from typing import Any, Callable, Tuple, Dict, Iterator, Optional
+
+from etl.executor.tracing import span
+from etl.transform.dtypes import resolve_dtype_backend
 
 logger = logging.getLogger(__name__)
 
+# Rows parsed for an upload preview (columns, dtypes, head)
+PREVIEW_ROWS = int(os.getenv("ETL_PREVIEW_ROWS", "1000"))
+# Leading bytes scanned to estimate a preview's row count
+PREVIEW_SAMPLE_BYTES = int(os.getenv("ETL_PREVIEW_SAMPLE_BYTES", str(4 * 1024 * 1024)))
+# Block size of the row-count byte scan
+ROW_SCAN_BLOCK_BYTES = 16 * 1024 * 1024
+
 
 class CSVReadError(Exception):
     """Raised when CSV cannot be read safely."""
@@ -47,15 +61,56 @@ def detect_delimiter(file_path: str, encoding: str) -> str:
     return detected
 
 
+def _backend_kwargs(backend: Optional[str]) -> Dict[str, Any]:
+    return {"dtype_backend": backend} if backend else {}
+
+
+def _read_csv_arrow(
+    file_path: str,
+    encoding: str,
+    delimiter: str,
+    bad_line_handler: Callable[[str], None],
+) -> pd.DataFrame:
+    """
+    Multi-threaded Arrow CSV read into Arrow-backed columns. pandas'
+    pyarrow engine does not allow newlines inside quoted values, which
+    free-text columns (job descriptions) need.
+    """
+    table = pa_csv.read_csv(
+        file_path,
+        read_options=pa_csv.ReadOptions(encoding=encoding),
+        parse_options=pa_csv.ParseOptions(
+            delimiter=delimiter,
+            newlines_in_values=True,
+            invalid_row_handler=lambda row: bad_line_handler(row.text) or "skip",
+        ),
+        convert_options=pa_csv.ConvertOptions(strings_can_be_null=True),
+    )
+
+    # Keep dates as text like the NumPy path; parse_datetime decides
+    for i, field in enumerate(table.schema):
+        if pa.types.is_temporal(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(pa.string()))
+
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+
 def read_csv_safe(
     file_path: str,
-    max_bad_lines: int = 100
+    max_bad_lines: int = 100,
+    nrows: Optional[int] = None,
+    dtype_backend: Optional[str] = None,
 ) -> Tuple[pd.DataFrame, Dict]:
     """
     Safely read a CSV file and return DataFrame + metadata.
+    Pass nrows to read only the first rows (e.g. a profiling sample).
+
+    With dtype_backend="pyarrow" (default: ETL_DTYPE_BACKEND) columns are
+    Arrow-backed; full reads then use Arrow's CSV reader.
     """
 
-    logger.debug("Entering read_csv_safe: file_path=%s", file_path)
+    logger.debug("Entering read_csv_safe: file_path=%s nrows=%s", file_path, nrows)
+    backend = resolve_dtype_backend(dtype_backend)
     metadata = {
         "file_path": file_path,
         "encoding": None,
@@ -63,35 +118,48 @@ def read_csv_safe(
         "bad_lines_skipped": 0,
         "rows_read": 0,
         "columns_read": 0,
+        "dtype_backend": backend or "numpy",
     }
 
     try:
-        encoding = detect_encoding(file_path)
-        metadata["encoding"] = encoding
+        with span("sniff") as sniff_span:
+            encoding = detect_encoding(file_path)
+            metadata["encoding"] = encoding
 
-        try:
-            delimiter = detect_delimiter(file_path, encoding)
-        except CSVReadError:
-            # Fallback: assume single-column CSV
-            delimiter = ","
+            try:
+                delimiter = detect_delimiter(file_path, encoding)
+            except CSVReadError:
+                # Fallback: assume single-column CSV
+                delimiter = ","
 
-        metadata["delimiter"] = delimiter
+            metadata["delimiter"] = delimiter
+            sniff_span.set(encoding=encoding, delimiter=delimiter)
 
         bad_lines = []
 
         def bad_line_handler(line):
-            logger.debug("Bad line encountered: %s", line)
             bad_lines.append(line)
             return None
 
-        df = pd.read_csv(
-            file_path,
-            encoding=encoding,
-            sep=delimiter,
-            engine="python",
-            on_bad_lines=bad_line_handler
-        )
+        with span("parse_csv", backend=backend or "numpy", nrows=nrows) as parse_span:
+            # Arrow's reader cannot stop after nrows
+            if backend == "pyarrow" and nrows is None:
+                df = _read_csv_arrow(file_path, encoding, delimiter, bad_line_handler)
+            else:
+                df = pd.read_csv(
+                    file_path,
+                    encoding=encoding,
+                    sep=delimiter,
+                    engine="python",
+                    on_bad_lines=bad_line_handler,
+                    nrows=nrows,
+                    **_backend_kwargs(backend),
+                )
+            parse_span.set(rows=len(df), bad_lines=len(bad_lines))
 
+        if bad_lines:
+            # One summary line, not one per bad line
+            logger.warning("Skipped %d bad line(s) in %s; first: %s", len(bad_lines), file_path, bad_lines[0])
         metadata["bad_lines_skipped"] = len(bad_lines)
         metadata["rows_read"] = len(df)
         metadata["columns_read"] = len(df.columns)
@@ -102,4 +170,166 @@ def read_csv_safe(
         return df, metadata
 
     except Exception as e:
-        raise CSVReadError(f"CSV ingestion failed: {str(e)}")
\ No newline at end of file
+        raise CSVReadError(f"CSV ingestion failed: {str(e)}")
+
+
+def read_csv_chunks(
+    file_path: str,
+    chunksize: int = 100_000,
+    dtype: Optional[Dict[str, Any]] = None,
+    dtype_backend: Optional[str] = None,
+) -> Tuple[Iterator[pd.DataFrame], Dict]:
+    """
+    Read a CSV file lazily in chunks of `chunksize` rows.
+
+    Returns a chunk iterator and a metadata dict; "rows_read" and
+    "bad_lines_skipped" are updated as the iterator is consumed.
+    `dtype` pins column dtypes so every chunk parses consistently.
+    """
+
+    logger.debug("Entering read_csv_chunks: file_path=%s chunksize=%s", file_path, chunksize)
+    backend = resolve_dtype_backend(dtype_backend)
+    metadata = {
+        "file_path": file_path,
+        "encoding": None,
+        "delimiter": None,
+        "bad_lines_skipped": 0,
+        "rows_read": 0,
+        "columns_read": 0,
+        "chunksize": chunksize,
+        "dtype_backend": backend or "numpy",
+    }
+
+    try:
+        encoding = detect_encoding(file_path)
+        try:
+            delimiter = detect_delimiter(file_path, encoding)
+        except CSVReadError:
+            delimiter = ","
+    except Exception as e:
+        raise CSVReadError(f"CSV ingestion failed: {str(e)}")
+
+    metadata["encoding"] = encoding
+    metadata["delimiter"] = delimiter
+
+    def bad_line_handler(line):
+        metadata["bad_lines_skipped"] += 1
+        return None
+
+    def chunks() -> Iterator[pd.DataFrame]:
+        try:
+            reader = pd.read_csv(
+                file_path,
+                encoding=encoding,
+                sep=delimiter,
+                engine="python",
+                on_bad_lines=bad_line_handler,
+                chunksize=chunksize,
+                dtype=dtype,
+                **_backend_kwargs(backend),
+            )
+            with reader:
+                for chunk in reader:
+                    metadata["rows_read"] += len(chunk)
+                    metadata["columns_read"] = len(chunk.columns)
+                    yield chunk
+        except Exception as e:
+            raise CSVReadError(f"CSV ingestion failed: {str(e)}")
+
+        if metadata["rows_read"] == 0:
+            raise CSVReadError("CSV read successfully but contains no data")
+
+    return chunks(), metadata
+
+
+# =====================================================
+# Row counting and preview
+# =====================================================
+
+def _scan_records(
+    file_path: str,
+    quotechar: str = '"',
+    max_bytes: Optional[int] = None,
+) -> Tuple[int, int, bool]:
+    """
+    Counts record-ending newlines (those outside quoted values) in the
+    first `max_bytes` bytes (all if None), block by block with numpy.
+    Doubled quotes toggle the quote state twice and cancel out.
+    Returns (newlines, bytes scanned, last byte was a newline).
+    """
+    quote = ord(quotechar)
+    newline = ord("\n")
+    in_quotes = False
+    newlines = 0
+    scanned = 0
+    ends_with_newline = False
+
+    with open(file_path, "rb") as f:
+        while max_bytes is None or scanned < max_bytes:
+            size = ROW_SCAN_BLOCK_BYTES if max_bytes is None else min(ROW_SCAN_BLOCK_BYTES, max_bytes - scanned)
+            block = f.read(size)
+            if not block:
+                break
+            data = np.frombuffer(block, dtype=np.uint8)
+            quotes = np.flatnonzero(data == quote)
+            breaks = np.flatnonzero(data == newline)
+            # Quote parity at each newline, continuing the previous block's state
+            parity = (np.searchsorted(quotes, breaks) + in_quotes) % 2
+            newlines += int((parity == 0).sum())
+            in_quotes = bool((len(quotes) + in_quotes) % 2)
+            scanned += len(block)
+            ends_with_newline = block[-1] == newline
+
+    return newlines, scanned, ends_with_newline
+
+
+def count_csv_rows(file_path: str, quotechar: str = '"') -> int:
+    """
+    Number of data rows (excluding the header), from a newline / quote
+    aware byte scan: much faster than parsing, and right for quoted
+    values spanning lines. Assumes an ASCII-compatible encoding.
+    """
+    logger.debug("Entering count_csv_rows: file_path=%s", file_path)
+    newlines, scanned, ends_with_newline = _scan_records(file_path, quotechar)
+    records = newlines + (0 if ends_with_newline or scanned == 0 else 1)
+    return max(records - 1, 0)
+
+
+def estimate_csv_rows(
+    file_path: str,
+    sample_bytes: int = PREVIEW_SAMPLE_BYTES,
+    quotechar: str = '"',
+) -> Tuple[int, bool]:
+    """
+    Row count from a scan of the first `sample_bytes` only, scaled by the
+    file size. Returns (rows, exact); files within the sample are exact.
+    """
+    logger.debug("Entering estimate_csv_rows: file_path=%s", file_path)
+    size = os.path.getsize(file_path)
+    if size <= sample_bytes:
+        return count_csv_rows(file_path, quotechar), True
+
+    newlines, scanned, _ = _scan_records(file_path, quotechar, max_bytes=sample_bytes)
+    if newlines == 0:
+        return 0, False
+    return max(int(round(newlines * size / scanned)) - 1, 0), False
+
+
+def read_csv_preview(
+    file_path: str,
+    nrows: int = PREVIEW_ROWS,
+    dtype_backend: Optional[str] = None,
+) -> Tuple[pd.DataFrame, Dict]:
+    """
+    Parses only the first `nrows` rows (for columns, dtypes and head), so
+    the preview costs the same for any file size. metadata carries
+    "rows_estimate" and "rows_exact" from estimate_csv_rows; refine an
+    estimate with count_csv_rows off the request path.
+    """
+    logger.debug("Entering read_csv_preview: file_path=%s nrows=%s", file_path, nrows)
+    df, metadata = read_csv_safe(file_path, nrows=nrows, dtype_backend=dtype_backend)
+    rows, exact = estimate_csv_rows(file_path)
+    # Never report fewer rows than were actually parsed
+    metadata["rows_estimate"] = max(rows, len(df))
+    metadata["rows_exact"] = exact
+    return df, metadata
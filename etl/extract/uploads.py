@@ -0,0 +1,229 @@
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# ======================================================
+# CONFIG
+# ======================================================
+
+UPLOAD_DIR = os.getenv("ETL_UPLOAD_DIR", "data/uploads")
+
+# Stored uploads may not exceed this; least recently used go first
+UPLOAD_STORE_MB = float(os.getenv("ETL_UPLOAD_STORE_MB", "2048"))
+
+# Uploads used this recently are never evicted (jobs may still read them)
+UPLOAD_GRACE_S = float(os.getenv("ETL_UPLOAD_GRACE_S", "3600"))
+
+# Bytes read from the request stream per write
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+_OBJECT_NAME = re.compile(r"^([0-9a-f]{64})\.csv$")
+
+_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS uploads (
+        digest TEXT PRIMARY KEY,
+        size INTEGER NOT NULL,
+        created_at REAL NOT NULL,
+        last_used REAL NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS aliases (
+        name TEXT NOT NULL,
+        digest TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        PRIMARY KEY (name, digest)
+    )
+    """,
+]
+
+
+class UploadNotFound(Exception):
+    pass
+
+
+def upload_digest(path: str) -> Optional[str]:
+    """
+    Content hash of a file stored by UploadStore, from its name; None for
+    any other file.
+    """
+    match = _OBJECT_NAME.match(os.path.basename(path))
+    return match.group(1) if match else None
+
+
+class UploadStore:
+    """
+    Content-addressed upload storage: each upload is streamed to disk while
+    its SHA-256 is computed and kept once, as objects/<sha256>.csv,
+    whatever its file name. Names the file was uploaded under are kept as
+    aliases; uploading identical content again only records the alias.
+
+    The hash is the upload id: caches downstream (see FrameCache) are keyed
+    by it, so identical re-uploads reuse parsed frames, profiles and plans.
+    Disk use is bounded by max_mb, evicting least recently used uploads
+    that have been idle for at least grace_s.
+    """
+
+    def __init__(
+        self,
+        root: str = UPLOAD_DIR,
+        max_mb: float = UPLOAD_STORE_MB,
+        grace_s: float = UPLOAD_GRACE_S,
+    ):
+        self.root = root
+        self.max_mb = max_mb
+        self.grace_s = grace_s
+        self.objects_dir = os.path.join(root, "objects")
+        self.tmp_dir = os.path.join(root, "tmp")
+        self.db_path = os.path.join(root, "uploads.sqlite3")
+        self._lock = threading.Lock()
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            for statement in _SCHEMA:
+                db.execute(statement)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        db = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def object_path(self, digest: str) -> str:
+        return os.path.join(self.objects_dir, f"{digest}.csv")
+
+    def save(self, stream: BinaryIO, filename: str) -> Dict[str, Any]:
+        """
+        Streams `stream` to the store in UPLOAD_CHUNK_BYTES blocks, hashing
+        as it goes. Returns the upload id (hash), its path and size,
+        whether the content was already stored, and the ids evicted to
+        make room.
+        """
+        logger.debug("Entering UploadStore.save: filename=%s", filename)
+        digest = hashlib.sha256()
+        size = 0
+        tmp_path = os.path.join(self.tmp_dir, f"{uuid.uuid4().hex}.part")
+        try:
+            with open(tmp_path, "wb") as out:
+                while True:
+                    block = stream.read(UPLOAD_CHUNK_BYTES)
+                    if not block:
+                        break
+                    digest.update(block)
+                    out.write(block)
+                    size += len(block)
+
+            upload_id = digest.hexdigest()
+            path = self.object_path(upload_id)
+            duplicate = os.path.exists(path)
+            if not duplicate:
+                os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        now = time.time()
+        with self._lock, self._connect() as db:
+            db.execute(
+                "INSERT INTO uploads (digest, size, created_at, last_used) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(digest) DO UPDATE SET last_used = excluded.last_used",
+                (upload_id, size, now, now),
+            )
+            db.execute(
+                "INSERT INTO aliases (name, digest, created_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(name, digest) DO UPDATE SET created_at = excluded.created_at",
+                (filename, upload_id, now),
+            )
+        if duplicate:
+            logger.info("Upload %s is a duplicate of %s", filename, upload_id)
+
+        return {
+            "id": upload_id,
+            "path": path,
+            "filename": filename,
+            "size": size,
+            "duplicate": duplicate,
+            "evicted": self.evict(keep=upload_id),
+        }
+
+    def path_for(self, upload_id: str) -> str:
+        """
+        Path of a stored upload; marks it as used.
+        """
+        if not _OBJECT_NAME.match(f"{upload_id}.csv"):
+            raise UploadNotFound(upload_id)
+        path = self.object_path(upload_id)
+        if not os.path.exists(path):
+            raise UploadNotFound(upload_id)
+        with self._lock, self._connect() as db:
+            db.execute("UPDATE uploads SET last_used = ? WHERE digest = ?", (time.time(), upload_id))
+        return path
+
+    def filename_of(self, upload_id: str) -> str:
+        """
+        The name the upload was most recently uploaded under.
+        """
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT name FROM aliases WHERE digest = ? ORDER BY created_at DESC LIMIT 1",
+                (upload_id,),
+            ).fetchone()
+        if row is None:
+            raise UploadNotFound(upload_id)
+        return row[0]
+
+    def total_mb(self) -> float:
+        with self._connect() as db:
+            (total,) = db.execute("SELECT COALESCE(SUM(size), 0) FROM uploads").fetchone()
+        return total / (1024 * 1024)
+
+    def evict(self, keep: Optional[str] = None) -> List[str]:
+        """
+        Removes least recently used uploads idle for grace_s until the
+        store fits max_mb; returns their ids. `keep` is never removed.
+        """
+        evicted: List[str] = []
+        cutoff = time.time() - self.grace_s
+        with self._lock, self._connect() as db:
+            (total,) = db.execute("SELECT COALESCE(SUM(size), 0) FROM uploads").fetchone()
+            budget = self.max_mb * 1024 * 1024
+            if total <= budget:
+                return evicted
+            candidates = db.execute(
+                "SELECT digest, size FROM uploads WHERE last_used < ? AND digest != ? "
+                "ORDER BY last_used",
+                (cutoff, keep or ""),
+            ).fetchall()
+            for digest, size in candidates:
+                if total <= budget:
+                    break
+                path = self.object_path(digest)
+                if os.path.exists(path):
+                    os.remove(path)
+                db.execute("DELETE FROM uploads WHERE digest = ?", (digest,))
+                db.execute("DELETE FROM aliases WHERE digest = ?", (digest,))
+                total -= size
+                evicted.append(digest)
+
+        if evicted:
+            logger.info("Evicted %d upload(s) from the store", len(evicted))
+        if total > budget:
+            logger.warning(
+                "Upload store at %.1f MB exceeds %.1f MB; remaining uploads are in use",
+                total / (1024 * 1024), self.max_mb,
+            )
+        return evicted
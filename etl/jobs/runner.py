@@ -0,0 +1,251 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Any, Callable, Dict
+
+from etl.jobs.store import (
+    CANCELLED,
+    FAILED,
+    FINISHED_STATUSES,
+    SUCCEEDED,
+    JobStore,
+)
+from etl.extract.cache import frame_cache
+from etl.extract.reader import count_csv_rows
+from etl.pipeline import PipelineCancelled, run_pipeline
+
+logger = logging.getLogger(__name__)
+
+# Pipeline runs executing at once
+JOB_WORKERS = int(os.getenv("ETL_JOB_WORKERS", "2"))
+
+# Jobs queued or running at once; submissions beyond this are refused
+MAX_PENDING_JOBS = int(os.getenv("ETL_MAX_PENDING_JOBS", "20"))
+
+# Where pipeline runs execute: "process" (worker processes, so CPU-bound
+# cleaning does not hold the web process's GIL) or "thread"
+JOB_EXECUTOR = os.getenv("ETL_JOB_EXECUTOR", "process")
+
+# Seconds between heartbeats of the jobs this process owns
+JOB_HEARTBEAT_SECONDS = float(os.getenv("ETL_JOB_HEARTBEAT_SECONDS", "10"))
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+# ======================================================
+# JOB BODIES
+# ======================================================
+
+def _run_pipeline(store: JobStore, job_id: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    def progress(stage: str, iteration: int) -> None:
+        if store.cancel_requested(job_id):
+            raise PipelineCancelled(f"Job {job_id} cancelled")
+        store.record_stage(job_id, stage, iteration)
+
+    return run_pipeline(progress=progress, **params)
+
+
+def _run_row_count(store: JobStore, job_id: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    store.record_stage(job_id, "count", 0)
+    return {"rows": count_csv_rows(params["file_path"])}
+
+
+def _run_cache_warmup(store: JobStore, job_id: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    store.record_stage(job_id, "read", 0)
+    df, _ = frame_cache.read_csv(params["file_path"])
+    return {"rows": len(df)}
+
+
+_TARGETS: Dict[str, Callable[[JobStore, str, Dict[str, Any]], Dict[str, Any]]] = {
+    "pipeline": _run_pipeline,
+    "row_count": _run_row_count,
+    "cache_warmup": _run_cache_warmup,
+}
+
+
+def _run_job(store: JobStore, job_id: str, kind: str, params: Dict[str, Any]) -> None:
+    """
+    Runs one job and records its outcome; called in a pool thread or a
+    worker process.
+    """
+    try:
+        if store.cancel_requested(job_id):
+            store.finish(job_id, CANCELLED)
+            return
+        store.mark_running(job_id)
+        result = _TARGETS[kind](store, job_id, params)
+        store.finish(job_id, SUCCEEDED, result=result)
+    except PipelineCancelled:
+        logger.info("Job %s cancelled", job_id)
+        store.finish(job_id, CANCELLED)
+    except Exception as e:
+        logger.exception("Job %s failed", job_id)
+        store.finish(job_id, FAILED, error=str(e))
+
+
+# ======================================================
+# QUEUE
+# ======================================================
+
+class JobQueue:
+    """
+    Runs jobs in the background, tracking them in a JobStore so their
+    status survives the request that submitted them.
+
+    Pipeline runs go to a pool of worker processes (see JOB_EXECUTOR), so
+    web requests do not wait on the GIL behind them; each worker keeps
+    its own frame cache. Row counts and cache warmups are I/O bound and
+    run on threads, warming this process's cache for previews.
+
+    The queue heartbeats the jobs it owns and periodically fails jobs
+    whose owning process is gone (see JobStore.fail_orphaned).
+
+    Progress is recorded as each pipeline stage starts. Cancellation is
+    cooperative: a queued job never starts, a running one stops at its
+    next stage boundary (an LLM call in flight is not interrupted).
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        workers: int = JOB_WORKERS,
+        max_pending: int = MAX_PENDING_JOBS,
+        executor: str = JOB_EXECUTOR,
+        heartbeat_seconds: float = JOB_HEARTBEAT_SECONDS,
+    ):
+        if executor not in ("process", "thread"):
+            raise ValueError(f"Unknown job executor: {executor}")
+        self.store = store
+        self.max_pending = max_pending
+        self.workers = workers
+        self.executor = executor
+        self._threads = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="etl-job")
+        self._pipelines = self._new_process_pool() if executor == "process" else self._threads
+        self._pending = 0
+        self._lock = threading.Lock()
+
+        self.store.fail_orphaned()
+        self._stopped = threading.Event()
+        self._heartbeat = threading.Thread(
+            target=self._beat, args=(heartbeat_seconds,), name="etl-job-heartbeat", daemon=True
+        )
+        self._heartbeat.start()
+
+    def _new_process_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context("forkserver")
+        )
+
+    def _beat(self, interval: float) -> None:
+        while not self._stopped.wait(interval):
+            try:
+                self.store.heartbeat()
+                self.store.fail_orphaned()
+            except Exception:
+                logger.exception("Job heartbeat failed")
+
+    def submit_pipeline(self, input_csv_path: str, output_csv_path: str, **options: Any) -> str:
+        """
+        Queues run_pipeline(input_csv_path, output_csv_path, **options)
+        and returns the job id.
+        """
+        params = {"input_csv_path": input_csv_path, "output_csv_path": output_csv_path, **options}
+        return self._submit("pipeline", params)
+
+    def submit_row_count(self, file_path: str) -> str:
+        """
+        Queues an exact row count of an uploaded file (see count_csv_rows),
+        refining the estimate shown in its preview.
+        """
+        return self._submit("row_count", {"file_path": file_path})
+
+    def submit_cache_warmup(self, file_path: str) -> str:
+        """
+        Queues a full parse of an upload into the frame cache.
+        """
+        return self._submit("cache_warmup", {"file_path": file_path})
+
+    def _submit(self, kind: str, params: Dict[str, Any]) -> str:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise JobQueueFull(f"{self._pending} jobs pending (limit {self.max_pending})")
+            self._pending += 1
+
+        job_id = None
+        try:
+            job_id = self.store.create(kind, params)
+            future = self._dispatch(job_id, kind, params)
+        except Exception as e:
+            with self._lock:
+                self._pending -= 1
+            if job_id is not None:
+                self.store.finish(job_id, FAILED, error=str(e))
+            raise
+        future.add_done_callback(partial(self._done, job_id))
+        return job_id
+
+    def _dispatch(self, job_id: str, kind: str, params: Dict[str, Any]) -> Future:
+        if kind != "pipeline":
+            return self._threads.submit(_run_job, self.store, job_id, kind, params)
+        try:
+            return self._pipelines.submit(_run_job, self.store, job_id, kind, params)
+        except BrokenProcessPool:
+            # A worker died (the OOM killer, say); start a fresh pool
+            logger.warning("Job worker pool broken, restarting it")
+            self._pipelines = self._new_process_pool()
+            return self._pipelines.submit(_run_job, self.store, job_id, kind, params)
+
+    def _done(self, job_id: str, future: Future) -> None:
+        with self._lock:
+            self._pending -= 1
+        # _run_job records its own failures; this is a worker that died mid-job
+        error = future.exception()
+        if error is not None:
+            logger.error("Job %s lost its worker: %s", job_id, error)
+            self.store.finish(job_id, FAILED, error=f"Job worker died: {error}")
+
+    def cancel(self, job_id: str) -> Dict[str, Any]:
+        """
+        Requests cancellation; returns the job as it stands.
+        """
+        job = self.store.get(job_id)
+        if job["status"] not in FINISHED_STATUSES:
+            self.store.request_cancel(job_id)
+            job = self.store.get(job_id)
+        return job
+
+    def get(self, job_id: str) -> Dict[str, Any]:
+        return self.store.get(job_id)
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._stopped.set()
+        self._threads.shutdown(wait=wait)
+        if self._pipelines is not self._threads:
+            self._pipelines.shutdown(wait=wait)
+
+
+def job_summary(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Job fields for status polling. Pipeline results can be large and are
+    left out; small results (row counts) are included.
+    """
+    return {
+        "id": job["id"],
+        "status": job["status"],
+        "stage": job["stage"],
+        "iteration": job["iteration"],
+        "stages": job["stages"],
+        "error": job["error"],
+        "cancel_requested": job["cancel_requested"],
+        "finished": job["status"] in FINISHED_STATUSES,
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+        "result": job["result"] if job["kind"] != "pipeline" else None,
+    }
@@ -0,0 +1,257 @@
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+JOB_DB_PATH = os.getenv("ETL_JOB_DB_PATH", "data/jobs.sqlite3")
+
+# Seconds without a heartbeat after which an unfinished job's owner is
+# taken to be gone (the queue heartbeats every ETL_JOB_HEARTBEAT_SECONDS)
+JOB_HEARTBEAT_TIMEOUT = float(os.getenv("ETL_JOB_HEARTBEAT_TIMEOUT", "60"))
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATUSES = {SUCCEEDED, FAILED, CANCELLED}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    params TEXT NOT NULL,
+    stage TEXT,
+    iteration INTEGER NOT NULL DEFAULT 0,
+    stages TEXT NOT NULL DEFAULT '[]',
+    result TEXT,
+    error TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    updated_at REAL NOT NULL,
+    finished_at REAL,
+    owner TEXT,
+    heartbeat_at REAL
+)
+"""
+
+# Columns added after the first schema, for job files created before them
+_ADDED_COLUMNS = {"owner": "TEXT", "heartbeat_at": "REAL"}
+
+_COLUMNS = [
+    "id", "kind", "status", "params", "stage", "iteration", "stages", "result",
+    "error", "cancel_requested", "created_at", "started_at", "updated_at", "finished_at",
+    "owner", "heartbeat_at",
+]
+
+
+class JobNotFound(Exception):
+    pass
+
+
+def _boot_id() -> str:
+    try:
+        with open("/proc/sys/kernel/random/boot_id") as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+
+# Host and boot of this machine; a pid is only meaningful within both
+_HOST_BOOT = f"{socket.gethostname()}/{_boot_id()}"
+
+
+def process_owner() -> str:
+    """
+    Owner id of the calling process: host, boot id and pid.
+    """
+    return f"{_HOST_BOOT}/{os.getpid()}"
+
+
+def _pid_running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def owner_alive(owner: Optional[str], heartbeat_at: Optional[float], now: float) -> bool:
+    """
+    Whether the process that owns a job may still run it. Owners on this
+    host and boot are checked by pid; any owner whose heartbeat is older
+    than JOB_HEARTBEAT_TIMEOUT is gone (covers other hosts and reused pids).
+    """
+    if owner is None:
+        return False
+    if owner == process_owner():
+        return True
+    if heartbeat_at is None or now - heartbeat_at > JOB_HEARTBEAT_TIMEOUT:
+        return False
+    host_boot, _, pid = owner.rpartition("/")
+    if host_boot == _HOST_BOOT:
+        return _pid_running(int(pid))
+    return True
+
+
+class JobStore:
+    """
+    Persistent job records in a local SQLite file: status, parameters,
+    per-stage progress, result or error, and cancellation requests.
+
+    Safe to share between threads and processes; each call uses its own
+    short-lived connection. Each job records the process that owns it and
+    a heartbeat, so fail_orphaned can tell jobs left behind by a dead
+    process from jobs another live process is still running.
+    """
+
+    def __init__(self, path: str = JOB_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(_SCHEMA)
+            existing = {row[1] for row in db.execute("PRAGMA table_info(jobs)")}
+            for name, kind in _ADDED_COLUMNS.items():
+                if name not in existing:
+                    db.execute(f"ALTER TABLE jobs ADD COLUMN {name} {kind}")
+
+    def __reduce__(self):
+        # Sent to job worker processes by path; each opens its own connections
+        return (JobStore, (self.path,))
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        db = sqlite3.connect(self.path, timeout=30)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def _update(self, job_id: str, **fields: Any) -> None:
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock, self._connect() as db:
+            cursor = db.execute(
+                f"UPDATE jobs SET {assignments} WHERE id = ?",
+                (*fields.values(), job_id),
+            )
+        if cursor.rowcount == 0:
+            raise JobNotFound(job_id)
+
+    def create(self, kind: str, params: Dict[str, Any]) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock, self._connect() as db:
+            db.execute(
+                "INSERT INTO jobs (id, kind, status, params, created_at, updated_at, owner, heartbeat_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, QUEUED, json.dumps(params), now, now, process_owner(), now),
+            )
+        logger.debug("Created job %s (%s)", job_id, kind)
+        return job_id
+
+    def get(self, job_id: str) -> Dict[str, Any]:
+        with self._connect() as db:
+            row = db.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            raise JobNotFound(job_id)
+
+        job = dict(zip(_COLUMNS, row))
+        for name in ("params", "stages", "result"):
+            if job[name] is not None:
+                job[name] = json.loads(job[name])
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        return job
+
+    def recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        with self._connect() as db:
+            ids = [row[0] for row in db.execute(
+                "SELECT id FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+            )]
+        return [self.get(job_id) for job_id in ids]
+
+    def heartbeat(self) -> None:
+        """
+        Refreshes the heartbeat of the unfinished jobs this process owns.
+        """
+        with self._lock, self._connect() as db:
+            db.execute(
+                "UPDATE jobs SET heartbeat_at = ? WHERE owner = ? AND status IN (?, ?)",
+                (time.time(), process_owner(), QUEUED, RUNNING),
+            )
+
+    def fail_orphaned(self) -> List[str]:
+        """
+        Marks failed the queued or running jobs whose owner is gone (see
+        owner_alive) and returns their ids.
+        """
+        now = time.time()
+        with self._lock, self._connect() as db:
+            rows = db.execute(
+                "SELECT id, owner, heartbeat_at FROM jobs WHERE status IN (?, ?)",
+                (QUEUED, RUNNING),
+            ).fetchall()
+            orphaned = [job_id for job_id, owner, heartbeat_at in rows
+                        if not owner_alive(owner, heartbeat_at, now)]
+            db.executemany(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ?, updated_at = ? "
+                "WHERE id = ? AND status IN (?, ?)",
+                [(FAILED, "Interrupted: the process running it is gone", now, now, job_id, QUEUED, RUNNING)
+                 for job_id in orphaned],
+            )
+        if orphaned:
+            logger.warning("Marked %d orphaned jobs failed", len(orphaned))
+        return orphaned
+
+    def mark_running(self, job_id: str) -> None:
+        self._update(job_id, status=RUNNING, started_at=time.time())
+
+    def record_stage(self, job_id: str, stage: str, iteration: int) -> None:
+        """
+        Records that `stage` of `iteration` started; the stage list keeps
+        the start time of every stage run so far.
+        """
+        stages = self.get(job_id)["stages"]
+        stages.append({"stage": stage, "iteration": iteration, "started_at": time.time()})
+        self._update(job_id, stage=stage, iteration=iteration, stages=json.dumps(stages))
+
+    def finish(
+        self,
+        job_id: str,
+        status: str,
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        self._update(
+            job_id,
+            status=status,
+            # Non-JSON values (numpy scalars, timestamps) are stored as text
+            result=json.dumps(result, default=str) if result is not None else None,
+            error=error,
+            finished_at=time.time(),
+        )
+
+    def request_cancel(self, job_id: str) -> None:
+        self._update(job_id, cancel_requested=1)
+
+    def cancel_requested(self, job_id: str) -> bool:
+        return self.get(job_id)["cancel_requested"]
@@ -0,0 +1,272 @@
+import fcntl
+import json
+import logging
+import os
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# ======================================================
+# CONFIG
+# ======================================================
+
+LIMITER_DIR = os.getenv(
+    "LLM_LIMITER_DIR",
+    os.path.join(tempfile.gettempdir(), "etl_llm_limiter"),
+)
+MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "4"))
+TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "12000"))
+QUEUE_TIMEOUT_SECONDS = float(os.getenv("LLM_QUEUE_TIMEOUT", "300"))
+
+WINDOW_SECONDS = 60.0
+STALE_SLOT_SECONDS = 300.0
+# Waiting callers refresh their ticket on every poll; a ticket not
+# refreshed for this long belongs to a caller that is gone
+STALE_TICKET_SECONDS = 30.0
+POLL_INTERVAL_SECONDS = 0.05
+MAX_SLEEP_SECONDS = 1.0
+
+# Rough chars-per-token ratio for English/JSON prompts
+CHARS_PER_TOKEN = 4
+
+
+class LLMLimiterTimeout(Exception):
+    """Raised when a caller waited longer than the queue timeout for a slot."""
+    pass
+
+
+# ======================================================
+# TOKEN ESTIMATION
+# ======================================================
+
+def estimate_tokens(*texts: str, completion_tokens: int = 0) -> int:
+    """
+    Estimate the token cost of a request from the measured prompt size
+    plus the completion budget reserved for the response.
+    """
+    logger.debug("Entering estimate_tokens")
+    prompt_chars = sum(len(t) for t in texts if t)
+    return prompt_chars // CHARS_PER_TOKEN + 1 + completion_tokens
+
+
+# ======================================================
+# SHARED STATE (file-lock protected)
+# ======================================================
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+@contextmanager
+def _locked_state(state_dir: str) -> Iterator[Dict[str, Any]]:
+    """
+    Holds an exclusive flock on the limiter state for the duration of the
+    block. Works across processes (gunicorn workers) on one host. The
+    state is written back even when the block raises, so changes made
+    before the exception (a timed-out caller leaving the queue) persist.
+    """
+    os.makedirs(state_dir, exist_ok=True)
+    path = os.path.join(state_dir, "state.json")
+
+    with open(path, "a+") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            f.seek(0)
+            raw = f.read()
+            try:
+                state = json.loads(raw) if raw else {}
+            except json.JSONDecodeError:
+                logger.warning("Corrupt limiter state, resetting: %s", path)
+                state = {}
+
+            state.setdefault("queue", [])
+            state.setdefault("in_flight", [])
+            state.setdefault("usage", [])
+
+            try:
+                yield state
+            finally:
+                f.seek(0)
+                f.truncate()
+                json.dump(state, f)
+                f.flush()
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _prune(state: Dict[str, Any], now: float) -> None:
+    state["queue"] = [
+        t for t in state["queue"]
+        if _pid_alive(t["pid"]) and now - t["ts"] < STALE_TICKET_SECONDS
+    ]
+    state["in_flight"] = [
+        s for s in state["in_flight"]
+        if _pid_alive(s["pid"]) and now - s["ts"] < STALE_SLOT_SECONDS
+    ]
+    state["usage"] = [
+        u for u in state["usage"] if now - u["ts"] < WINDOW_SECONDS
+    ]
+
+
+# ======================================================
+# LIMITER
+# ======================================================
+
+class LLMSlot:
+    """
+    Handle for an acquired LLM slot. Call record_usage() with the token count
+    reported by the provider so the shared budget reflects real usage.
+    """
+
+    def __init__(self, limiter: "LLMLimiter", slot_id: str, tokens: int):
+        self.limiter = limiter
+        self.slot_id = slot_id
+        self.tokens = tokens
+        self.actual_tokens: Optional[int] = None
+
+    def record_usage(self, tokens: Optional[int]) -> None:
+        if tokens is not None:
+            self.actual_tokens = int(tokens)
+
+
+class LLMLimiter:
+    """
+    Host-wide LLM concurrency limiter with a tokens-per-minute budget.
+
+    Callers are queued FIFO and block until both an in-flight slot and enough
+    token budget are free, so bursts are smoothed out instead of failing.
+    """
+
+    def __init__(
+        self,
+        state_dir: str = LIMITER_DIR,
+        max_in_flight: int = MAX_IN_FLIGHT,
+        tokens_per_minute: int = TOKENS_PER_MINUTE,
+        queue_timeout: float = QUEUE_TIMEOUT_SECONDS,
+    ):
+        self.state_dir = state_dir
+        self.max_in_flight = max_in_flight
+        self.tokens_per_minute = tokens_per_minute
+        self.queue_timeout = queue_timeout
+
+    def _try_acquire(
+        self,
+        state: Dict[str, Any],
+        ticket: str,
+        tokens: int,
+        now: float,
+    ) -> float:
+        """
+        Returns 0.0 if the slot was granted, otherwise seconds to wait.
+        """
+        if not state["queue"] or state["queue"][0]["id"] != ticket:
+            return POLL_INTERVAL_SECONDS
+
+        if self.max_in_flight > 0 and len(state["in_flight"]) >= self.max_in_flight:
+            return POLL_INTERVAL_SECONDS
+
+        if self.tokens_per_minute > 0 and state["usage"]:
+            used = sum(u["tokens"] for u in state["usage"])
+            # An oversized request is admitted alone once the window is empty
+            if used + tokens > self.tokens_per_minute:
+                oldest = min(u["ts"] for u in state["usage"])
+                return max(oldest + WINDOW_SECONDS - now, POLL_INTERVAL_SECONDS)
+
+        state["queue"].pop(0)
+        state["in_flight"].append({
+            "id": ticket,
+            "pid": os.getpid(),
+            "ts": now,
+        })
+        state["usage"].append({
+            "id": ticket,
+            "ts": now,
+            "tokens": tokens,
+        })
+        return 0.0
+
+    def acquire(self, tokens: int) -> LLMSlot:
+        logger.debug("Entering LLMLimiter.acquire: tokens=%s", tokens)
+        ticket = uuid.uuid4().hex
+        started = time.monotonic()
+
+        with _locked_state(self.state_dir) as state:
+            state["queue"].append({
+                "id": ticket,
+                "pid": os.getpid(),
+                "ts": time.time(),
+            })
+
+        try:
+            while True:
+                with _locked_state(self.state_dir) as state:
+                    now = time.time()
+                    _prune(state, now)
+                    own = [t for t in state["queue"] if t["id"] == ticket]
+                    if own:
+                        own[0]["ts"] = now
+                    else:
+                        # Pruned while this caller was stalled: rejoin at the back
+                        state["queue"].append({"id": ticket, "pid": os.getpid(), "ts": now})
+                    wait = self._try_acquire(state, ticket, tokens, now)
+
+                    if wait == 0.0:
+                        waited = time.monotonic() - started
+                        if waited > 1.0:
+                            logger.info("LLM slot granted after %.1fs in queue", waited)
+                        return LLMSlot(self, ticket, tokens)
+
+                if time.monotonic() - started > self.queue_timeout:
+                    raise LLMLimiterTimeout(
+                        f"Timed out after {self.queue_timeout:.0f}s waiting for an LLM slot"
+                    )
+
+                time.sleep(min(wait, MAX_SLEEP_SECONDS))
+        except BaseException:
+            # Timed out or interrupted: leave the queue so callers behind
+            # this ticket are not blocked by it
+            self._leave_queue(ticket)
+            raise
+
+    def _leave_queue(self, ticket: str) -> None:
+        with _locked_state(self.state_dir) as state:
+            state["queue"] = [t for t in state["queue"] if t["id"] != ticket]
+
+    def release(self, slot: LLMSlot) -> None:
+        logger.debug("Entering LLMLimiter.release")
+        with _locked_state(self.state_dir) as state:
+            state["in_flight"] = [
+                s for s in state["in_flight"] if s["id"] != slot.slot_id
+            ]
+            if slot.actual_tokens is not None:
+                for u in state["usage"]:
+                    if u["id"] == slot.slot_id:
+                        u["tokens"] = slot.actual_tokens
+
+    @contextmanager
+    def slot(self, tokens: int) -> Iterator[LLMSlot]:
+        acquired = self.acquire(tokens)
+        try:
+            yield acquired
+        finally:
+            self.release(acquired)
+
+
+_default_limiter: Optional[LLMLimiter] = None
+
+
+def get_limiter() -> LLMLimiter:
+    global _default_limiter
+    if _default_limiter is None:
+        _default_limiter = LLMLimiter()
+    return _default_limiter
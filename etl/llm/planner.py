@@ -1,8 +1,13 @@
 import json
 import logging
 import os
-from typing import Dict, Any, List, Optional
+import time
+from typing import Dict, Any, List, Optional, Callable
 from etl.llm.json_utils import parse_llm_json
+from etl.llm.limiter import get_limiter, estimate_tokens
+from etl.executor.code_executor import CODE_STEPS_ENABLED
+from etl.executor.safety import CODE_STEP_FUNCTIONS
+from etl.executor.tracing import span
 
 logger = logging.getLogger(__name__)
 
@@ -26,8 +31,19 @@ ALLOWED_TOOLS = [
     "drop_column",
     "normalize_currency",
     "normalize_percentage",
+    "parse_currency_range",
+    "to_categorical",
+    "downcast_numeric",
+    "remove_near_duplicates",
 ]
 
+MAX_COMPLETION_TOKENS = 800
+
+# Provider 429s are retried here (waiting in the shared limiter queue)
+# instead of surfacing as a failed pipeline iteration.
+RATE_LIMIT_RETRIES = int(os.getenv("LLM_RATE_LIMIT_RETRIES", "3"))
+RATE_LIMIT_BACKOFF_SECONDS = 2.0
+
 PLAN_SCHEMA_EXAMPLE = {
     "steps": [
         {
@@ -72,6 +88,19 @@ NEVER:
 - Apply datetime or numeric conversion without strong evidence
 """
 
+CODE_STEP_RULES = """
+CODE STEPS (ONLY when no allowed tool can do the job):
+- Format: {"type": "code", "code": "<python>"}
+- The code reads the DataFrame `df` and must assign the result back to `df`
+- Use DataFrame/Series methods and the .str/.dt/.cat accessors; index
+  columns as df["name"]. Other attributes (to_csv, eval, query, dunders)
+  are rejected
+- apply/agg/transform/map take a lambda, a builtin or a reduction name
+  such as "sum"; do not rebind builtins, pd or np
+- No imports and no I/O; `pd` and `np` expose only: """ + ", ".join(
+    f"{alias}.{name}" for alias in sorted(CODE_STEP_FUNCTIONS) for name in sorted(CODE_STEP_FUNCTIONS[alias])
+) + "\n"
+
 # ======================================================
 # USER PROMPT BUILDER
 # ======================================================
@@ -93,6 +122,13 @@ STRICT INSTRUCTIONS:
 - Do NOT repeat the failed step
 - Fix missing or incorrect arguments
 - Choose a safer alternative if uncertain
+"""
+        if feedback.get("completed_steps"):
+            feedback_block += """
+RESUMING FROM CHECKPOINT:
+- The steps in "completed_steps" were already applied successfully
+- The profile above describes the data AFTER those steps
+- Output ONLY the remaining steps; do NOT repeat completed steps
 """
 
     return f"""
@@ -105,16 +141,20 @@ IMPORTANT SEMANTIC RULES (READ CAREFULLY):
 - semantic_type == "datetime" → parse_datetime
 - numeric_string_ratio > 0.9 → convert_numeric
 - contains_currency_symbols == true AND semantic_type in ["numeric_like_text", "text"] AND boolean_string_ratio < 0.5 → normalize_currency
+- contains_currency_symbols == true AND sample values are ranges or use K/M suffixes (e.g. "$137K-$171K") → parse_currency_range (NOT normalize_currency)
 - contains_percentage_symbol == true → normalize_percentage
 - semantic_type in ["text", "categorical"] → trim_whitespace
 - duplicate_rows > 0 → remove_duplicates
+- rows that repeat the same long text (e.g. a posting) with small differences → remove_near_duplicates AFTER remove_duplicates; args: "columns" = the long text columns, optional "blocking_keys" = short columns near-duplicates always share (e.g. company name), optional "threshold" (0.5-1, default 0.9)
+- semantic_type == "categorical" AND cardinality_ratio < 0.05 → to_categorical (LAST, after all text cleaning of that column)
+- semantic_type == "numeric", or a column converted by an earlier step → downcast_numeric (LAST, after the conversion)
 
 STRICT SAFETY RULES:
 - NEVER apply normalize_currency if semantic_type == "text"
 - NEVER apply normalize_currency if avg_string_length > 20
 - NEVER apply normalize_currency to free_text or description-like columns
 
-
+{CODE_STEP_RULES if CODE_STEPS_ENABLED else ""}
 {feedback_block}
 
 ALLOWED TOOLS:
@@ -126,6 +166,53 @@ OUTPUT FORMAT EXAMPLE:
 Generate a minimal, safe, justified cleaning plan.
 """
 
+# ======================================================
+# RATE LIMITING
+# ======================================================
+
+def _retry_after_seconds(error: Exception, attempt: int) -> float:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return RATE_LIMIT_BACKOFF_SECONDS * (2 ** attempt)
+
+
+def call_with_limiter(
+    request_fn: Callable[[], Any],
+    system_prompt: str,
+    user_prompt: str,
+) -> Any:
+    """
+    Runs an LLM request inside the shared host-wide limiter.
+
+    The token reservation is based on the measured prompt size plus the
+    completion budget and is corrected with the provider-reported usage.
+    """
+    logger.debug("Entering call_with_limiter")
+    limiter = get_limiter()
+    tokens = estimate_tokens(
+        system_prompt, user_prompt, completion_tokens=MAX_COMPLETION_TOKENS
+    )
+
+    for attempt in range(RATE_LIMIT_RETRIES + 1):
+        with limiter.slot(tokens) as slot:
+            try:
+                response = request_fn()
+            except Exception as e:
+                if getattr(e, "status_code", None) != 429 or attempt == RATE_LIMIT_RETRIES:
+                    raise
+                delay = _retry_after_seconds(e, attempt)
+            else:
+                usage = getattr(response, "usage", None)
+                slot.record_usage(getattr(usage, "total_tokens", None))
+                return response
+
+        logger.warning("LLM provider rate limited; retrying in %.1fs", delay)
+        time.sleep(delay)
+
+
 # ======================================================
 # OpenAI Client
 # ======================================================
@@ -146,14 +233,18 @@ def call_openai(system_prompt: str, user_prompt: str) -> str:
 
     client = OpenAI(api_key=api_key)
 
-    response = client.chat.completions.create(
-        model=model,
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt},
-        ],
-        temperature=0.0,
-        max_tokens=800,
+    response = call_with_limiter(
+        lambda: client.chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ],
+            temperature=0.0,
+            max_tokens=MAX_COMPLETION_TOKENS,
+        ),
+        system_prompt,
+        user_prompt,
     )
 
     # extract content
@@ -183,14 +274,18 @@ def call_groq(system_prompt: str, user_prompt: str) -> str:
     logger.debug("Entering call_groq")
     client = get_groq_client()
 
-    response = client.chat.completions.create(
-        model="llama-3.3-70b-versatile",
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt},
-        ],
-        temperature=0.0,
-        max_tokens=800,
+    response = call_with_limiter(
+        lambda: client.chat.completions.create(
+            model="llama-3.3-70b-versatile",
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ],
+            temperature=0.0,
+            max_tokens=MAX_COMPLETION_TOKENS,
+        ),
+        system_prompt,
+        user_prompt,
     )
 
     return response.choices[0].message.content.strip()
@@ -204,6 +299,11 @@ def validate_plan(plan: Dict[str, Any]) -> None:
         raise ValueError("Plan must contain a 'steps' list")
 
     for i, step in enumerate(plan["steps"]):
+        if step.get("type") == "code" and CODE_STEPS_ENABLED:
+            if not isinstance(step.get("code"), str) or not step["code"].strip():
+                raise ValueError(f"Code step at index {i} has no code")
+            continue
+
         if step.get("type") != "tool":
             raise ValueError(
                 f"Invalid step type at index {i}: {step.get('type')}"
@@ -228,17 +328,20 @@ def generate_plan(
 ) -> Dict[str, Any]:
 
     logger.debug("Entering generate_plan")
-    profile_json = json.dumps(profile, indent=2)
+    with span("build_prompt") as prompt_span:
+        profile_json = json.dumps(profile, indent=2)
+        user_prompt = build_user_prompt(profile_json, feedback)
+        prompt_span.set(prompt_chars=len(user_prompt))
 
-    user_prompt = build_user_prompt(profile_json, feedback)
-    #llm_output = call_openai(SYSTEM_PROMPT, user_prompt)
-    llm_output = call_groq(SYSTEM_PROMPT, user_prompt)
+    with span("llm_call", provider="groq"):
+        #llm_output = call_openai(SYSTEM_PROMPT, user_prompt)
+        llm_output = call_groq(SYSTEM_PROMPT, user_prompt)
 
     try:
         plan = parse_llm_json(llm_output)
         for step in plan.get("steps", []):
             if "type" not in step:
-                step["type"] = "tool"
+                step["type"] = "code" if "code" in step else "tool"
     except json.JSONDecodeError:
         raise ValueError(f"LLM returned invalid JSON:\n{llm_output}")
 
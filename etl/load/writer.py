@@ -0,0 +1,243 @@
+import io
+import logging
+import os
+import time
+from typing import Any, Dict, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+from etl.executor.tracing import span
+
+logger = logging.getLogger(__name__)
+
+# ======================================================
+# CONFIG
+# ======================================================
+
+# csv, csv.gz, csv.zst or parquet
+OUTPUT_FORMAT = os.getenv("ETL_OUTPUT_FORMAT", "csv")
+
+# "pandas" formats CSV like pandas.to_csv; "pyarrow" uses Arrow's
+# multi-threaded CSV writer (booleans as true/false, ISO timestamps)
+CSV_ENGINE = os.getenv("ETL_CSV_ENGINE", "pandas")
+
+# Rows formatted per write, bounding the text held in memory at once
+WRITE_CHUNK_ROWS = int(os.getenv("ETL_WRITE_CHUNK_ROWS", "100000"))
+
+OUTPUT_FORMATS = {
+    "csv": None,
+    "csv.gz": "gzip",
+    "csv.zst": "zstd",
+    "parquet": None,
+}
+
+# Largest magnitude a float64 holds exactly for every integer below it
+FLOAT_EXACT_INT = 2 ** 53
+
+CONTENT_TYPES = {
+    "csv": "text/csv",
+    "csv.gz": "application/gzip",
+    "csv.zst": "application/zstd",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+class WriterError(Exception):
+    pass
+
+
+def resolve_output_format(fmt: Optional[str]) -> str:
+    fmt = fmt or OUTPUT_FORMAT
+    if fmt not in OUTPUT_FORMATS:
+        raise WriterError(f"Unknown output format: {fmt}")
+    return fmt
+
+
+def output_path_for(path: str, fmt: Optional[str] = None) -> str:
+    """
+    `path` with the extension of `fmt`: data.csv -> data.csv.gz, data.parquet.
+    CSV paths are returned unchanged.
+    """
+    fmt = resolve_output_format(fmt)
+    if fmt == "csv":
+        return path
+    base = path[:-len(".csv")] if path.endswith(".csv") else path
+    return f"{base}.{fmt}"
+
+
+def output_format_of(path: str) -> Optional[str]:
+    """
+    Output format implied by a file name, or None.
+    """
+    for fmt in sorted(OUTPUT_FORMATS, key=len, reverse=True):
+        if path.endswith(f".{fmt}"):
+            return fmt
+    return None
+
+
+# ======================================================
+# ARROW CONVERSION
+# ======================================================
+
+def _to_arrow(df: pd.DataFrame, schema: Optional[pa.Schema] = None) -> pa.Table:
+    """
+    Arrow table of a frame, cast to `schema` when given. Object columns
+    are written as strings: their type inferred from one chunk (numbers
+    only, say) may not hold the next one. An object chunk of a column the
+    schema types otherwise (booleans with missing values) is cast to it.
+    """
+    arrays = []
+    for pos, col in enumerate(df.columns):
+        series = df.iloc[:, pos]
+        target = schema.field(pos).type if schema is not None else None
+        if series.dtype == object and (target is None or pa.types.is_string(target)):
+            series = series.astype(str).where(series.notna(), None)
+            target = pa.string()
+        try:
+            arrays.append(pa.Array.from_pandas(series, type=target))
+        except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+            raise WriterError(f"Column {col!r} does not match the output schema: {e}") from e
+    names = [str(col) for col in df.columns]
+    return pa.Table.from_arrays(arrays, names=names)
+
+
+# ======================================================
+# CHUNKED WRITER
+# ======================================================
+
+def _widen_schema(table: pa.Table) -> pa.Schema:
+    """
+    Schema for a dataset whose first chunk is `table`. Chunks are parsed
+    separately, so a column read as integers here may come back as float
+    once a later chunk has decimals or missing values; integer columns
+    are stored as float64 unless their values are too large to be exact.
+    """
+    fields = []
+    for field, column in zip(table.schema, table.columns):
+        if pa.types.is_integer(field.type):
+            bounds = pc.min_max(column)
+            low, high = bounds["min"].as_py(), bounds["max"].as_py()
+            if low is None or (-FLOAT_EXACT_INT <= low and high <= FLOAT_EXACT_INT):
+                field = field.with_type(pa.float64())
+        fields.append(field)
+    return pa.schema(fields)
+
+
+class ChunkedWriter:
+    """
+    Appends frames (chunks of one dataset) to a CSV, compressed CSV or
+    Parquet file. The first chunk fixes the header and, for Parquet and
+    the pyarrow CSV engine, the schema later chunks are cast to; with
+    `widen` (for separately parsed chunks) its integer columns are
+    widened to float64, see _widen_schema. Compressed CSV is written
+    through an Arrow compressed stream.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        fmt: Optional[str] = None,
+        engine: Optional[str] = None,
+        widen: bool = True,
+    ):
+        self.path = path
+        self.widen = widen
+        self.format = resolve_output_format(fmt)
+        self.engine = engine or CSV_ENGINE
+        if self.engine not in ("pandas", "pyarrow"):
+            raise WriterError(f"Unknown CSV engine: {self.engine}")
+        self.rows = 0
+        self._header_done = False
+        self._schema: Optional[pa.Schema] = None
+        self._stream: Optional[pa.NativeFile] = None
+        self._text: Optional[io.TextIOWrapper] = None
+        self._csv_writer: Optional[pa_csv.CSVWriter] = None
+        self._parquet_writer: Optional[pq.ParquetWriter] = None
+
+        if self.format != "parquet":
+            self._stream = pa.output_stream(path, compression=OUTPUT_FORMATS[self.format])
+
+    def write(self, df: pd.DataFrame) -> None:
+        for start in range(0, max(len(df), 1), WRITE_CHUNK_ROWS):
+            self._write_chunk(df.iloc[start:start + WRITE_CHUNK_ROWS])
+
+    def _write_chunk(self, df: pd.DataFrame) -> None:
+        if self.format == "parquet" or self.engine == "pyarrow":
+            table = _to_arrow(df, self._schema)
+            if self._schema is None:
+                self._schema = _widen_schema(table) if self.widen else table.schema
+                table = table.cast(self._schema)
+            if self.format == "parquet":
+                if self._parquet_writer is None:
+                    self._parquet_writer = pq.ParquetWriter(self.path, self._schema)
+                self._parquet_writer.write_table(table)
+            else:
+                if self._csv_writer is None:
+                    self._csv_writer = pa_csv.CSVWriter(self._stream, self._schema)
+                self._csv_writer.write_table(table)
+        else:
+            if self._text is None:
+                self._text = io.TextIOWrapper(self._stream, encoding="utf-8", newline="")
+            df.to_csv(self._text, index=False, header=not self._header_done)
+            self._header_done = True
+        self.rows += len(df)
+
+    def close(self) -> None:
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+        if self._csv_writer is not None:
+            self._csv_writer.close()
+        if self._text is not None:
+            self._text.close()
+        elif self._stream is not None and not self._stream.closed:
+            self._stream.close()
+
+    def __enter__(self) -> "ChunkedWriter":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def write_frame(
+    df: pd.DataFrame,
+    path: str,
+    fmt: Optional[str] = None,
+    engine: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Writes a whole frame in WRITE_CHUNK_ROWS chunks and returns metadata
+    (path, format, rows, bytes, seconds). The chunks are slices of one
+    frame, so column types are kept as they are.
+    """
+    logger.debug("Entering write_frame: path=%s fmt=%s engine=%s", path, fmt, engine)
+    start = time.perf_counter()
+    with span("write_frame", path=path, rows=len(df)) as write_span:
+        with ChunkedWriter(path, fmt, engine, widen=False) as writer:
+            writer.write(df)
+        write_span.set(format=writer.format, bytes=os.path.getsize(path))
+    return {
+        "path": path,
+        "format": writer.format,
+        "rows": writer.rows,
+        "bytes": os.path.getsize(path),
+        "seconds": round(time.perf_counter() - start, 4),
+    }
+
+
+def read_output(path: str, **kwargs: Any) -> pd.DataFrame:
+    """
+    Reads a file written by write_frame / ChunkedWriter back into pandas.
+    """
+    fmt = output_format_of(path)
+    if fmt == "parquet":
+        return pd.read_parquet(path, **kwargs)
+    if fmt in ("csv.gz", "csv.zst"):
+        with pa.input_stream(path, compression=OUTPUT_FORMATS[fmt]) as stream:
+            return pd.read_csv(io.BytesIO(stream.read()), **kwargs)
+    return pd.read_csv(path, **kwargs)
+
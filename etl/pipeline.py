@@ -1,41 +1,372 @@
 import logging
-from typing import Dict, Any
+import os
+from typing import Callable, Dict, Any, List, Optional, Set
 import pandas as pd
 
 from etl.validate.validator import sanitize_feedback
-from etl.extract.reader import read_csv_safe
-from etl.profile.profiler import profile_dataframe
+from etl.extract.cache import frame_cache
+from etl.extract.reader import estimate_csv_rows, read_csv_safe
+from etl.load.writer import output_path_for, resolve_output_format, write_frame
+from etl.profile.profiler import profile_dataframe, profile_column
 from etl.profile.serializer import ensure_json_serializable
 from etl.llm.planner import generate_plan
-from etl.executor.tool_executor import execute_plan
-from etl.validate.validator import validate_transformation
+from etl.executor.tool_executor import (
+    StepValidator,
+    ToolExecutionError,
+    execute_plan,
+    find_failing_step,
+    step_columns,
+)
+from etl.executor.checkpoint import CheckpointStore, approx_frame_mb
+from etl.executor.optimizer import optimize_plan
+from etl.executor.streaming import STREAMING_TOOLS, execute_plan_streaming
+from etl.executor.cost_model import (
+    MAX_PLAN_MEMORY_MB,
+    PlanBudgetError,
+    check_budget,
+    compare_with_actuals,
+    estimate_plan_cost,
+    recalibrate,
+    working_memory_mb,
+)
+from etl.executor.instrumentation import StageTimer
+from etl.executor.tracing import trace_run
+from etl.validate.validator import ValidationError, collect_frame_stats, validate_stats
+from etl.validate.expectations import compile_expectations, feed_name, load_expectations
+
+# In streaming mode the planner sees a profile of the first rows only
+STREAMING_PROFILE_ROWS = 100_000
+# Smallest chunk used when a plan is diverted to streaming by the memory budget
+MIN_DIVERTED_CHUNKSIZE = 1_000
+# Rows parsed to estimate the size of the full frame before reading it
+BUDGET_SAMPLE_ROWS = 10_000
+
+# "plan": validate the finished plan; a failure costs a full re-plan.
+# "step": validate after every step and roll back failing steps as they run.
+# "bisect": validate the finished plan; on failure drop the step that caused
+# it (located from per-step stats) and re-execute the rest.
+VALIDATION_MODES = ("plan", "step", "bisect")
+VALIDATION_MODE = os.getenv("ETL_VALIDATION_MODE", "plan")
 
 
 class PipelineError(Exception):
     pass
 
 
+class PipelineCancelled(PipelineError):
+    pass
+
+
+def _refresh_profile(
+    profile: Dict[str, Any],
+    df: pd.DataFrame,
+    steps: List[Dict[str, Any]],
+) -> Dict[str, Any]:
+    """
+    Brings the profile up to date with a checkpoint frame after `steps`
+    ran, re-profiling only the columns those steps changed.
+    """
+    whole_frame = any(
+        step_columns(s) is None and s.get("name") != "drop_column" for s in steps
+    )
+    if whole_frame or profile["dataset"]["rows"] != len(df):
+        refreshed = ensure_json_serializable(profile_dataframe(df))
+        if "last_failure" in profile:
+            refreshed["last_failure"] = profile["last_failure"]
+        return refreshed
+
+    touched = set()
+    for s in steps:
+        touched |= step_columns(s) or set()
+
+    columns = {}
+    for col in df.columns:
+        if col in touched or col not in profile["columns"]:
+            columns[col] = profile_column(df[col], len(df))
+        else:
+            columns[col] = profile["columns"][col]
+
+    refreshed = dict(profile)
+    refreshed["dataset"] = {**profile["dataset"], "columns": len(df.columns)}
+    refreshed["columns"] = columns
+    return ensure_json_serializable(refreshed)
+
+
+def _remaining_work_profile(
+    profile: Dict[str, Any],
+    completed: List[Dict[str, Any]],
+    failed_step: Optional[Dict[str, Any]],
+) -> Dict[str, Any]:
+    """
+    Profile sent to the planner on a resumed retry: columns already handled
+    by completed column steps are left out, except the failed step's column.
+    """
+    handled = set()
+    for s in completed:
+        handled |= step_columns(s) or set()
+    if failed_step is not None:
+        handled -= step_columns(failed_step) or set()
+
+    return {
+        **profile,
+        "columns": {
+            col: meta for col, meta in profile["columns"].items()
+            if col not in handled
+        },
+    }
+
+
+def _step_validator(
+    stats_before: Dict[str, Any],
+    prior_steps: List[Dict[str, Any]],
+    check_all_columns: bool = False,
+) -> StepValidator:
+    """
+    Validation callback for execute_plan / find_failing_step that checks
+    a (partial) run against `stats_before`. Columns dropped by
+    `prior_steps` (applied in earlier iterations) count as planned.
+    """
+    def validate(
+        stats_after: Dict[str, Any],
+        modified_columns: Optional[Set[str]],
+        applied_steps: List[Dict[str, Any]],
+    ) -> None:
+        validate_stats(
+            stats_before,
+            stats_after,
+            {"steps": prior_steps + applied_steps},
+            modified_columns=None if check_all_columns else modified_columns,
+        )
+    return validate
+
+
+def _drop_failing_step(
+    result: Dict[str, Any],
+    plan: Dict[str, Any],
+    validate: StepValidator,
+    validation_mode: str,
+    dropped: List[Dict[str, Any]],
+) -> Optional[Dict[str, Any]]:
+    """
+    Validates an executed plan; returns None if it passes. Otherwise, unless
+    validation_mode is "plan", the step that first made validation fail is
+    appended to `dropped` and the plan without it is returned for
+    re-execution. Failures that cannot be pinned on one step are re-raised.
+    """
+    try:
+        validate(result["stats_after"], result.get("modified_columns"), plan["steps"])
+        return None
+    except ValidationError:
+        if validation_mode == "plan":
+            raise
+        found = find_failing_step(result["step_stats"], plan["steps"], validate)
+        if found is None:
+            raise
+        idx, error = found
+        dropped.append({"step": plan["steps"][idx], "reason": str(error)})
+        return {**plan, "steps": plan["steps"][:idx] + plan["steps"][idx + 1:]}
+
+
+def _input_chunksize(input_csv_path: str, dtype_backend: Optional[str] = None) -> int:
+    """
+    Checks the memory budget against the input before it is read in full:
+    returns a chunk size when the parsed frame alone, estimated from a
+    sample and the approximate row count, would exceed
+    ETL_MAX_PLAN_MEMORY_MB, else 0.
+    """
+    if not MAX_PLAN_MEMORY_MB:
+        return 0
+
+    sample, _ = read_csv_safe(input_csv_path, nrows=BUDGET_SAMPLE_ROWS, dtype_backend=dtype_backend)
+    if sample.empty:
+        return 0
+    rows, _ = estimate_csv_rows(input_csv_path)
+    rows = max(rows, len(sample))
+    frame_mb = approx_frame_mb(sample) / len(sample) * rows
+    if frame_mb <= MAX_PLAN_MEMORY_MB:
+        return 0
+    return max(int(rows * MAX_PLAN_MEMORY_MB / frame_mb), MIN_DIVERTED_CHUNKSIZE)
+
+
+def _budgeted_chunksize(
+    plan: Dict[str, Any],
+    profile: Dict[str, Any],
+    estimate: Dict[str, Any],
+    can_stream: bool = True,
+) -> int:
+    """
+    Applies the cost budgets to an in-memory plan. Returns 0 to run in
+    memory, a chunk size to divert a streamable plan whose working memory
+    would exceed the memory budget, or raises PlanBudgetError. The input
+    frame is already resident at this point and stays cached, so only the
+    working memory is budgeted (see check_budget); diverting bounds it to
+    one chunk.
+    """
+    exceeded = check_budget(estimate, max_memory_mb=MAX_PLAN_MEMORY_MB)
+    if exceeded is None:
+        return 0
+
+    streamable = can_stream and all(s.get("name") in STREAMING_TOOLS for s in plan["steps"])
+    if exceeded == "memory" and streamable:
+        rows = profile["dataset"]["rows"]
+        ratio = MAX_PLAN_MEMORY_MB / max(working_memory_mb(estimate), 1e-9)
+        return max(int(rows * ratio), MIN_DIVERTED_CHUNKSIZE)
+
+    raise PlanBudgetError(
+        f"Plan exceeds the {exceeded} budget: estimated "
+        f"{estimate['total_seconds']:.2f}s, {estimate['peak_memory_mb']:.1f} MB peak"
+    )
+
+
+@trace_run("run_pipeline")
 def run_pipeline(
     input_csv_path: str,
     output_csv_path: str,
-    max_iterations: int = 3
+    max_iterations: int = 3,
+    chunksize: Optional[int] = None,
+    dtype_backend: Optional[str] = None,
+    validation_mode: Optional[str] = None,
+    expectations: Optional[Dict[str, Any]] = None,
+    progress: Optional[Callable[[str, int], None]] = None,
+    output_format: Optional[str] = None,
 ) -> Dict[str, Any]:
+    """
+    Profiles the input, asks the planner for a cleaning plan, executes and
+    validates it, retrying with feedback up to max_iterations times.
+
+    With chunksize set, the plan is applied out-of-core chunk by chunk
+    (profiling uses the first STREAMING_PROFILE_ROWS rows), so files larger
+    than memory can be cleaned.
+
+    dtype_backend="pyarrow" (default: ETL_DTYPE_BACKEND) keeps every
+    column Arrow-backed from read to write.
+
+    The result carries "timings": wall seconds per stage (read, profile,
+    plan, execute, validate, write) summed over iterations.
+
+    In-memory runs read, profile and plan the input through the process
+    frame cache (see FrameCache), so repeated runs on one upload start from
+    memory and from the same first plan.
+
+    In-memory runs checkpoint after every successful step: when a step
+    fails, the next iteration resumes from the last good checkpoint and the
+    planner is asked only for the remaining work.
+
+    The memory budget (ETL_MAX_PLAN_MEMORY_MB) is checked before the full
+    read: an input whose parsed frame alone would exceed it is streamed
+    from the start. In-memory plans are then costed from the profile;
+    plans whose working memory (beyond the resident input) exceeds the
+    budget are diverted to streaming when all their tools allow it; other
+    over-budget plans are rejected. Successful in-memory runs recalibrate
+    the cost model from the measured step times.
+
+    validation_mode (default: ETL_VALIDATION_MODE, see VALIDATION_MODES)
+    decides what a validation failure costs. With "step" or "bisect" only
+    the step that caused the row loss or null explosion is dropped and the
+    rest of the plan is kept, instead of re-planning from scratch; dropped
+    steps are listed in the history entry. Streaming runs cannot roll a
+    step back mid-stream, so "step" behaves like "bisect" there.
+
+    The cleaned output is checked against the feed's expectations spec
+    (`expectations`, default: the one stored for the input file, see
+    load_expectations), chunk by chunk when streaming. Violation counts and
+    sample offending rows are reported in the history entry; they do not
+    fail the run.
+
+    `progress` is called with (stage, iteration) as each stage starts
+    (iteration 0 for the initial read and profile). It may raise
+    PipelineCancelled to stop the run at that stage boundary.
+
+    With tracing enabled (ETL_TRACE, sampled by ETL_TRACE_SAMPLE_RATE) the
+    run's spans are exported as Chrome trace JSON to ETL_TRACE_DIR and the
+    result carries its "trace_path".
+
+    The output is written as output_format (default: ETL_OUTPUT_FORMAT,
+    see OUTPUT_FORMATS); for formats other than CSV the extension of
+    output_csv_path is replaced, and the path written is returned as
+    "output_path".
+    """
 
     logger = logging.getLogger(__name__)
     logger.debug("Entering run_pipeline: input=%s output=%s max_iter=%s", input_csv_path, output_csv_path, max_iterations)
 
-    df_raw, read_meta = read_csv_safe(input_csv_path)
-    df_current = df_raw.copy()
+    validation_mode = validation_mode or VALIDATION_MODE
+    if validation_mode not in VALIDATION_MODES:
+        raise PipelineError(f"Unknown validation mode: {validation_mode}")
+
+    if expectations is None:
+        expectations = load_expectations(feed_name(input_csv_path))
+    if expectations is not None:
+        # Fail on a broken spec before any planning
+        compile_expectations(expectations)
+
+    output_format = resolve_output_format(output_format)
+    output_path = output_path_for(output_csv_path, output_format)
+
+    iteration = 0
+
+    def on_stage(stage: str) -> None:
+        if progress is not None:
+            progress(stage, iteration)
+
+    timer = StageTimer(on_stage=on_stage)
+
+    with timer.stage("read"):
+        if not chunksize:
+            chunksize = _input_chunksize(input_csv_path, dtype_backend)
+            if chunksize:
+                logger.info("Input over memory budget, streaming with chunksize=%d", chunksize)
+        if chunksize:
+            df_raw, read_meta = read_csv_safe(
+                input_csv_path, nrows=STREAMING_PROFILE_ROWS, dtype_backend=dtype_backend
+            )
+        else:
+            df_raw, read_meta = frame_cache.read_csv(input_csv_path, dtype_backend=dtype_backend)
+    # execute_plan never mutates its input, so no defensive copy is needed
+    df_current = df_raw
     history = []
 
-    profile = ensure_json_serializable(profile_dataframe(df_current))
+    with timer.stage("profile"):
+        if chunksize:
+            base_profile = ensure_json_serializable(profile_dataframe(df_current))
+        else:
+            base_profile = frame_cache.profile(
+                input_csv_path,
+                lambda df: ensure_json_serializable(profile_dataframe(df)),
+                dtype_backend=dtype_backend,
+            )
+    profile = base_profile
+    # Streaming runs collect their own stats chunk by chunk
+    raw_stats = None if chunksize else collect_frame_stats(df_current)
+
+    checkpoints = CheckpointStore()
+    # Steps already applied to the checkpoint frame by earlier iterations
+    completed: List[Dict[str, Any]] = []
+    failed_step: Optional[Dict[str, Any]] = None
 
     for iteration in range(1, max_iterations + 1):
 
         feedback = sanitize_feedback(history[-1]) if history else None
-        plan = generate_plan(profile, feedback)
+        plan_profile = (
+            _remaining_work_profile(profile, completed, failed_step)
+            if completed else profile
+        )
+        # The first plan depends only on the content's profile
+        cached_plan = feedback is None and not chunksize
+        with timer.stage("plan"):
+            if cached_plan:
+                plan = frame_cache.plan(
+                    input_csv_path,
+                    plan_profile,
+                    lambda: generate_plan(plan_profile, feedback),
+                    dtype_backend=dtype_backend,
+                )
+            else:
+                plan = generate_plan(plan_profile, feedback)
         print("RAW PLAN:", plan)
         if not plan.get("steps"):
+            if cached_plan:
+                frame_cache.discard_plan(input_csv_path, plan_profile, dtype_backend=dtype_backend)
             raise PipelineError("Planner returned empty or invalid steps")
         if not plan["steps"]:
             return {
@@ -44,21 +375,113 @@ def run_pipeline(
                 "plan": plan,
                 "history": history,
                 "read_metadata": read_meta,
+                "timings": timer.summary(),
             }
 
+        run_chunksize = chunksize
         try:
-            result = execute_plan(df_current, plan, profile)
-            df_next = result["df"]
+            optimized = optimize_plan(plan, profile)
+            estimate = estimate_plan_cost(optimized, profile)
+            if not chunksize:
+                run_chunksize = _budgeted_chunksize(
+                    optimized, profile, estimate, can_stream=not completed
+                )
+                if run_chunksize:
+                    logger.info("Plan over memory budget, streaming with chunksize=%d", run_chunksize)
 
-            validate_transformation(df_current, df_next, plan)
-            df_next.to_csv(output_csv_path, index=False)
+            dropped: List[Dict[str, Any]] = []
+            if run_chunksize:
+                partial_path = f"{output_path}.partial"
+                try:
+                    while True:
+                        suite = compile_expectations(expectations) if expectations is not None else None
+                        # Streaming interleaves reading, execution and writing
+                        with timer.stage("execute"):
+                            result = execute_plan_streaming(
+                                input_csv_path, partial_path, optimized, profile,
+                                chunksize=run_chunksize,
+                                dtype_backend=dtype_backend,
+                                expectations=suite,
+                                output_format=output_format,
+                            )
+                        with timer.stage("validate"):
+                            reduced = _drop_failing_step(
+                                result, optimized,
+                                _step_validator(result["stats_before"], [], check_all_columns=True),
+                                validation_mode, dropped,
+                            )
+                        if reduced is None:
+                            break
+                        optimized = reduced
+                        estimate = estimate_plan_cost(optimized, profile)
+                    os.replace(partial_path, output_path)
+                finally:
+                    if os.path.exists(partial_path):
+                        os.remove(partial_path)
+                read_meta = result["read_metadata"]
+            else:
+                resume = checkpoints.load()
+                df_resume = resume[1] if resume else df_current
 
+                # Validated against the raw data from the executor's running
+                # stats; steps completed in earlier iterations are not in
+                # modified_columns, so a resumed run checks every column
+                validate = _step_validator(raw_stats, completed, check_all_columns=bool(resume))
+                while True:
+                    with timer.stage("execute"):
+                        result = execute_plan(
+                            df_resume, optimized, profile, checkpoints=checkpoints,
+                            stats=None if resume else raw_stats,
+                            validate_step=validate if validation_mode == "step" else None,
+                        )
+                    dropped.extend(
+                        {"step": entry["step"], "reason": entry["reason"]}
+                        for entry in result["log"]
+                        if entry.get("status") == "rolled_back"
+                    )
+                    with timer.stage("validate"):
+                        reduced = _drop_failing_step(
+                            result, optimized, validate, validation_mode, dropped
+                        )
+                    if reduced is None:
+                        break
+                    optimized = reduced
+                    estimate = estimate_plan_cost(optimized, profile)
+
+                suite = None
+                if expectations is not None:
+                    with timer.stage("validate"):
+                        suite = compile_expectations(expectations)
+                        suite.evaluate(result["df"])
+                with timer.stage("write"):
+                    write_frame(result["df"], output_path, output_format)
+
+            if dropped:
+                logger.info("Dropped %d step(s) that failed validation", len(dropped))
+
+            checkpoints.clear()
             history.append({
                 "iteration": iteration,
                 "status": "success",
                 "plan": plan,
+                "optimizations": optimized["optimizations"],
                 "execution_log": result["log"],
+                "cost_estimate": estimate,
             })
+            if dropped:
+                history[-1]["dropped_steps"] = dropped
+            if suite is not None:
+                history[-1]["expectations"] = suite.report()
+
+            # Streaming estimates are based on a sample profile, so only
+            # in-memory runs are comparable step by step
+            if not run_chunksize:
+                comparison = compare_with_actuals(estimate, result["log"])
+                history[-1]["cost_comparison"] = comparison
+                try:
+                    recalibrate(comparison)
+                except OSError as e:
+                    logger.warning("Could not save cost model calibration: %s", e)
 
             return {
                 "status": "success",
@@ -66,8 +489,14 @@ def run_pipeline(
                 "plan": plan,
                 "history": history,
                 "read_metadata": read_meta,
+                "output_path": output_path,
+                "timings": timer.summary(),
             }
 
+        except PipelineCancelled:
+            checkpoints.clear()
+            raise
+
         except Exception as e:
             history.append({
                 "iteration": iteration,
@@ -75,10 +504,35 @@ def run_pipeline(
                 "error": str(e),
                 "plan": plan,
             })
+            if cached_plan:
+                # Later runs of this upload must not start from a failing plan
+                frame_cache.discard_plan(input_csv_path, plan_profile, dtype_backend=dtype_backend)
+
+            if isinstance(e, ToolExecutionError) and not run_chunksize:
+                # Resume from the last good step next time; the error says
+                # which steps its frame (the checkpoint) reflects, leaving
+                # out steps rolled back by step validation
+                done = [optimized["steps"][i] for i in e.applied_steps]
+                completed.extend(done)
+                failed_step = optimized["steps"][e.failed_step] if e.failed_step is not None else None
+                history[-1]["completed_steps"] = list(completed)
+                history[-1]["failed_step"] = failed_step
+                checkpoints.persist()
+                if done:
+                    _, df_checkpoint = checkpoints.load()
+                    with timer.stage("profile"):
+                        profile = _refresh_profile(profile, df_checkpoint, done)
+            else:
+                # Validation failures restart from the raw data
+                checkpoints.clear()
+                completed = []
+                failed_step = None
+                profile = base_profile
 
             profile["last_failure"] = {
                 "error": str(e),
                 "failed_plan": plan,
             }
 
+    checkpoints.clear()
     raise PipelineError("Agent failed to converge after max iterations")
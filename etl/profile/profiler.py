@@ -5,6 +5,10 @@ import re
 import warnings
 from typing import Dict, Any, List
 
+from etl.executor.tracing import span
+from etl.transform.cleaners import infer_datetime_format
+from etl.transform.dtypes import as_text, is_text_dtype
+
 logger = logging.getLogger(__name__)
 
 
@@ -13,7 +17,8 @@ logger = logging.getLogger(__name__)
 # =====================================================
 
 NUMERIC_REGEX = re.compile(r"^-?\d+(\.\d+)?$")
-CURRENCY_REGEX = re.compile(r"[\$\€\£\₹]")
+# No escapes inside the class: Arrow's RE2 rejects "\€"
+CURRENCY_REGEX = re.compile(r"[$€£₹]")
 PERCENT_REGEX = re.compile(r"%")
 
 DATE_REGEXES = [
@@ -33,15 +38,15 @@ BOOLEAN_SET = {"true", "false", "yes", "no", "y", "n", "1", "0"}
 
 def numeric_string_ratio(series: pd.Series) -> float:
     logger.debug("Entering numeric_string_ratio")
-    non_null = series.dropna().astype(str)
+    non_null = as_text(series.dropna())
     if non_null.empty:
         return 0.0
-    return float(non_null.str.match(NUMERIC_REGEX).mean())
+    return float(non_null.str.match(NUMERIC_REGEX.pattern).mean())
 
 
 def boolean_string_ratio(series: pd.Series) -> float:
     logger.debug("Entering boolean_string_ratio")
-    non_null = series.dropna().astype(str).str.lower()
+    non_null = as_text(series.dropna()).str.lower()
     if non_null.empty:
         return 0.0
     return float(non_null.isin(BOOLEAN_SET).mean())
@@ -49,25 +54,25 @@ def boolean_string_ratio(series: pd.Series) -> float:
 
 def contains_currency(series: pd.Series) -> bool:
     logger.debug("Entering contains_currency")
-    non_null = series.dropna().astype(str)
-    return bool(non_null.str.contains(CURRENCY_REGEX).any())
+    non_null = as_text(series.dropna())
+    return bool(non_null.str.contains(CURRENCY_REGEX.pattern).any())
 
 
 def contains_percent(series: pd.Series) -> bool:
     logger.debug("Entering contains_percent")
-    non_null = series.dropna().astype(str)
-    return bool(non_null.str.contains(PERCENT_REGEX).any())
+    non_null = as_text(series.dropna())
+    return bool(non_null.str.contains(PERCENT_REGEX.pattern).any())
 
 
 def datetime_string_ratio(series: pd.Series) -> float:
     logger.debug("Entering datetime_string_ratio")
-    non_null = series.dropna().astype(str)
+    non_null = as_text(series.dropna())
     if non_null.empty:
         return 0.0
 
     matches = pd.Series(False, index=non_null.index)
     for regex in DATE_REGEXES:
-        matches |= non_null.str.match(regex)
+        matches |= non_null.str.match(regex.pattern).astype(bool)
 
     return float(matches.mean())
 
@@ -104,7 +109,7 @@ def is_index_like(series: pd.Series, row_count: int) -> bool:
 
 def text_length_stats(series: pd.Series) -> Dict[str, float]:
     logger.debug("Entering text_length_stats")
-    non_null = series.dropna().astype(str)
+    non_null = as_text(series.dropna())
     if non_null.empty:
         return {}
     lengths = non_null.str.len()
@@ -169,7 +174,7 @@ def infer_semantic_type(
         return "numeric"
 
     # 🔒 3. Datetime only for object columns with strong evidence
-    if series.dtype == object:
+    if is_text_dtype(series.dtype):
         if dt_parse_ratio >= 0.8 and dt_string_ratio >= 0.5:
             return "datetime"
 
@@ -191,6 +196,65 @@ def infer_semantic_type(
 # Main profiler
 # =====================================================
 
+def profile_column(series: pd.Series, row_count: int) -> Dict[str, Any]:
+    logger.debug("Entering profile_column: %s", series.name)
+    non_null = series.dropna()
+
+    missing_pct = float(series.isna().mean() * 100)
+    unique_count = int(non_null.nunique())
+    cardinality_ratio = float(unique_count / row_count) if row_count else 0.0
+
+    index_like = is_index_like(series, row_count)
+
+    # 🔒 HARD GATE: datetime logic ONLY for object, non-index columns
+    dt_string_ratio = 0.0
+    dt_parse_ratio = 0.0
+    dt_format = None
+
+    if is_text_dtype(series.dtype) and not index_like:
+        dt_string_ratio = datetime_string_ratio(series)
+        dt_parse_ratio = datetime_parse_ratio(series)
+        if dt_parse_ratio > 0:
+            dt_format = infer_datetime_format(series)
+
+
+    col_profile: Dict[str, Any] = {
+        "dtype": str(series.dtype),
+        "missing_pct": missing_pct,
+        "unique_count": unique_count,
+        "cardinality_ratio": cardinality_ratio,
+        "is_index_like": index_like,
+        "datetime_string_ratio": dt_string_ratio,
+        "datetime_parse_ratio": dt_parse_ratio,
+        "datetime_format": dt_format,
+    }
+
+    # Semantic type
+    col_profile["semantic_type"] = infer_semantic_type(
+        series,
+        index_like,
+        dt_parse_ratio,
+        dt_string_ratio,
+    )
+
+    # -------- Text analysis --------
+    if is_text_dtype(series.dtype):
+        col_profile.update({
+            "numeric_string_ratio": numeric_string_ratio(series),
+            "boolean_string_ratio": boolean_string_ratio(series),
+            "contains_currency_symbols": contains_currency(series),
+            "contains_percentage_symbol": contains_percent(series),
+            **text_length_stats(series),
+            "top_values": top_k_values(series),
+        })
+
+    # -------- Numeric analysis --------
+    if pd.api.types.is_numeric_dtype(series):
+        col_profile.update(numeric_distribution(series))
+
+    return col_profile
+
+
 def profile_dataframe(df: pd.DataFrame) -> Dict[str, Any]:
     logger.debug("Entering profile_dataframe")
     profile: Dict[str, Any] = {}
@@ -214,58 +278,8 @@ def profile_dataframe(df: pd.DataFrame) -> Dict[str, Any]:
     columns_profile: Dict[str, Any] = {}
 
     for col in df.columns:
-        series = df[col]
-        non_null = series.dropna()
-
-        missing_pct = float(series.isna().mean() * 100)
-        unique_count = int(non_null.nunique())
-        cardinality_ratio = float(unique_count / row_count) if row_count else 0.0
-
-        index_like = is_index_like(series, row_count)
-
-        # 🔒 HARD GATE: datetime logic ONLY for object, non-index columns
-        dt_string_ratio = 0.0
-        dt_parse_ratio = 0.0
-
-        if series.dtype == object and not index_like:
-            dt_string_ratio = datetime_string_ratio(series)
-            dt_parse_ratio = datetime_parse_ratio(series)
-
-
-        col_profile: Dict[str, Any] = {
-            "dtype": str(series.dtype),
-            "missing_pct": missing_pct,
-            "unique_count": unique_count,
-            "cardinality_ratio": cardinality_ratio,
-            "is_index_like": index_like,
-            "datetime_string_ratio": dt_string_ratio,
-            "datetime_parse_ratio": dt_parse_ratio,
-        }
-
-        # Semantic type
-        col_profile["semantic_type"] = infer_semantic_type(
-            series,
-            index_like,
-            dt_parse_ratio,
-            dt_string_ratio,
-        )
-
-        # -------- Text analysis --------
-        if series.dtype == object:
-            col_profile.update({
-                "numeric_string_ratio": numeric_string_ratio(series),
-                "boolean_string_ratio": boolean_string_ratio(series),
-                "contains_currency_symbols": contains_currency(series),
-                "contains_percentage_symbol": contains_percent(series),
-                **text_length_stats(series),
-                "top_values": top_k_values(series),
-            })
-
-        # -------- Numeric analysis --------
-        if pd.api.types.is_numeric_dtype(series):
-            col_profile.update(numeric_distribution(series))
-
-        columns_profile[col] = col_profile
+        with span("profile_column", column=col):
+            columns_profile[col] = profile_column(df[col], row_count)
 
     profile["columns"] = columns_profile
     return profile
@@ -0,0 +1,51 @@
+import logging
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def stratified_sample(
+    df: pd.DataFrame,
+    n: int,
+    strata_columns: Optional[List[str]] = None,
+    seed: int = 0,
+) -> pd.DataFrame:
+    """
+    About `n` rows drawn per stratum in proportion to its size, at least
+    one from each stratum while there are no more strata than `n`. Rows
+    keep their original order and index.
+
+    Strata are the rows' missing-value patterns (which columns are null),
+    combined with the values of `strata_columns`, so rare shapes of
+    dirty rows are represented even in a small sample.
+    """
+    logger.debug("Entering stratified_sample: n=%s strata_columns=%s", n, strata_columns)
+    if len(df) <= n:
+        return df
+
+    keys = [pd.util.hash_pandas_object(df.isna(), index=False)]
+    for col in strata_columns or []:
+        keys.append(pd.util.hash_pandas_object(df[col], index=False))
+    strata = pd.Series(keys[0].to_numpy(), index=df.index)
+    for key in keys[1:]:
+        strata = strata * np.uint64(31) + key.to_numpy()
+    codes, uniques = pd.factorize(strata)
+
+    sizes = np.bincount(codes)
+    quotas = sizes * n / len(df)
+    if len(uniques) <= n:
+        quotas = np.maximum(quotas, 1)
+    quotas = np.floor(quotas + 0.5).astype(np.int64)
+
+    # Random rank of each row within its stratum
+    rng = np.random.default_rng(seed)
+    priority = rng.random(len(df))
+    order = np.lexsort((priority, codes))
+    rank = np.empty(len(df), dtype=np.int64)
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    rank[order] = np.arange(len(df)) - np.repeat(starts, sizes)
+
+    return df[rank < quotas[codes]]
@@ -1,14 +1,72 @@
 import logging
+import numpy as np
+import pyarrow as pa
 import pandas as pd
-from typing import List, Optional
+from pandas.tseries.api import guess_datetime_format
+from typing import Any, Callable, List, Optional
 import re
+import warnings
+
+from etl.transform.dtypes import as_text, is_text_dtype, to_numeric
 
 logger = logging.getLogger(__name__)
 
+# Cleaners never write into existing column arrays. They take a shallow copy
+# (new column index, shared column data) and replace whole columns, so a
+# step costs only the columns it touches and its input frame stays intact.
+
+# Dictionary encoding: string transforms on low-cardinality columns run on
+# the distinct values only. Columns shorter than DICT_ENCODE_MIN_ROWS, or
+# whose first DICT_ENCODE_SAMPLE_ROWS rows are more than
+# DICT_ENCODE_MAX_UNIQUE_RATIO distinct, are transformed row by row.
+DICT_ENCODE_MIN_ROWS = 1_000
+DICT_ENCODE_SAMPLE_ROWS = 10_000
+DICT_ENCODE_MAX_UNIQUE_RATIO = 0.5
+# Factorizing hashes every character; transforms that only look at the ends
+# of a string (strip) are cheaper than that on long text
+STRIP_DICT_ENCODE_MAX_AVG_LENGTH = 64
+
+
+def _map_unique(
+    series: pd.Series,
+    transform: Callable[[pd.Series], pd.Series],
+    max_avg_length: Optional[float] = None,
+) -> pd.Series:
+    """
+    Applies an element-wise `transform` to the distinct values of `series`
+    and maps the results back through the factorized codes. Missing values
+    are passed to `transform` directly, so the result is identical to
+    `transform(series)`.
+    """
+    # Arrow strings already run on compute kernels; encoding would round-trip
+    # through Python objects
+    if len(series) < DICT_ENCODE_MIN_ROWS or not isinstance(series.dtype, np.dtype):
+        return transform(series)
+
+    sample = series.iloc[:DICT_ENCODE_SAMPLE_ROWS]
+    if max_avg_length is not None and sample.str.len().mean() > max_avg_length:
+        return transform(series)
+    if sample.nunique(dropna=False) > DICT_ENCODE_MAX_UNIQUE_RATIO * len(sample):
+        return transform(series)
+
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    mapped = transform(pd.Series(uniques, dtype=series.dtype)).to_numpy()
+
+    na_mask = codes == -1
+    if not na_mask.any():
+        values = mapped[codes]
+    else:
+        na_values = transform(series[na_mask]).to_numpy()
+        values = np.empty(len(series), dtype=np.result_type(mapped.dtype, na_values.dtype))
+        values[~na_mask] = mapped[codes[~na_mask]]
+        values[na_mask] = na_values
+
+    return pd.Series(values, index=series.index, name=series.name)
+
 
 def clean_column_names(df: pd.DataFrame) -> pd.DataFrame:
     logger.debug("Entering clean_column_names")
-    df = df.copy()
+    df = df.copy(deep=False)
     df.columns = (
         df.columns
         .str.strip()
@@ -21,7 +79,7 @@ def clean_column_names(df: pd.DataFrame) -> pd.DataFrame:
 
 def standardize_missing(df: pd.DataFrame) -> pd.DataFrame:
     logger.debug("Entering standardize_missing")
-    df = df.copy()
+    df = df.copy(deep=False)
 
     missing_markers = {
         "": pd.NA,
@@ -31,14 +89,17 @@ def standardize_missing(df: pd.DataFrame) -> pd.DataFrame:
         "na": pd.NA,
     }
 
+    def standardize(values: pd.Series) -> pd.Series:
+        return (
+            values
+            .str.strip()
+            .str.lower()
+            .replace(missing_markers)
+        )
+
     for col in df.columns:
-        if df[col].dtype == object:
-            df[col] = (
-                df[col]
-                .str.strip()
-                .str.lower()
-                .replace(missing_markers)
-            )
+        if is_text_dtype(df[col].dtype):
+            df[col] = _map_unique(df[col], standardize)
 
     return df
 
@@ -49,21 +110,24 @@ def trim_whitespace(
     columns: Optional[List[str]] = None,
 ) -> pd.DataFrame:
     logger.debug("Entering trim_whitespace: column=%s columns=%s", column, columns)
-    df = df.copy()
+    df = df.copy(deep=False)
 
     if column:
         target_cols = [column]
     elif columns:
         target_cols = columns
     else:
-        target_cols = df.select_dtypes(include="object").columns
+        target_cols = [c for c in df.columns if is_text_dtype(df[c].dtype)]
+
+    def strip(values: pd.Series) -> pd.Series:
+        # Arrow strings keep nulls as they are; object columns may hold NaN
+        if is_text_dtype(values.dtype) and values.dtype != object:
+            return values.str.strip()
+        return values.where(values.isna(), values.str.strip())
 
     for col in target_cols:
         if col in df.columns:
-            df[col] = df[col].where(
-                df[col].isna(),
-                df[col].str.strip()
-            )
+            df[col] = _map_unique(df[col], strip, STRIP_DICT_ENCODE_MAX_AVG_LENGTH)
 
     return df
 
@@ -78,15 +142,75 @@ def convert_numeric(df: pd.DataFrame, column: str) -> pd.DataFrame:
     if column not in df.columns:
         return df
 
-    df = df.copy()
-    df[column] = pd.to_numeric(df[column], errors="coerce")
+    df = df.copy(deep=False)
+    df[column] = to_numeric(df[column])
     return df
 
 
-def parse_datetime(df: pd.DataFrame, column: str) -> pd.DataFrame:
-    logger.debug("Entering parse_datetime: column=%s", column)
-    df = df.copy()
-    df[column] = pd.to_datetime(df[column], errors="coerce")
+# Formats are guessed on up to this many distinct values and must parse at
+# least DATETIME_FORMAT_MIN_MATCH of them to be used
+DATETIME_FORMAT_SAMPLE = 200
+DATETIME_FORMAT_MIN_MATCH = 0.9
+
+
+def infer_datetime_format(series: pd.Series) -> Optional[str]:
+    """
+    Most common strftime format among a sample of distinct values, or None
+    if no single format parses most of them. Ambiguous day/month values
+    are outvoted by unambiguous ones.
+    """
+    uniques = pd.Series(series.dropna().unique()[:DATETIME_FORMAT_SAMPLE]).astype(str)
+    if uniques.empty:
+        return None
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        guesses = uniques.map(guess_datetime_format).dropna()
+    if guesses.empty:
+        return None
+
+    fmt = guesses.value_counts().idxmax()
+    matched = pd.to_datetime(uniques, format=fmt, errors="coerce").notna().mean()
+    return fmt if matched >= DATETIME_FORMAT_MIN_MATCH else None
+
+
+def _parse_datetime_values(values: pd.Series, fmt: Optional[str]) -> pd.Series:
+    if fmt is None:
+        return pd.to_datetime(values, errors="coerce")
+
+    parsed = pd.to_datetime(values, format=fmt, errors="coerce")
+    unmatched = parsed.isna() & values.notna()
+    if unmatched.any():
+        fallback = pd.to_datetime(values[unmatched], format="mixed", errors="coerce")
+        # Rows with a different timezone or type than the main format stay NaT
+        if fallback.dtype == parsed.dtype:
+            parsed[unmatched] = fallback
+    return parsed
+
+
+def parse_datetime(df: pd.DataFrame, column: str, format: Optional[str] = None) -> pd.DataFrame:
+    """
+    Parses with one exact format (given, or inferred from a sample); only
+    values that do not match it go through per-element parsing.
+    Unparseable values become NaT.
+
+    Repeated strings are parsed once: the column is factorized and the
+    distinct values are parsed (pandas' own cache is skipped for columns
+    whose first rows look unique, which is typical for dates).
+    """
+    logger.debug("Entering parse_datetime: column=%s format=%s", column, format)
+    df = df.copy(deep=False)
+    values = df[column]
+
+    fmt = format or infer_datetime_format(values)
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    parsed = _parse_datetime_values(pd.Series(uniques, dtype=values.dtype), fmt)
+
+    df[column] = pd.Series(
+        parsed.array.take(codes, allow_fill=True),
+        index=values.index,
+        name=column,
+    )
     return df
 
 def drop_column(df: pd.DataFrame, column: str) -> pd.DataFrame:
@@ -102,14 +226,13 @@ def normalize_currency(df: pd.DataFrame, column: str) -> pd.DataFrame:
         return df
 
     logger.debug("Entering normalize_currency: column=%s", column)
-    df = df.copy()
-    df[column] = (
-        df[column]
-        .astype(str)
-        .str.replace(r"[^\d\.]", "", regex=True)
-    )
+    df = df.copy(deep=False)
+
+    def to_amount(values: pd.Series) -> pd.Series:
+        digits = as_text(values).str.replace(r"[^\d\.]", "", regex=True)
+        return to_numeric(digits)
 
-    df[column] = pd.to_numeric(df[column], errors="coerce")
+    df[column] = _map_unique(df[column], to_amount)
     return df
 
 def normalize_percentage(df: pd.DataFrame, column: str) -> pd.DataFrame:
@@ -117,12 +240,171 @@ def normalize_percentage(df: pd.DataFrame, column: str) -> pd.DataFrame:
     if column not in df.columns:
         return df
 
-    df = df.copy()
-    df[column] = (
-        df[column]
-        .astype(str)
-        .str.replace("%", "", regex=False)
-    )
+    df = df.copy(deep=False)
+
+    def to_fraction(values: pd.Series) -> pd.Series:
+        digits = as_text(values).str.replace("%", "", regex=False)
+        return to_numeric(digits) / 100
+
+    df[column] = _map_unique(df[column], to_fraction)
+    return df
+
+
+# One amount: digits with optional thousands separators and decimals, an
+# optional "+", then an optional K/M/B suffix (or million/billion). A range
+# is "<amount> - <amount>" or "<amount> to <amount>", with currency symbols
+# allowed before each amount. Only the low end may be negative.
+_NUMBER = r"\d+(?:,\d{3})*(?:\.\d+)?"
+_SUFFIX = r"\+?\s*(?:([KkMmBb])(?:illion)?(?![A-Za-z]))?"
+CURRENCY_RANGE_PATTERN = re.compile(
+    rf"(-?{_NUMBER}){_SUFFIX}(?:\s*(?:-|–|to)\s*[^\d\s]*\s*({_NUMBER}){_SUFFIX})?"
+)
+SUFFIX_MULTIPLIERS = {"k": 1e3, "m": 1e6, "b": 1e9}
+
+
+def _parse_amounts(values: pd.Series) -> np.ndarray:
+    """
+    (n, 2) float array of the low and high amount of each value.
+    A single amount is both low and high; a suffix on the high end only
+    ("$1-5M") applies to both.
+    """
+    parts = values.astype(str).str.extract(CURRENCY_RANGE_PATTERN)
+    lo_num, lo_suffix, hi_num, hi_suffix = (parts[i] for i in range(4))
+
+    hi_suffix = hi_suffix.fillna(lo_suffix)
+    lo_suffix = lo_suffix.fillna(hi_suffix.where(hi_num.notna()))
+
+    def amount(num: pd.Series, suffix: pd.Series) -> pd.Series:
+        base = to_numeric(num.str.replace(",", "", regex=False))
+        return base * suffix.str.lower().map(SUFFIX_MULTIPLIERS).fillna(1.0)
+
+    lo = amount(lo_num, lo_suffix)
+    hi = amount(hi_num, hi_suffix).fillna(lo)
+    return np.column_stack([lo.to_numpy(dtype=float), hi.to_numpy(dtype=float)])
+
+
+def parse_currency_range(df: pd.DataFrame, column: str) -> pd.DataFrame:
+    """
+    Parses currency amounts and ranges ("$137K-$171K (Glassdoor est.)",
+    "$1 to $5 million") into numeric <column>_min, <column>_max and
+    <column>_mid columns; the source column is kept.
+
+    The regex runs once per distinct value and results are mapped back
+    through the factorized codes.
+    """
+    logger.debug("Entering parse_currency_range: column=%s", column)
+    if column not in df.columns:
+        return df
+
+    df = df.copy(deep=False)
+    codes, uniques = pd.factorize(df[column], use_na_sentinel=True)
+
+    # Extra all-NaN row at the end: code -1 (missing) indexes it
+    parsed = np.vstack([
+        _parse_amounts(pd.Series(uniques, dtype=object)),
+        [np.nan, np.nan],
+    ])
+    low, high = parsed[codes, 0], parsed[codes, 1]
+
+    df[f"{column}_min"] = low
+    df[f"{column}_max"] = high
+    df[f"{column}_mid"] = (low + high) / 2
+    return df
+
+
+# ======================================================
+# MEMORY COMPACTION
+# ======================================================
+
+# Signed widths only: unsigned integers wrap around on subtraction
+INTEGER_DOWNCAST_TYPES = (np.int8, np.int16, np.int32)
+# Checking that float32 keeps a float column's values costs a string
+# round trip per distinct value
+FLOAT_DOWNCAST_MAX_UNIQUE = 100_000
+
+
+def to_categorical(df: pd.DataFrame, column: str) -> pd.DataFrame:
+    """
+    Stores a low-cardinality column as a categorical: one integer code
+    per row plus each distinct value once.
+    """
+    logger.debug("Entering to_categorical: column=%s", column)
+    if column not in df.columns or isinstance(df[column].dtype, pd.CategoricalDtype):
+        return df
+
+    df = df.copy(deep=False)
+    df[column] = df[column].astype("category")
+    return df
+
+
+def _same_backend(dtype: Any, target: np.dtype) -> Any:
+    if isinstance(dtype, pd.ArrowDtype):
+        return pd.ArrowDtype(pa.from_numpy_dtype(target))
+    if isinstance(dtype, np.dtype):
+        return target
+    # Masked and other extension dtypes are left as they are
+    return None
+
+
+def _float32_preserves(values: np.ndarray) -> bool:
+    """
+    True if every value reads back unchanged from float32's shortest
+    decimal form (3.8 stays 3.8), i.e. the CSV output is numerically the
+    same.
+    """
+    finite = np.unique(values[np.isfinite(values)])
+    if len(finite) > FLOAT_DOWNCAST_MAX_UNIQUE:
+        return False
+    narrowed = finite.astype(np.float32)
+    if not np.isfinite(narrowed).all():
+        return False
+    return bool((narrowed.astype(str).astype(np.float64) == finite).all())
+
+
+def downcast_numeric(
+    df: pd.DataFrame,
+    column: str,
+    min_value: Optional[float] = None,
+    max_value: Optional[float] = None,
+) -> pd.DataFrame:
+    """
+    Narrows an integer column to the smallest signed width holding
+    [min_value, max_value] (the profiled range, widened by the actual
+    values), and a float column to float32 when that loses nothing.
+    A profile range gives every streamed chunk the same width.
+    """
+    logger.debug("Entering downcast_numeric: column=%s", column)
+    if column not in df.columns:
+        return df
+
+    values = df[column]
+    dtype = values.dtype
+    if not pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values):
+        return df
+
+    numpy_dtype = dtype.numpy_dtype if isinstance(dtype, pd.ArrowDtype) else dtype
+    if not isinstance(numpy_dtype, np.dtype):
+        return df
+
+    target = None
+    if numpy_dtype.kind == "i":
+        lo = values.min() if values.notna().any() else 0
+        hi = values.max() if values.notna().any() else 0
+        lo = min(lo, min_value) if min_value is not None else lo
+        hi = max(hi, max_value) if max_value is not None else hi
+        for candidate in INTEGER_DOWNCAST_TYPES:
+            info = np.iinfo(candidate)
+            if candidate().itemsize < numpy_dtype.itemsize and info.min <= lo and hi <= info.max:
+                target = np.dtype(candidate)
+                break
+    elif numpy_dtype.kind == "f" and numpy_dtype.itemsize > 4:
+        if _float32_preserves(values.to_numpy(dtype=np.float64, na_value=np.nan)):
+            target = np.dtype(np.float32)
+
+    target = _same_backend(dtype, target) if target is not None else None
+    if target is None:
+        return df
 
-    df[column] = pd.to_numeric(df[column], errors="coerce") / 100
+    df = df.copy(deep=False)
+    df[column] = values.astype(target)
     return df
@@ -0,0 +1,83 @@
+import logging
+import os
+from typing import Any, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+logger = logging.getLogger(__name__)
+
+# "pyarrow" reads text as Arrow strings and numbers as Arrow types, so string
+# operations run on Arrow compute kernels; unset (or "numpy") keeps NumPy
+# object arrays of Python str
+DTYPE_BACKEND = os.getenv("ETL_DTYPE_BACKEND", "numpy")
+
+# str(dtype) of text columns as recorded in profiles
+TEXT_DTYPE_NAMES = {
+    "object",
+    "string",
+    "string[python]",
+    "string[pyarrow]",
+    "large_string[pyarrow]",
+}
+
+ARROW_STRING_TYPES = (pa.string(), pa.large_string())
+
+
+def resolve_dtype_backend(dtype_backend: Optional[str] = None) -> Optional[str]:
+    """
+    The pandas `dtype_backend` to read with: "pyarrow" or None (NumPy).
+    """
+    backend = dtype_backend or DTYPE_BACKEND
+    return "pyarrow" if backend == "pyarrow" else None
+
+
+def is_arrow_string_dtype(dtype: Any) -> bool:
+    if isinstance(dtype, pd.ArrowDtype):
+        return dtype.pyarrow_dtype in ARROW_STRING_TYPES
+    return isinstance(dtype, pd.StringDtype) and dtype.storage == "pyarrow"
+
+
+def is_text_dtype(dtype: Any) -> bool:
+    """
+    True for NumPy object columns and pandas / Arrow string columns.
+    """
+    if isinstance(dtype, np.dtype):
+        return dtype == object
+    return isinstance(dtype, pd.StringDtype) or is_arrow_string_dtype(dtype)
+
+
+def is_text_dtype_name(name: Optional[str]) -> bool:
+    return name in TEXT_DTYPE_NAMES
+
+
+def text_dtype(dtype_backend: Optional[str]) -> Any:
+    """
+    Dtype that keeps a column as text when reading with `dtype_backend`.
+    """
+    if dtype_backend == "pyarrow":
+        return pd.ArrowDtype(pa.string())
+    return "object"
+
+
+def as_text(series: pd.Series) -> pd.Series:
+    """
+    Series of strings for `.str` operations. String-typed columns are used
+    as they are; object columns may hold non-strings and are converted.
+    """
+    if is_text_dtype(series.dtype) and series.dtype != object:
+        return series
+    return series.astype(str)
+
+
+def to_numeric(values: pd.Series) -> pd.Series:
+    """
+    pd.to_numeric(errors="coerce"). On Arrow strings pandas writes the
+    coerced failures as NaN rather than null, which isna() then misses;
+    they are turned into nulls here.
+    """
+    result = pd.to_numeric(values, errors="coerce")
+    if isinstance(result.dtype, pd.ArrowDtype) and pa.types.is_floating(result.dtype.pyarrow_dtype):
+        result = result.mask(np.isnan(result.to_numpy(dtype=float, na_value=np.nan)))
+    return result
@@ -0,0 +1,268 @@
+import logging
+import os
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from etl.transform.dtypes import as_text, is_text_dtype
+
+logger = logging.getLogger(__name__)
+
+# ======================================================
+# CONFIG
+# ======================================================
+
+NEAR_DUP_THRESHOLD = float(os.getenv("ETL_NEAR_DUP_THRESHOLD", "0.9"))
+
+# Signature length; a power of two so the hash's top bits pick the bin
+NEAR_DUP_NUM_PERM = 64
+
+# Character shingle width; a shingle is packed into one uint64
+SHINGLE_CHARS = 5
+
+# Shingles hashed at once; bounds the transient arrays to a few x 8 bytes each
+SHINGLE_BATCH = int(os.getenv("ETL_NEAR_DUP_SHINGLE_BATCH", "4000000"))
+
+# Signatures plus band keys may not exceed this
+NEAR_DUP_MAX_INDEX_MB = float(os.getenv("ETL_NEAR_DUP_MAX_INDEX_MB", "512"))
+
+_EMPTY = np.iinfo(np.uint32).max
+
+
+class NearDuplicateError(Exception):
+    pass
+
+
+# ======================================================
+# HASHING
+# ======================================================
+
+def _mix64(x: np.ndarray) -> np.ndarray:
+    """
+    splitmix64 finalizer; uint64 arithmetic wraps around.
+    """
+    x = x ^ (x >> np.uint64(30))
+    x = x * np.uint64(0xBF58476D1CE4E5B9)
+    x = x ^ (x >> np.uint64(27))
+    x = x * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+# ASCII punctuation and control bytes become spaces; bytes of multi-byte
+# UTF-8 characters are kept
+_NORMALIZE_TABLE = bytes(
+    b if chr(b).isalnum() or b >= 0x80 else ord(" ") for b in range(256)
+)
+
+
+def normalize_text(df: pd.DataFrame, columns: List[str]) -> List[bytes]:
+    """
+    Lower-cased UTF-8 text of `columns` joined per row, with punctuation
+    and runs of whitespace collapsed to single spaces. Missing values are
+    empty. All per-row work runs in C string methods.
+    """
+    values = [
+        as_text(df[col].where(df[col].notna(), "")).astype(object).tolist()
+        for col in columns
+    ]
+    return [
+        b" ".join(" ".join(parts).lower().encode("utf-8").translate(_NORMALIZE_TABLE).split())
+        for parts in zip(*values)
+    ]
+
+
+def _shingle_batches(text: List[bytes]) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Yields (row_ids, shingles) over consecutive rows: every window of
+    SHINGLE_CHARS bytes packed into a uint64, at most about SHINGLE_BATCH
+    shingles per batch (a longer row is a batch of its own). Rows shorter
+    than a shingle give one shingle of their whole text; empty rows none.
+    """
+    lengths = np.fromiter((len(b) for b in text), dtype=np.int64, count=len(text))
+    counts = np.where(lengths >= SHINGLE_CHARS, lengths - SHINGLE_CHARS + 1, np.minimum(lengths, 1))
+    ends = np.cumsum(counts)
+    # Normalized text has no zero bytes; zero padding between rows keeps
+    # windows from spanning two rows, plus 3 bytes for the 8-byte view
+    pad = b"\0" * (SHINGLE_CHARS - 1)
+    mask = np.uint64((1 << (8 * SHINGLE_CHARS)) - 1)
+
+    start = 0
+    while start < len(text):
+        stop = max(int(np.searchsorted(ends, ends[start] - counts[start] + SHINGLE_BATCH, "right")), start + 1)
+        data = np.frombuffer(pad.join(text[start:stop]) + pad + b"\0" * 3, dtype=np.uint8)
+        n_windows = len(data) - 7
+
+        # Unaligned 8-byte little-endian view at every byte offset
+        windows = np.ndarray((n_windows,), dtype="<u8", buffer=data, strides=(1,))
+        zeros = np.cumsum(data == 0)
+        valid = np.empty(n_windows, dtype=bool)
+        valid[0] = zeros[SHINGLE_CHARS - 1] == 0
+        valid[1:] = zeros[SHINGLE_CHARS:n_windows + SHINGLE_CHARS - 1] == zeros[:n_windows - 1]
+
+        batch_lengths = lengths[start:stop]
+        row_starts = np.concatenate([[0], np.cumsum(batch_lengths[:-1] + SHINGLE_CHARS - 1)])
+        short = (batch_lengths > 0) & (batch_lengths < SHINGLE_CHARS)
+        valid[row_starts[short]] = True
+
+        # Valid windows come in row order, counts[i] of them for row i
+        rows = np.repeat(np.arange(start, stop), counts[start:stop])
+        yield rows, windows[valid] & mask
+        start = stop
+
+
+def minhash_signatures(text: List[bytes], num_perm: int = NEAR_DUP_NUM_PERM) -> np.ndarray:
+    """
+    (n, num_perm) uint32 one-permutation MinHash signatures: each shingle
+    is hashed once, the top bits pick its bin and each bin keeps its
+    minimum. Empty bins are filled from the next non-empty bin, so two
+    rows agree on a bin with probability ~ the Jaccard similarity of their
+    shingle sets. Rows without text keep all-empty signatures.
+    """
+    bits = int(num_perm).bit_length() - 1
+    if num_perm != 1 << bits:
+        raise NearDuplicateError(f"num_perm must be a power of two, got {num_perm}")
+
+    signatures = np.full((len(text), num_perm), _EMPTY, dtype=np.uint32)
+    flat = signatures.reshape(-1)
+    for rows, shingles in _shingle_batches(text):
+        hashed = _mix64(shingles)
+        bins = (hashed >> np.uint64(64 - bits)).astype(np.int64) if bits else np.zeros(len(hashed), dtype=np.int64)
+        values = ((hashed >> np.uint64(32 - bits)) & np.uint64(0xFFFFFFFE)).astype(np.uint32)
+        np.minimum.at(flat, rows * num_perm + bins, values)
+
+    # Densify: two passes reach every bin from any non-empty one
+    has_text = (signatures != _EMPTY).any(axis=1)
+    for _ in range(2):
+        for j in range(num_perm - 1, -1, -1):
+            column = signatures[:, j]
+            empty = (column == _EMPTY) & has_text
+            column[empty] = signatures[empty, (j + 1) % num_perm]
+    return signatures
+
+
+# ======================================================
+# LSH
+# ======================================================
+
+def lsh_params(threshold: float, num_perm: int = NEAR_DUP_NUM_PERM) -> Tuple[int, int]:
+    """
+    (bands, rows per band) whose S-curve midpoint (1/b)^(1/r) is closest
+    to `threshold`.
+    """
+    options = [(num_perm // r, r) for r in range(1, num_perm + 1) if num_perm % r == 0]
+    return min(options, key=lambda br: abs((1 / br[0]) ** (1 / br[1]) - threshold))
+
+
+def candidate_pairs(
+    signatures: np.ndarray,
+    block_ids: np.ndarray,
+    bands: int,
+    rows_per_band: int,
+) -> np.ndarray:
+    """
+    (k, 2) array of (anchor, row) pairs that share a band bucket within
+    the same block. Each bucket pairs its rows with its first row only,
+    so a bucket of m rows costs m - 1 comparisons, not m^2.
+    """
+    has_text = signatures[:, 0] != _EMPTY
+    pairs = []
+    for band in range(bands):
+        key = _mix64(block_ids.astype(np.uint64) + np.uint64(band))
+        for j in range(band * rows_per_band, (band + 1) * rows_per_band):
+            key = _mix64(key ^ signatures[:, j].astype(np.uint64))
+
+        rows = np.flatnonzero(has_text)
+        rows = rows[np.argsort(key[rows], kind="stable")]
+        sorted_keys = key[rows]
+        starts = np.r_[True, sorted_keys[1:] != sorted_keys[:-1]]
+        anchors = rows[np.flatnonzero(starts)[np.cumsum(starts) - 1]]
+        member = anchors != rows
+        if member.any():
+            pairs.append(np.column_stack([anchors[member], rows[member]]))
+
+    if not pairs:
+        return np.empty((0, 2), dtype=np.int64)
+    return np.unique(np.vstack(pairs), axis=0)
+
+
+def _cluster_labels(n: int, pairs: np.ndarray) -> np.ndarray:
+    """
+    Smallest row index of each row's connected component.
+    """
+    labels = np.arange(n)
+    if len(pairs) == 0:
+        return labels
+    a, b = pairs[:, 0], pairs[:, 1]
+    while True:
+        before = labels.copy()
+        np.minimum.at(labels, b, labels[a])
+        np.minimum.at(labels, a, labels[b])
+        labels = labels[labels]
+        if np.array_equal(labels, before):
+            return labels
+
+
+# ======================================================
+# TOOL
+# ======================================================
+
+def remove_near_duplicates(
+    df: pd.DataFrame,
+    columns: Optional[List[str]] = None,
+    blocking_keys: Optional[List[str]] = None,
+    threshold: float = NEAR_DUP_THRESHOLD,
+) -> pd.DataFrame:
+    """
+    Drops rows whose normalized text (`columns`, default: all text
+    columns) has an estimated Jaccard similarity of at least `threshold`
+    with an earlier row of the same block (rows equal on `blocking_keys`).
+    The first row of each group of near-duplicates is kept.
+
+    Candidates come from MinHash LSH buckets, so the work is linear in the
+    number of rows plus the candidates found; only candidates are compared.
+    """
+    logger.debug(
+        "Entering remove_near_duplicates: columns=%s blocking_keys=%s threshold=%s",
+        columns, blocking_keys, threshold,
+    )
+    if not 0 < threshold <= 1:
+        raise NearDuplicateError(f"threshold must be in (0, 1], got {threshold}")
+
+    columns = columns or [c for c in df.columns if is_text_dtype(df[c].dtype)]
+    missing = [c for c in list(columns) + list(blocking_keys or []) if c not in df.columns]
+    if missing:
+        raise NearDuplicateError(f"Columns not found: {missing}")
+    if not columns or len(df) < 2:
+        return df
+
+    bands, rows_per_band = lsh_params(threshold)
+    # Every row gets a signature whatever the blocks: blocking keys only
+    # narrow the candidate pairs, not the size of the index
+    index_mb = len(df) * (NEAR_DUP_NUM_PERM * 4 + 3 * 8) / (1024 ** 2)
+    if index_mb > NEAR_DUP_MAX_INDEX_MB:
+        raise NearDuplicateError(
+            f"Near-duplicate index for {len(df)} rows needs {index_mb:.0f} MB "
+            f"(limit {NEAR_DUP_MAX_INDEX_MB:.0f} MB); process fewer rows at a time "
+            f"or raise ETL_NEAR_DUP_MAX_INDEX_MB"
+        )
+
+    if blocking_keys:
+        block_ids = df.groupby(list(blocking_keys), dropna=False, sort=False).ngroup().to_numpy()
+    else:
+        block_ids = np.zeros(len(df), dtype=np.int64)
+
+    signatures = minhash_signatures(normalize_text(df, list(columns)))
+    pairs = candidate_pairs(signatures, block_ids, bands, rows_per_band)
+
+    # Verify candidates on the full signature
+    if len(pairs):
+        similarity = (signatures[pairs[:, 0]] == signatures[pairs[:, 1]]).mean(axis=1)
+        pairs = pairs[similarity >= threshold]
+
+    keep = _cluster_labels(len(df), pairs) == np.arange(len(df))
+    logger.debug(
+        "remove_near_duplicates: %d candidate pairs, %d rows removed",
+        len(pairs), int((~keep).sum()),
+    )
+    return df[keep].reset_index(drop=True)
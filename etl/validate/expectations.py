@@ -0,0 +1,288 @@
+import json
+import logging
+import os
+import re
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from etl.transform.cleaners import infer_datetime_format, parse_datetime
+from etl.transform.dtypes import as_text, is_text_dtype, to_numeric
+
+logger = logging.getLogger(__name__)
+
+# ======================================================
+# CONFIG
+# ======================================================
+
+# One spec per feed: <EXPECTATIONS_DIR>/<feed>.json, feed = input file stem
+EXPECTATIONS_DIR = os.getenv("ETL_EXPECTATIONS_DIR", "data/expectations")
+
+# Offending rows reported per expectation
+EXPECTATION_SAMPLE_ROWS = int(os.getenv("ETL_EXPECTATION_SAMPLE_ROWS", "5"))
+
+EXPECTATION_TYPES = {"not_null", "between", "matches", "in_set", "unique", "increasing"}
+
+
+class ExpectationError(Exception):
+    pass
+
+
+# ======================================================
+# SPECS
+# ======================================================
+
+def feed_name(input_path: str) -> str:
+    return os.path.splitext(os.path.basename(input_path))[0]
+
+
+def load_expectations(feed: str, directory: str = EXPECTATIONS_DIR) -> Optional[Dict[str, Any]]:
+    """
+    The expectations spec stored for `feed`, or None if it has none.
+
+    A spec maps columns to lists of expectations:
+
+        {"columns": {
+            "Rating": [{"expect": "between", "min": 0, "max": 5}],
+            "Job Title": [{"expect": "not_null"}, {"expect": "matches", "pattern": "\\\\w.*"}],
+            "id": [{"expect": "unique"}],
+            "Sector": [{"expect": "in_set", "values": ["Finance", "Retail"]}],
+            "posted": [{"expect": "increasing", "strict": false, "format": "%Y-%m-%d"}]
+        }}
+
+    Every expectation except not_null ignores missing values.
+    """
+    logger.debug("Entering load_expectations: feed=%s", feed)
+    path = os.path.join(directory, f"{feed}.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        try:
+            return json.load(f)
+        except json.JSONDecodeError as e:
+            raise ExpectationError(f"Invalid expectations spec {path}: {e}") from e
+
+
+# ======================================================
+# COLUMN VIEWS
+# ======================================================
+
+class _ColumnViews:
+    """
+    Derived forms of one column (null mask, numbers, text, datetimes),
+    computed at most once per evaluation and shared by its expectations.
+    """
+
+    def __init__(self, series: pd.Series, datetime_format: Optional[str]):
+        self.series = series
+        self.datetime_format = datetime_format
+        self._cache: Dict[str, Any] = {}
+
+    def _get(self, key: str, compute: Callable[[], Any]) -> Any:
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    @property
+    def present(self) -> np.ndarray:
+        return self._get("present", lambda: self.series.notna().to_numpy(dtype=bool))
+
+    @property
+    def numbers(self) -> np.ndarray:
+        def compute() -> np.ndarray:
+            if pd.api.types.is_numeric_dtype(self.series) and not pd.api.types.is_bool_dtype(self.series):
+                values = self.series
+            else:
+                values = to_numeric(self.series)
+            return values.to_numpy(dtype=float, na_value=np.nan)
+        return self._get("numbers", compute)
+
+    @property
+    def text(self) -> pd.Series:
+        return self._get("text", lambda: as_text(self.series))
+
+    @property
+    def ordinals(self) -> np.ndarray:
+        """
+        Sortable float form for increasing: numbers, or datetimes as
+        nanoseconds (text columns parsed with the expectation's format).
+        """
+        def compute() -> np.ndarray:
+            series = self.series
+            if is_text_dtype(series.dtype):
+                column = series.name if series.name is not None else 0
+                series = parse_datetime(series.to_frame(column), column, self.datetime_format)[column]
+            if pd.api.types.is_datetime64_any_dtype(series):
+                values = series.to_numpy(dtype="datetime64[ns]").astype(np.int64).astype(float)
+                values[series.isna().to_numpy()] = np.nan
+                return values
+            return self.numbers
+        return self._get("ordinals", compute)
+
+
+# ======================================================
+# EXPECTATIONS
+# ======================================================
+
+class _Expectation:
+    """
+    One compiled expectation with its running violation count and sample.
+    """
+
+    def __init__(self, column: str, rule: Dict[str, Any]):
+        self.column = column
+        self.rule = rule
+        self.kind = rule.get("expect")
+        if self.kind not in EXPECTATION_TYPES:
+            raise ExpectationError(f"Unknown expectation for '{column}': {self.kind}")
+
+        if self.kind == "between" and rule.get("min") is None and rule.get("max") is None:
+            raise ExpectationError(f"between on '{column}' needs min and/or max")
+        if self.kind == "matches":
+            try:
+                re.compile(rule.get("pattern", ""))
+            except re.error as e:
+                raise ExpectationError(f"Invalid pattern for '{column}': {e}") from e
+        if self.kind == "in_set" and not isinstance(rule.get("values"), list):
+            raise ExpectationError(f"in_set on '{column}' needs a list of values")
+
+        self.checked = 0
+        self.violations = 0
+        self.sample: List[Dict[str, Any]] = []
+        # Cross-chunk state: sorted hashes seen (unique), last value (increasing)
+        self._seen = np.empty(0, dtype=np.uint64)
+        self._last = np.nan
+
+    def violation_mask(self, views: _ColumnViews) -> np.ndarray:
+        present = views.present
+        if self.kind == "not_null":
+            return ~present
+
+        if self.kind == "between":
+            numbers = views.numbers
+            # Values that are not numbers at all fail the range too
+            bad = np.isnan(numbers)
+            if self.rule.get("min") is not None:
+                bad |= numbers < self.rule["min"]
+            if self.rule.get("max") is not None:
+                bad |= numbers > self.rule["max"]
+            return present & bad
+
+        if self.kind == "matches":
+            matched = views.text.str.fullmatch(self.rule["pattern"])
+            return present & ~matched.to_numpy(dtype=bool, na_value=False)
+
+        if self.kind == "in_set":
+            return present & ~views.series.isin(self.rule["values"]).to_numpy(dtype=bool)
+
+        if self.kind == "unique":
+            hashes = pd.util.hash_pandas_object(views.series, index=False).to_numpy()
+            bad = np.zeros(len(hashes), dtype=bool)
+            rows = np.flatnonzero(present)
+            values = hashes[rows]
+            bad[rows] = pd.Series(values).duplicated().to_numpy()
+            if len(self._seen):
+                bad[rows] |= np.isin(values, self._seen, assume_unique=False)
+            self._seen = np.union1d(self._seen, values)
+            return bad
+
+        # increasing: each value against the previous non-missing one,
+        # carried over from the previous chunk
+        ordinals = views.ordinals
+        rows = np.flatnonzero(~np.isnan(ordinals))
+        values = ordinals[rows]
+        previous = np.concatenate([[self._last], values[:-1]])
+        with np.errstate(invalid="ignore"):
+            decreasing = values <= previous if self.rule.get("strict") else values < previous
+        bad = np.zeros(len(ordinals), dtype=bool)
+        bad[rows] = decreasing
+        if len(values):
+            self._last = values[-1]
+        # Values that could not be read as numbers or dates
+        return bad | (present & np.isnan(ordinals))
+
+    def record(self, series: pd.Series, mask: np.ndarray, offset: int) -> None:
+        self.checked += len(mask)
+        bad = np.flatnonzero(mask)
+        self.violations += len(bad)
+        room = EXPECTATION_SAMPLE_ROWS - len(self.sample)
+        for pos in bad[:max(room, 0)]:
+            value = series.iloc[pos]
+            self.sample.append({
+                "row": int(offset + pos),
+                "value": None if pd.isna(value) else str(value),
+            })
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "column": self.column,
+            **self.rule,
+            "checked": self.checked,
+            "violations": self.violations,
+            "passed": self.violations == 0,
+            "sample": self.sample,
+        }
+
+
+class ExpectationSuite:
+    """
+    A compiled expectations spec. evaluate() runs every expectation on a
+    frame, or on consecutive chunks of one, with one pass per column:
+    each column's derived forms are computed once and each expectation is
+    a vectorized mask over them. unique and increasing carry state across
+    chunks, so chunked results equal those of the whole frame.
+    """
+
+    def __init__(self, spec: Dict[str, Any]):
+        columns = spec.get("columns")
+        if not isinstance(columns, dict):
+            raise ExpectationError("Expectations spec needs a 'columns' mapping")
+
+        self.expectations: Dict[str, List[_Expectation]] = {}
+        for column, rules in columns.items():
+            if isinstance(rules, dict):
+                rules = [rules]
+            self.expectations[column] = [_Expectation(column, rule) for rule in rules]
+
+        self.rows = 0
+        self.missing_columns: List[str] = []
+        self._datetime_formats: Dict[str, Optional[str]] = {}
+
+    def _datetime_format(self, column: str, series: pd.Series) -> Optional[str]:
+        # Inferred on the first chunk and reused, as the planner's profile is
+        if column not in self._datetime_formats:
+            given = [e.rule["format"] for e in self.expectations[column] if e.rule.get("format")]
+            needs = any(e.kind == "increasing" for e in self.expectations[column])
+            fmt = given[0] if given else None
+            if fmt is None and needs and is_text_dtype(series.dtype):
+                fmt = infer_datetime_format(series)
+            self._datetime_formats[column] = fmt
+        return self._datetime_formats[column]
+
+    def evaluate(self, df: pd.DataFrame) -> None:
+        logger.debug("Entering ExpectationSuite.evaluate: rows=%d", len(df))
+        for column, expectations in self.expectations.items():
+            if column not in df.columns:
+                if column not in self.missing_columns:
+                    self.missing_columns.append(column)
+                continue
+            series = df[column]
+            views = _ColumnViews(series, self._datetime_format(column, series))
+            for expectation in expectations:
+                expectation.record(series, expectation.violation_mask(views), self.rows)
+        self.rows += len(df)
+
+    def report(self) -> Dict[str, Any]:
+        results = [e.report() for expectations in self.expectations.values() for e in expectations]
+        return {
+            "rows": self.rows,
+            "passed": not self.missing_columns and all(r["passed"] for r in results),
+            "missing_columns": list(self.missing_columns),
+            "results": results,
+        }
+
+
+def compile_expectations(spec: Dict[str, Any]) -> ExpectationSuite:
+    logger.debug("Entering compile_expectations")
+    return ExpectationSuite(spec)
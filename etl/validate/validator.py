@@ -6,7 +6,10 @@ logger = logging.getLogger(__name__)
 
 
 class ValidationError(Exception):
-    pass
+    def __init__(self, message: str, column: Optional[str] = None):
+        super().__init__(message)
+        # Column whose nulls exploded, when that was the failed rule
+        self.column = column
 
 
 def _get_planned_dropped_columns(plan: Optional[Dict[str, Any]]) -> Set[str]:
@@ -27,41 +30,108 @@ def _get_planned_dropped_columns(plan: Optional[Dict[str, Any]]) -> Set[str]:
     return dropped
 
 
-def validate_transformation(
-    df_before: pd.DataFrame,
+def collect_frame_stats(df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Row count, column list and per-column null counts of a frame
+    (or of one chunk of a larger dataset).
+    """
+    logger.debug("Entering collect_frame_stats")
+    return {
+        "rows": len(df),
+        "columns": list(df.columns),
+        "null_counts": {col: int(n) for col, n in df.isna().sum().items()},
+    }
+
+
+def update_frame_stats(
+    stats: Dict[str, Any],
     df_after: pd.DataFrame,
+    changed: Optional[Set[str]],
+) -> Dict[str, Any]:
+    """
+    Stats of the frame a step produced, from the stats of its input.
+    `changed` holds the columns the step replaced or added (None when rows
+    were removed or added); only those columns are rescanned, other null
+    counts are carried over.
+    """
+    if changed is None:
+        return collect_frame_stats(df_after)
+
+    null_counts = {}
+    for col in df_after.columns:
+        if col in changed or col not in stats["null_counts"]:
+            null_counts[col] = int(df_after[col].isna().to_numpy().sum())
+        else:
+            null_counts[col] = stats["null_counts"][col]
+
+    return {
+        "rows": len(df_after),
+        "columns": list(df_after.columns),
+        "null_counts": null_counts,
+    }
+
+
+def merge_frame_stats(
+    total: Optional[Dict[str, Any]],
+    chunk: Dict[str, Any],
+) -> Dict[str, Any]:
+    """
+    Accumulates chunk stats into running totals for streaming validation.
+    """
+    if total is None:
+        return {
+            "rows": chunk["rows"],
+            "columns": list(chunk["columns"]),
+            "null_counts": dict(chunk["null_counts"]),
+        }
+
+    total["rows"] += chunk["rows"]
+    for col, n in chunk["null_counts"].items():
+        total["null_counts"][col] = total["null_counts"].get(col, 0) + n
+    return total
+
+
+def validate_stats(
+    stats_before: Dict[str, Any],
+    stats_after: Dict[str, Any],
     plan: Optional[Dict[str, Any]] = None,
     max_row_loss_pct: float = 30.0,
     max_null_increase_pct: float = 50.0,
+    modified_columns: Optional[Set[str]] = None,
 ) -> None:
     """
-    Validates transformation safety.
+    Applies the transformation safety rules to precomputed frame stats
+    (see collect_frame_stats), so no full frame has to be held or rescanned.
 
-    IMPORTANT:
-    - Allows no-op transformations
-    - Allows explicitly planned column drops
-    - Protects against destructive transformations
+    With `modified_columns` (as tracked by execute_plan) only those columns
+    are checked for null explosions, and a plan that modified nothing and
+    kept every row passes as a no-op.
     """
 
-    logger.debug("Entering validate_transformation")
+    logger.debug("Entering validate_stats")
+    rows_before = stats_before["rows"]
+    rows_after = stats_after["rows"]
+
     # ---------------------------
     # 0. Allow no-op transformations
     # ---------------------------
-    if df_before.equals(df_after):
+    if (
+        modified_columns is not None
+        and not modified_columns
+        and rows_before == rows_after
+        and stats_before["columns"] == stats_after["columns"]
+    ):
         return
 
     # ---------------------------
     # 1. Empty dataset check
     # ---------------------------
-    if df_after.empty:
+    if rows_after == 0 or not stats_after["columns"]:
         raise ValidationError("Output dataset is empty")
 
     # ---------------------------
     # 2. Row loss check
     # ---------------------------
-    rows_before = len(df_before)
-    rows_after = len(df_after)
-
     if rows_before > 0:
         row_loss_pct = ((rows_before - rows_after) / rows_before) * 100
         if row_loss_pct > max_row_loss_pct:
@@ -72,8 +142,8 @@ def validate_transformation(
     # ---------------------------
     # 3. Column disappearance check (planner-aware)
     # ---------------------------
-    before_cols = set(df_before.columns)
-    after_cols = set(df_after.columns)
+    before_cols = set(stats_before["columns"])
+    after_cols = set(stats_after["columns"])
 
     removed_columns = before_cols - after_cols
     allowed_drops = _get_planned_dropped_columns(plan)
@@ -87,22 +157,55 @@ def validate_transformation(
     # ---------------------------
     # 4. Column null explosion
     # ---------------------------
+    if rows_before == 0:
+        return
+
     common_cols = before_cols & after_cols
+    if modified_columns is not None:
+        common_cols &= set(modified_columns)
 
     for col in common_cols:
-        before_null_pct = df_before[col].isna().mean() * 100
-        after_null_pct = df_after[col].isna().mean() * 100
+        before_null_pct = stats_before["null_counts"][col] / rows_before * 100
+        after_null_pct = stats_after["null_counts"][col] / rows_after * 100
 
         if (after_null_pct - before_null_pct) > max_null_increase_pct:
             raise ValidationError(
                 f"Column '{col}' nulls increased too much "
-                f"({before_null_pct:.2f}% → {after_null_pct:.2f}%)"
+                f"({before_null_pct:.2f}% → {after_null_pct:.2f}%)",
+                column=col,
             )
 
+
+def validate_transformation(
+    df_before: pd.DataFrame,
+    df_after: pd.DataFrame,
+    plan: Optional[Dict[str, Any]] = None,
+    max_row_loss_pct: float = 30.0,
+    max_null_increase_pct: float = 50.0,
+) -> None:
+    """
+    Validates transformation safety.
+
+    IMPORTANT:
+    - Allows no-op transformations
+    - Allows explicitly planned column drops
+    - Protects against destructive transformations
+    """
+
+    logger.debug("Entering validate_transformation")
     # ---------------------------
-    # 5. Passed validation
+    # 0. Allow no-op transformations
     # ---------------------------
-    return
+    if df_before.equals(df_after):
+        return
+
+    validate_stats(
+        collect_frame_stats(df_before),
+        collect_frame_stats(df_after),
+        plan,
+        max_row_loss_pct=max_row_loss_pct,
+        max_null_increase_pct=max_null_increase_pct,
+    )
 
 def sanitize_feedback(feedback: Dict[str, Any]) -> Dict[str, Any]:
     logger.debug("Entering sanitize_feedback")
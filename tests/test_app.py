@@ -0,0 +1,58 @@
+import importlib
+import io
+import json
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def web(tmp_path_factory):
+    # The app's data paths (jobs, uploads, outputs) are relative to the cwd
+    with pytest.MonkeyPatch.context() as mp:
+        mp.chdir(tmp_path_factory.mktemp("web"))
+        module = importlib.import_module("app")
+        yield module
+        module.jobs.shutdown()
+
+
+@pytest.fixture
+def upload_id(web):
+    saved = web.uploads.save(io.BytesIO(b"name,city\n a ,x\n b ,y\n"), "people.csv")
+    return saved["id"]
+
+
+PLAN = {"steps": [{"type": "tool", "name": "trim_whitespace", "args": {"columns": ["name"]}}]}
+
+
+def test_preview_accepts_form_encoded_plan(web, upload_id):
+    response = web.app.test_client().post("/preview", data={
+        "upload_id": upload_id, "mode": "plan", "plan": json.dumps(PLAN),
+    })
+    assert response.status_code == 200
+    assert response.get_json()["plan"]["steps"][0]["name"] == "trim_whitespace"
+
+
+def test_preview_rejects_invalid_plan_json(web, upload_id):
+    client = web.app.test_client()
+    response = client.post("/preview", data={"upload_id": upload_id, "mode": "plan", "plan": "{steps"})
+    assert response.status_code == 400
+    assert response.get_json()["error"].startswith("Invalid plan JSON")
+
+    response = client.post("/preview", data={"upload_id": upload_id, "mode": "plan", "plan": "[]"})
+    assert response.status_code == 400
+
+
+def test_cleaning_runs_of_same_upload_get_distinct_outputs(web, upload_id, monkeypatch):
+    outputs = []
+
+    def submit_pipeline(input_path, output_path, **options):
+        outputs.append(output_path)
+        return "job"
+
+    monkeypatch.setattr(web.jobs, "submit_pipeline", submit_pipeline)
+    client = web.app.test_client()
+    for _ in range(2):
+        response = client.post("/", data={"upload_id": upload_id, "mode": "full"})
+        assert response.status_code == 302
+
+    assert len(set(outputs)) == 2
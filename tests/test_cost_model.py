@@ -0,0 +1,54 @@
+import os
+import threading
+
+from etl.executor.cost_model import check_budget, load_calibration, recalibrate
+
+
+def _row(tool="trim_whitespace"):
+    return {
+        "tool": tool,
+        "status": "success",
+        "est_seconds": 0.1,
+        "actual_seconds": 0.2,
+        "est_step_memory_mb": None,
+        "actual_step_memory_mb": None,
+        "memory_source": None,
+    }
+
+
+def test_concurrent_recalibrations_are_not_lost(tmp_path):
+    path = str(tmp_path / "cost_model.json")
+    workers, runs = 4, 10
+
+    def run():
+        for _ in range(runs):
+            recalibrate([_row()], path=path)
+
+    threads = [threading.Thread(target=run) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert load_calibration(path)["trim_whitespace"]["samples"] == workers * runs
+    # No temp files left behind next to the calibration
+    assert sorted(os.listdir(tmp_path)) == ["cost_model.json", "cost_model.json.lock"]
+
+
+def test_shared_memory_measurements_are_not_calibrated(tmp_path):
+    path = str(tmp_path / "cost_model.json")
+    row = {
+        **_row(),
+        "est_step_memory_mb": 10.0,
+        "actual_step_memory_mb": None,
+        "memory_source": "shared",
+    }
+    tool = recalibrate([row], path=path)["trim_whitespace"]
+    assert tool["memory_scale"] == 1.0
+    assert tool["time_scale"] != 1.0
+
+
+def test_memory_budget_excludes_the_input_frame():
+    estimate = {"total_seconds": 1.0, "peak_memory_mb": 900.0, "base_memory_mb": 800.0}
+    assert check_budget(estimate, max_seconds=0, max_memory_mb=500) is None
+    assert check_budget(estimate, max_seconds=0, max_memory_mb=50) == "memory"
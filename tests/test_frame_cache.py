@@ -0,0 +1,47 @@
+import pytest
+
+from etl import pipeline
+from etl.extract.cache import FrameCache
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "in.csv"
+    path.write_text("a,b\n1,x\n2,y\n")
+    return str(path)
+
+
+def test_plan_is_keyed_by_profile(csv_path):
+    cache = FrameCache()
+    first = cache.plan(csv_path, {"columns": {"a": {}}}, lambda: {"steps": ["first"]})
+    other = cache.plan(csv_path, {"columns": {"b": {}}}, lambda: {"steps": ["other"]})
+    again = cache.plan(csv_path, {"columns": {"a": {}}}, lambda: {"steps": ["recomputed"]})
+
+    assert first == again == {"steps": ["first"]}
+    assert other == {"steps": ["other"]}
+
+
+def test_discarded_plan_is_recomputed(csv_path):
+    cache = FrameCache()
+    profile = {"columns": {"a": {}}}
+    cache.plan(csv_path, profile, lambda: {"steps": ["first"]})
+    cache.discard_plan(csv_path, profile)
+    assert cache.plan(csv_path, profile, lambda: {"steps": ["second"]}) == {"steps": ["second"]}
+
+
+def test_failed_first_plan_is_not_reused(csv_path, tmp_path, monkeypatch):
+    first_plans = []
+
+    def generate_plan(profile, feedback):
+        if feedback is None:
+            first_plans.append(profile)
+        return {"steps": [{"type": "tool", "name": "no_such_tool", "args": {}}]}
+
+    monkeypatch.setattr(pipeline, "generate_plan", generate_plan)
+    monkeypatch.setattr(pipeline, "frame_cache", FrameCache())
+    for _ in range(2):
+        with pytest.raises(pipeline.PipelineError):
+            pipeline.run_pipeline(csv_path, str(tmp_path / "out.csv"), max_iterations=1)
+
+    # The second run asks the planner again instead of replaying the failure
+    assert len(first_plans) == 2
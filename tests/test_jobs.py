@@ -0,0 +1,118 @@
+import sqlite3
+import subprocess
+import sys
+import time
+
+import pytest
+
+from etl.jobs import store as job_store
+from etl.jobs.runner import JobQueue
+from etl.jobs.store import FAILED, FINISHED_STATUSES, QUEUED, RUNNING, SUCCEEDED, JobStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.sqlite3"))
+
+
+@pytest.fixture
+def live_pid():
+    process = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+    yield process.pid
+    process.kill()
+    process.wait()
+
+
+def _dead_pid():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def _set_owner(store, job_id, pid, heartbeat_at, status=RUNNING):
+    owner = f"{job_store._HOST_BOOT}/{pid}" if pid is not None else None
+    with sqlite3.connect(store.path) as db:
+        db.execute(
+            "UPDATE jobs SET owner = ?, heartbeat_at = ?, status = ? WHERE id = ?",
+            (owner, heartbeat_at, status, job_id),
+        )
+
+
+def _wait(store, job_id, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = store.get(job_id)
+        if job["status"] in FINISHED_STATUSES:
+            return job
+        time.sleep(0.1)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_reopening_store_keeps_jobs_of_live_processes(store, live_pid):
+    own = store.create("row_count", {"file_path": "x"})
+    other = store.create("row_count", {"file_path": "y"})
+    _set_owner(store, other, live_pid, time.time(), status=QUEUED)
+
+    reopened = JobStore(store.path)
+    assert reopened.fail_orphaned() == []
+    assert reopened.get(own)["status"] == QUEUED
+    assert reopened.get(other)["status"] == QUEUED
+
+
+def test_jobs_of_gone_owners_are_failed(store, live_pid):
+    dead = store.create("pipeline", {})
+    stale = store.create("pipeline", {})
+    legacy = store.create("pipeline", {})
+    _set_owner(store, dead, _dead_pid(), time.time())
+    # A live pid with a stale heartbeat is a reused pid, not the owner
+    _set_owner(store, stale, live_pid, time.time() - job_store.JOB_HEARTBEAT_TIMEOUT - 1)
+    _set_owner(store, legacy, None, None)
+
+    assert sorted(store.fail_orphaned()) == sorted([dead, stale, legacy])
+    for job_id in (dead, stale, legacy):
+        assert store.get(job_id)["status"] == FAILED
+
+
+def test_store_adds_owner_columns_to_old_files(tmp_path):
+    path = str(tmp_path / "old.sqlite3")
+    with sqlite3.connect(path) as db:
+        db.execute(
+            "CREATE TABLE jobs (id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, "
+            "params TEXT NOT NULL, stage TEXT, iteration INTEGER NOT NULL DEFAULT 0, "
+            "stages TEXT NOT NULL DEFAULT '[]', result TEXT, error TEXT, "
+            "cancel_requested INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL, "
+            "started_at REAL, updated_at REAL NOT NULL, finished_at REAL)"
+        )
+        db.execute(
+            "INSERT INTO jobs (id, kind, status, params, created_at, updated_at) "
+            "VALUES ('old', 'pipeline', 'running', '{}', 0, 0)"
+        )
+
+    store = JobStore(path)
+    assert store.fail_orphaned() == ["old"]
+    assert store.get(store.create("pipeline", {}))["owner"] == job_store.process_owner()
+
+
+def test_pipeline_job_runs_in_worker_process(store, tmp_path):
+    queue = JobQueue(store, workers=1, executor="process")
+    try:
+        job_id = queue.submit_pipeline(str(tmp_path / "missing.csv"), str(tmp_path / "out.csv"))
+        job = _wait(store, job_id)
+    finally:
+        queue.shutdown()
+
+    assert job["status"] == FAILED
+    assert "missing.csv" in job["error"]
+
+
+def test_row_count_job_runs_on_thread(store, tmp_path):
+    path = tmp_path / "in.csv"
+    path.write_text("a\n1\n2\n3\n")
+    queue = JobQueue(store, workers=1, executor="thread")
+    try:
+        job = _wait(store, queue.submit_row_count(str(path)))
+    finally:
+        queue.shutdown()
+
+    assert job["status"] == SUCCEEDED
+    assert job["result"] == {"rows": 3}
@@ -0,0 +1,45 @@
+import json
+import os
+import time
+
+import pytest
+
+from etl.llm import limiter as limiter_module
+from etl.llm.limiter import LLMLimiter, LLMLimiterTimeout
+
+
+def _state(state_dir):
+    with open(os.path.join(state_dir, "state.json")) as f:
+        return json.load(f)
+
+
+def test_timeout_leaves_queue_and_later_callers_proceed(tmp_path):
+    limiter = LLMLimiter(state_dir=str(tmp_path), max_in_flight=1, tokens_per_minute=0, queue_timeout=0.2)
+    held = limiter.acquire(10)
+
+    with pytest.raises(LLMLimiterTimeout):
+        limiter.acquire(10)
+    assert _state(str(tmp_path))["queue"] == []
+
+    limiter.release(held)
+    slot = limiter.acquire(10)
+    limiter.release(slot)
+
+
+def test_stale_ticket_of_live_process_is_pruned(tmp_path, monkeypatch):
+    limiter = LLMLimiter(state_dir=str(tmp_path), max_in_flight=1, tokens_per_minute=0, queue_timeout=2)
+    # A ticket from this (live) process that stopped polling long ago
+    with open(os.path.join(str(tmp_path), "state.json"), "w") as f:
+        json.dump({"queue": [{"id": "dead", "pid": os.getpid(), "ts": time.time() - 3600}]}, f)
+
+    slot = limiter.acquire(10)
+    limiter.release(slot)
+    assert _state(str(tmp_path))["queue"] == []
+
+
+def test_state_saved_when_block_raises(tmp_path):
+    with pytest.raises(RuntimeError):
+        with limiter_module._locked_state(str(tmp_path)) as state:
+            state["queue"].append({"id": "x", "pid": os.getpid(), "ts": time.time()})
+            raise RuntimeError("boom")
+    assert [t["id"] for t in _state(str(tmp_path))["queue"]] == ["x"]
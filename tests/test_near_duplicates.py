@@ -0,0 +1,26 @@
+import pandas as pd
+import pytest
+
+from etl.transform import near_duplicates
+from etl.transform.near_duplicates import NearDuplicateError, remove_near_duplicates
+
+
+def _frame():
+    return pd.DataFrame({
+        "name": ["Acme Corp", "Acme Corp.", "Globex", "Initech"],
+        "city": ["Austin", "Austin", "Boston", "Boston"],
+    })
+
+
+def test_near_duplicates_removed_within_block():
+    result = remove_near_duplicates(_frame(), columns=["name"], blocking_keys=["city"], threshold=0.5)
+    assert result["name"].tolist() == ["Acme Corp", "Globex", "Initech"]
+
+
+def test_index_limit_message_does_not_suggest_blocking(monkeypatch):
+    monkeypatch.setattr(near_duplicates, "NEAR_DUP_MAX_INDEX_MB", 0.0001)
+    with pytest.raises(NearDuplicateError) as excinfo:
+        remove_near_duplicates(_frame(), columns=["name"], blocking_keys=["city"])
+    message = str(excinfo.value)
+    assert "blocking" not in message
+    assert "ETL_NEAR_DUP_MAX_INDEX_MB" in message
@@ -0,0 +1,56 @@
+import pandas as pd
+import pytest
+
+from etl.executor.optimizer import optimize_plan
+from etl.executor.tool_executor import execute_plan
+
+
+def _tool(name, **args):
+    return {"type": "tool", "name": name, "args": args}
+
+
+def _frame():
+    return pd.DataFrame({
+        "price": ["  $1,200 ", " $950", "$3,000  ", " $1,200 "],
+        "city": [" Austin ", "Boston", " Denver", " Austin "],
+    })
+
+
+def _profile(price_meta):
+    return {
+        "dataset": {"rows": 4, "duplicate_rows": 0},
+        "columns": {"price": price_meta, "city": {}},
+    }
+
+
+def _run(plan, profile):
+    return execute_plan(_frame(), plan, profile, max_workers=1)
+
+
+CURRENCY_RUNS = {"semantic_type": "numeric", "avg_string_length": 7}
+CURRENCY_SKIPPED = {"semantic_type": "text", "avg_string_length": 7}
+
+
+@pytest.mark.parametrize("price_meta", [CURRENCY_RUNS, CURRENCY_SKIPPED])
+@pytest.mark.parametrize("steps", [
+    [_tool("trim_whitespace", column="price"), _tool("normalize_currency", column="price")],
+    [_tool("standardize_missing"), _tool("trim_whitespace", column="city"), _tool("remove_duplicates")],
+    [_tool("trim_whitespace", column="city"), _tool("trim_whitespace", column="city"),
+     _tool("trim_whitespace", column="price")],
+])
+def test_optimized_plan_matches_original(steps, price_meta):
+    profile = _profile(price_meta)
+    plan = {"steps": steps}
+    expected = _run(plan, profile)["df"]
+    optimized = optimize_plan(plan, profile)
+    pd.testing.assert_frame_equal(_run(optimized, profile)["df"], expected)
+
+
+def test_trim_before_skipped_currency_step_is_kept():
+    plan = {"steps": [_tool("trim_whitespace", column="price"), _tool("normalize_currency", column="price")]}
+    profile = _profile(CURRENCY_SKIPPED)
+    result = _run(optimize_plan(plan, profile), profile)
+
+    statuses = [entry["status"] for entry in result["log"]]
+    assert "skipped" in statuses
+    assert result["df"]["price"].tolist() == ["$1,200", "$950", "$3,000", "$1,200"]
@@ -0,0 +1,112 @@
+import pytest
+
+from etl import pipeline
+from etl.executor import tool_executor
+from etl.extract.cache import FrameCache
+
+
+def _tool(name, **args):
+    return {"type": "tool", "name": name, "args": args}
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "in.csv"
+    path.write_text("a,b\n x ,1\ny ,2\n z,3\n")
+    return str(path)
+
+
+@pytest.fixture
+def planner(monkeypatch):
+    """
+    Replaces the planner with a fixed sequence of plans, one per iteration.
+    """
+    plans = []
+
+    def generate_plan(profile, feedback):
+        return plans.pop(0)
+
+    def boom(df, column):
+        raise ValueError("cannot convert")
+
+    monkeypatch.setattr(pipeline, "generate_plan", generate_plan)
+    monkeypatch.setattr(pipeline, "frame_cache", FrameCache())
+    monkeypatch.setitem(tool_executor.TOOL_REGISTRY, "normalize_percentage", boom)
+    return plans
+
+
+def _run(csv_path, tmp_path, **kwargs):
+    with pytest.raises(pipeline.PipelineError) as excinfo:
+        pipeline.run_pipeline(csv_path, str(tmp_path / "out.csv"), **kwargs)
+    return excinfo
+
+
+def _history(monkeypatch):
+    histories = []
+    original = pipeline.sanitize_feedback
+
+    def capture(entry):
+        histories.append(entry)
+        return original(entry)
+
+    monkeypatch.setattr(pipeline, "sanitize_feedback", capture)
+    return histories
+
+
+def test_resumed_iteration_failing_before_execution(csv_path, tmp_path, planner, monkeypatch):
+    trim = _tool("trim_whitespace", column="a")
+    percent = _tool("normalize_percentage", column="b")
+    invalid = {"type": "sql", "query": "select 1"}
+    planner.extend([{"steps": [trim, percent]}, {"steps": [invalid]}, {"steps": [invalid]}])
+    history = _history(monkeypatch)
+
+    _run(csv_path, tmp_path, max_iterations=3, validation_mode="plan")
+
+    first, second = history
+    assert first["completed_steps"] == [trim]
+    assert first["failed_step"] == percent
+    # The second plan failed before running anything: nothing from it is
+    # completed and the failing step is its first one
+    assert second["completed_steps"] == [trim]
+    assert second["failed_step"]["type"] == "sql"
+
+
+def test_input_over_memory_budget_is_streamed_without_full_read(csv_path, tmp_path, planner, monkeypatch):
+    monkeypatch.setattr(pipeline, "MAX_PLAN_MEMORY_MB", 1e-6)
+    planner.append({"steps": [_tool("trim_whitespace", column="a")]})
+
+    result = pipeline.run_pipeline(csv_path, str(tmp_path / "out.csv"))
+
+    assert result["status"] == "success"
+    # The full frame was never parsed into the cache
+    assert pipeline.frame_cache.stats()["entries"] == 0
+    assert (tmp_path / "out.csv").read_text().splitlines()[1:] == ["x,1", "y,2", "z,3"]
+
+
+def test_rolled_back_step_is_not_completed(tmp_path, planner, monkeypatch):
+    csv_path = tmp_path / "codes.csv"
+    csv_path.write_text("name,p\n1,5%\n2,6%\n3,7%\nfour,8%\n")
+
+    def null_out(df, column):
+        return df.assign(**{column: None})
+
+    monkeypatch.setitem(tool_executor.TOOL_REGISTRY, "convert_numeric", null_out)
+    convert = _tool("convert_numeric", column="name")
+    percent = _tool("normalize_percentage", column="p")
+    planner.extend([{"steps": [convert, percent]}, {"steps": [_tool("trim_whitespace", column="p")]}])
+    replan_profiles = []
+    generate_plan = pipeline.generate_plan
+
+    def capture(profile, feedback):
+        if feedback is not None:
+            replan_profiles.append(profile)
+        return generate_plan(profile, feedback)
+
+    monkeypatch.setattr(pipeline, "generate_plan", capture)
+    result = pipeline.run_pipeline(str(csv_path), str(tmp_path / "out.csv"), validation_mode="step")
+
+    first = result["history"][0]
+    # convert_numeric exploded the nulls in "name" and was rolled back
+    assert first["completed_steps"] == []
+    assert first["failed_step"] == percent
+    assert "name" in replan_profiles[0]["columns"]
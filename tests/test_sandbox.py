@@ -0,0 +1,90 @@
+import pandas as pd
+import pytest
+
+from etl.executor.code_executor import CodeExecutionError, CodeWorkerPool, _run_code
+from etl.executor.safety import is_code_safe
+
+
+ESCAPES = [
+    "pd.io.common.os.system('id')",
+    "np.savetxt('/tmp/x.csv', df.values)",
+    "m = pd\nm.io.common.os.system('id')",
+    "df.to_csv('/tmp/x.csv')",
+    "df.to_pickle('/tmp/x.pkl')",
+    "df = pd.read_csv('/etc/passwd')",
+    "df.query('@pd.io.common.os.system(\"id\")')",
+    "df.eval('a + 1')",
+    "import os",
+    "__import__('os')",
+    "df.__class__.__init__.__globals__",
+    "().__class__.__bases__[0].__subclasses__()",
+    "'{0.__class__}'.format(df)",
+    "g = (x for x in [1])\ng.gi_frame.f_globals",
+    "df.a.plot()",
+    "df = df.agg('to_csv', path_or_buf='/tmp/x.csv')",
+    "df.apply('to_pickle', path='/tmp/x.pkl')",
+    "df.transform('to_csv', path_or_buf='/tmp/x.csv')",
+    "df['a'].apply('to_csv', args=('/tmp/x.csv',))",
+    "df.agg(['to_json'])",
+    "df.agg({'a': 'to_json'})",
+    "df.agg('savetxt')",
+    "df.groupby('a').agg(x=('b', 'to_csv'))",
+    "df.agg('apply', 'to_csv')",
+    "f = 'to_csv'\ndf.agg(f, '/tmp/x.csv')",
+    "str = 'to_csv'\ndf['a'].apply(str, args=('/tmp/x.csv',))",
+    "df.apply(lambda str: df.agg(str))",
+    "df.apply(df.agg, args=('to_csv',))",
+]
+
+
+@pytest.mark.parametrize("code", ESCAPES)
+def test_escape_attempts_are_rejected(code):
+    safe, reason = is_code_safe(code)
+    assert not safe, code
+    assert reason
+
+
+@pytest.mark.parametrize("code", [
+    "df['a'] = pd.to_numeric(df['a'].str.strip(), errors='coerce')",
+    "df['b'] = np.where(df['a'].isna(), 'missing', df['a'].astype(str).str.upper())",
+    "df = df.drop_duplicates().reset_index(drop=True)",
+    "df['c'] = df['a'].map(lambda v: len(str(v)))",
+    "df['a'] = df['a'].map({'Y': 'yes', 'N': 'no'})",
+    "df['total'] = df.groupby('city')['amount'].transform('sum')",
+    "df = df.groupby('city').agg(total=('amount', 'sum'), rows=('amount', 'count')).reset_index()",
+    "df['a'] = df['a'].apply(str)",
+])
+def test_cleaning_code_is_allowed(code):
+    assert is_code_safe(code) == (True, "")
+
+
+@pytest.mark.parametrize("code", [
+    "df = pd.io.common.os.getcwd()",
+    "np.savetxt('/tmp/x.csv', df.values)",
+    "open('/tmp/x.csv', 'w')",
+])
+def test_namespace_exposes_no_modules(code):
+    # Even code that skipped the static check finds no I/O entry points
+    with pytest.raises((AttributeError, NameError)):
+        _run_code(pd.DataFrame({"a": [1]}), code)
+
+
+def test_allowed_functions_run():
+    df = pd.DataFrame({"a": [" 1", "x"]})
+    result = _run_code(df, "df['a'] = pd.to_numeric(df['a'].str.strip(), errors='coerce')")
+    assert result["a"].tolist()[0] == 1.0
+    assert result["a"].isna().tolist() == [False, True]
+
+
+def test_worker_cannot_write_files(tmp_path):
+    # Code that got past the static check still cannot write to disk
+    target = tmp_path / "x.csv"
+    pool = CodeWorkerPool(size=1)
+    try:
+        with pytest.raises(CodeExecutionError, match="File too large"):
+            pool.run(pd.DataFrame({"a": [1]}), f"df.to_csv({str(target)!r})")
+        # The worker survives and keeps serving code steps
+        assert pool.run(pd.DataFrame({"a": [1]}), "df['b'] = df['a'] + 1")["b"].tolist() == [2]
+    finally:
+        pool.shutdown()
+    assert not target.exists() or target.stat().st_size == 0
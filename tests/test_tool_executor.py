@@ -0,0 +1,126 @@
+import pandas as pd
+import pytest
+
+from etl.executor import tool_executor
+from etl.executor.tool_executor import ToolExecutionError, execute_plan
+from etl.validate.validator import ValidationError
+
+
+def _tool(name, **args):
+    return {"type": "tool", "name": name, "args": args}
+
+
+def test_execute_plan_does_not_mutate_its_input():
+    df = pd.DataFrame({
+        "city": [" Austin ", "Boston", " Austin "],
+        "amount": ["1", "2", "1"],
+    })
+    original = df.copy(deep=True)
+    profile = {
+        "dataset": {"rows": 3, "duplicate_rows": 1},
+        "columns": {"city": {}, "amount": {"numeric_string_ratio": 1.0}},
+    }
+    plan = {"steps": [
+        _tool("trim_whitespace", column="city"),
+        _tool("convert_numeric", column="amount"),
+        _tool("remove_duplicates"),
+    ]}
+
+    result = execute_plan(df, plan, profile, max_workers=1)
+
+    # The pipeline shares cached frames between runs and relies on this
+    pd.testing.assert_frame_equal(df, original)
+    assert result["df"]["city"].tolist() == ["Austin", "Boston"]
+    assert [entry["status"] for entry in result["log"]] == ["success"] * 3
+
+
+# ======================================================
+# Parallel batches
+# ======================================================
+
+def _wide_frame():
+    return pd.DataFrame({
+        "a": [" x ", "y ", " z"],
+        "b": ["1", "2", "3"],
+        "c": [" p", "q ", " r "],
+    })
+
+
+WIDE_PROFILE = {
+    "dataset": {"rows": 3, "duplicate_rows": 0},
+    "columns": {"a": {}, "b": {"numeric_string_ratio": 1.0}, "c": {}},
+}
+
+WIDE_PLAN = {"steps": [
+    _tool("trim_whitespace", column="a"),
+    _tool("convert_numeric", column="b"),
+    _tool("trim_whitespace", column="c"),
+]}
+
+
+@pytest.fixture
+def parallel(monkeypatch):
+    monkeypatch.setattr(tool_executor, "PARALLEL_MIN_ROWS", 1)
+
+
+def test_parallel_batch_matches_sequential(parallel):
+    assert tool_executor.build_step_batches(WIDE_PLAN["steps"]) == [[[0], [1], [2]]]
+    sequential = execute_plan(_wide_frame(), WIDE_PLAN, WIDE_PROFILE, max_workers=1)
+    concurrent = execute_plan(_wide_frame(), WIDE_PLAN, WIDE_PROFILE, max_workers=4)
+
+    pd.testing.assert_frame_equal(concurrent["df"], sequential["df"])
+    assert [e["step"] for e in concurrent["log"]] == [e["step"] for e in sequential["log"]]
+    assert [e["status"] for e in concurrent["log"]] == ["success"] * 3
+    # Concurrent steps cannot be metered for memory one by one
+    assert {e["memory_source"] for e in concurrent["log"]} == {"shared"}
+    assert all(e["peak_memory_mb"] is None for e in concurrent["log"])
+
+
+def test_failing_step_in_parallel_batch(parallel, monkeypatch):
+    def boom(df, column):
+        raise ValueError("cannot convert")
+
+    monkeypatch.setitem(tool_executor.TOOL_REGISTRY, "convert_numeric", boom)
+    df = _wide_frame()
+
+    with pytest.raises(ToolExecutionError) as excinfo:
+        execute_plan(df, WIDE_PLAN, WIDE_PROFILE, max_workers=4)
+
+    error = excinfo.value
+    assert str(error).startswith("Step 2:")
+    # The whole batch is rolled back to its input
+    pd.testing.assert_frame_equal(error.df, df)
+    assert error.completed_steps == 0
+    assert error.failed_step == 1
+
+
+def test_batch_failing_validation_reruns_sequentially(parallel):
+    def validate_step(stats, modified_columns, applied_steps):
+        if any(step["args"].get("column") == "b" for step in applied_steps):
+            raise ValidationError("nulls exploded in b", column="b")
+
+    result = execute_plan(
+        _wide_frame(), WIDE_PLAN, WIDE_PROFILE, max_workers=4, validate_step=validate_step
+    )
+
+    assert [e["status"] for e in result["log"]] == ["success", "rolled_back", "success"]
+    assert result["df"]["a"].tolist() == ["x", "y", "z"]
+    assert result["df"]["b"].tolist() == ["1", "2", "3"]
+    assert result["df"]["c"].tolist() == ["p", "q", "r"]
+    assert [entry["steps"] for entry in result["step_stats"]] == [[0], [2]]
+
+
+def test_failure_after_rollback_lists_applied_steps(monkeypatch):
+    def boom(df, column):
+        raise ValueError("cannot convert")
+
+    def validate_step(stats, modified_columns, applied_steps):
+        if any(step["name"] == "trim_whitespace" for step in applied_steps):
+            raise ValidationError("rejected")
+
+    monkeypatch.setitem(tool_executor.TOOL_REGISTRY, "convert_numeric", boom)
+    with pytest.raises(ToolExecutionError) as excinfo:
+        execute_plan(_wide_frame(), WIDE_PLAN, WIDE_PROFILE, max_workers=1, validate_step=validate_step)
+
+    assert excinfo.value.failed_step == 1
+    assert excinfo.value.applied_steps == []